@@ -0,0 +1,318 @@
+'''
+Generates synthetic, but realistic, MI transcripts for the benchmarks.
+
+Each kind of transcript is made of exchanges typical of a front-end
+session:
+
+  * `breakpoints`: breakpoints with multiple locations and
+    `-break-list` tables;
+  * `varobj`: `-var-list-children` and `-var-update` results on deep
+    variable objects;
+  * `stopped`: storms of `*running`/`*stopped` and thread and library
+    notifications;
+  * `console`: stream-heavy console dumps (disassembly, backtraces and
+    source listings, with escapes);
+  * `memory`: huge memory reads and register dumps;
+  * `mixed`: a mix of all the above.
+
+The output of a given kind, size and seed is always the same.
+
+    python3 -m benchmarks.corpus --kind mixed --size 10M trace.mi
+'''
+
+import argparse
+import itertools
+import random
+
+
+_FUNCS = [
+    'main', 'add', 'parse_args', 'do_work', 'handle_request', 'run_loop',
+    'std::vector<int, std::allocator<int> >::push_back(int const&)',
+    'node_insert', '__libc_start_main', '_start',
+]
+_FILES = ['main.c', 'util.c', 'server.cc', 'parser.cc', 'vector.h', 'tree.c']
+_LIBS = ['libc.so.6', 'libm.so.6', 'libpthread.so.0', 'libstdc++.so.6',
+         'libz.so.1', 'libssl.so.3']
+_TYPES = ['int', 'char *', 'struct node *', 'unsigned long', 'double',
+          'std::string', 'struct node']
+_INSNS = ['push   %rbp', 'mov    %rsp,%rbp', 'sub    $0x20,%rsp',
+          'movl   $0x0,-0x4(%rbp)', 'mov    -0x14(%rbp),%eax',
+          'callq  0x400410 <puts@plt>', 'add    %edx,%eax', 'leaveq',
+          'retq', 'nop']
+
+
+def _address(rng):
+    return '0x{:016x}'.format(rng.randrange(0x400000, 0x7fffffffffff))
+
+
+def _frame(rng, level=None):
+    func = rng.choice(_FUNCS)
+    file_ = rng.choice(_FILES)
+    args = ','.join('{{name="{}",value="{}"}}'.format(name,
+                                                       rng.randrange(1000))
+                    for name in ('argc', 'n', 'count', 'flags')[
+                        :rng.randrange(4)])
+    level = '' if level is None else 'level="{}",'.format(level)
+
+    return ('{{{}addr="{}",func="{}",args=[{}],file="{}",'
+            'fullname="/home/user/src/{}",line="{}",arch="i386:x86-64"}}'
+            .format(level, _address(rng), func, args, file_, file_,
+                    rng.randrange(1, 3000)))
+
+
+def _location(rng, number):
+    file_ = rng.choice(_FILES)
+
+    return ('{{number="{}",enabled="y",addr="{}",func="{}",file="{}",'
+            'fullname="/home/user/src/{}",line="{}",thread-groups=["i1"]}}'
+            .format(number, _address(rng), rng.choice(_FUNCS), file_,
+                    file_, rng.randrange(1, 3000)))
+
+
+def _breakpoint(rng, number, times=0):
+    return ('{{number="{}",type="breakpoint",disp="keep",enabled="y",'
+            'addr="<MULTIPLE>",times="{}",original-location="{}"}}'
+            .format(number, times, rng.choice(_FUNCS)))
+
+
+def _breakpoints(rng, tokens):
+    token = next(tokens)
+    number = token % 100 + 1
+    locations = ','.join(_location(rng, '{}.{}'.format(number, i + 1))
+                         for i in range(rng.randint(1, 6)))
+    lines = [
+        '=breakpoint-created,bkpt={},locations=[{}]'.format(
+            _breakpoint(rng, number), locations),
+        '=breakpoint-modified,bkpt={}'.format(
+            _breakpoint(rng, number, rng.randrange(100))),
+    ]
+
+    if rng.randrange(8) == 0:
+        columns = (('7', '-1', 'number', 'Num'), ('14', '-1', 'type', 'Type'),
+                   ('4', '-1', 'disp', 'Disp'), ('3', '-1', 'enabled', 'Enb'),
+                   ('18', '-1', 'addr', 'Address'),
+                   ('40', '2', 'what', 'What'))
+        hdr = ','.join('{{width="{}",alignment="{}",col_name="{}",'
+                       'colhdr="{}"}}'.format(*column) for column in columns)
+        rows = rng.randint(5, 40)
+        body = ','.join('bkpt=' + _breakpoint(rng, i + 1) for i in range(rows))
+        lines.append('{}^done,BreakpointTable={{nr_rows="{}",nr_cols="6",'
+                     'hdr=[{}],body=[{}]}}'.format(token, rows, hdr, body))
+        lines.append('(gdb)')
+
+    return lines
+
+
+def _varobj(rng, tokens):
+    token = next(tokens)
+    path = '.'.join(['var{}'.format(token % 50)] +
+                    [rng.choice(('left', 'right', 'next', 'data', '[3]'))
+                     for i in range(rng.randint(1, 15))])
+    count = rng.randint(1, 30)
+    children = ','.join(
+        'child={{name="{}.[{}]",exp="[{}]",numchild="{}",value="{}",'
+        'type="{}",thread-id="1"}}'.format(
+            path, i, i, rng.randrange(4), rng.randrange(100000),
+            rng.choice(_TYPES))
+        for i in range(count))
+    lines = [
+        '{}^done,numchild="{}",displayhint="array",children=[{}],'
+        'has_more="0"'.format(token, count, children),
+        '(gdb)',
+    ]
+
+    if rng.randrange(2) == 0:
+        changes = ','.join(
+            '{{name="{}.[{}]",value="{}",in_scope="true",'
+            'type_changed="false",has_more="0"}}'.format(
+                path, i, rng.randrange(100000))
+            for i in range(rng.randint(0, 10)))
+        lines.append('{}^done,changelist=[{}]'.format(next(tokens), changes))
+        lines.append('(gdb)')
+
+    return lines
+
+
+def _stopped(rng, tokens):
+    lines = []
+
+    for i in range(rng.randint(1, 8)):
+        thread = rng.randint(1, 16)
+        event = rng.randrange(10)
+
+        if event == 0:
+            lines.append('=thread-created,id="{}",group-id="i1"'.format(
+                thread))
+        elif event == 1:
+            lines.append('=thread-exited,id="{}",group-id="i1"'.format(
+                thread))
+        elif event == 2:
+            lib = '/lib/x86_64-linux-gnu/' + rng.choice(_LIBS)
+            start = rng.randrange(0x7f0000000000, 0x7fffffffffff)
+            lines.append(
+                '=library-loaded,id="{lib}",target-name="{lib}",'
+                'host-name="{lib}",symbols-loaded="0",thread-group="i1",'
+                'ranges=[{{from="0x{:x}",to="0x{:x}"}}]'.format(
+                    start, start + rng.randrange(0x100000), lib=lib))
+        elif event == 3:
+            lines.append('=thread-selected,id="{}",frame={}'.format(
+                thread, _frame(rng, 0)))
+        else:
+            reason = rng.choice((
+                'reason="breakpoint-hit",disp="keep",bkptno="{}",'.format(
+                    rng.randint(1, 10)),
+                'reason="end-stepping-range",',
+                'reason="signal-received",signal-name="SIGSEGV",'
+                'signal-meaning="Segmentation fault",',
+            ))
+            lines.append('{}^running'.format(next(tokens)))
+            lines.append('*running,thread-id="all"')
+            lines.append('(gdb)')
+            lines.append('*stopped,{}frame={},thread-id="{}",'
+                         'stopped-threads="all",core="{}"'.format(
+                             reason, _frame(rng), thread, rng.randrange(8)))
+
+    return lines
+
+
+def _console(rng, tokens):
+    func = rng.choice(_FUNCS)
+    base = rng.randrange(0x400000, 0x500000)
+    kind = rng.randrange(3)
+
+    if kind == 0:
+        lines = ['&"disassemble {}\\n"'.format(func),
+                 '~"Dump of assembler code for function {}:\\n"'.format(func)]
+        offset = 0
+
+        for i in range(rng.randint(5, 60)):
+            marker = '=> ' if i == 3 else '   '
+            lines.append('~"{}0x{:016x} <+{}>:\\t{}\\n"'.format(
+                marker, base + offset, offset, rng.choice(_INSNS)))
+            offset += rng.randint(1, 7)
+
+        lines.append('~"End of assembler dump.\\n"')
+    elif kind == 1:
+        lines = ['&"bt\\n"']
+
+        for i in range(rng.randint(2, 30)):
+            lines.append('~"#{}  0x{:016x} in {} (s=0x{:x} \\"caf\\303\\251'
+                         '\\") at {}:{}\\n"'.format(
+                             i, base + i, rng.choice(_FUNCS), base,
+                             rng.choice(_FILES), rng.randrange(1, 3000)))
+    else:
+        lines = ['&"list\\n"']
+        line = rng.randrange(1, 3000)
+
+        for i in range(10):
+            lines.append('~"{}\\t  if (node->next != NULL)\\n"'.format(
+                line + i))
+            lines.append('~"{}\\t\\tprintf (\\"%s\\\\n\\", node->name);\\n"'
+                         .format(line + i))
+
+    lines.append('@"inferior output\\n"')
+    lines.append('{}^done'.format(next(tokens)))
+    lines.append('(gdb)')
+
+    return lines
+
+
+def _memory(rng, tokens, max_size=1 << 18):
+    kind = rng.randrange(3)
+    begin = rng.randrange(0x7ffff0000000, 0x7fffffffffff)
+
+    if kind == 0:
+        size = rng.choice((256, 4096, 65536, max_size))
+        contents = rng.getrandbits(size * 8).to_bytes(size, 'little').hex()
+        line = ('{}^done,memory=[{{begin="0x{:x}",offset="0x0000000000000000",'
+                'end="0x{:x}",contents="{}"}}]'.format(
+                    next(tokens), begin, begin + size, contents))
+    elif kind == 1:
+        rows = ','.join(
+            '{{addr="0x{:x}",data=[{}]}}'.format(
+                begin + 8 * row,
+                ','.join('"0x{:02x}"'.format(rng.randrange(256))
+                         for i in range(8)))
+            for row in range(rng.choice((8, 64, 512))))
+        line = ('{}^done,addr="0x{:x}",nr-bytes="64",total-bytes="64",'
+                'next-row="0x{:x}",prev-row="0x{:x}",memory=[{}]'.format(
+                    next(tokens), begin, begin + 8, begin - 8, rows))
+    else:
+        values = ','.join('{{number="{}",value="0x{:x}"}}'.format(
+                              i, rng.getrandbits(64))
+                          for i in range(rng.choice((24, 80, 160))))
+        line = '{}^done,register-values=[{}]'.format(next(tokens), values)
+
+    return [line, '(gdb)']
+
+
+def _mixed(rng, tokens):
+    generator = rng.choices(
+        (_stopped, _console, _varobj, _breakpoints, _small_memory),
+        weights=(40, 30, 20, 8, 2))[0]
+
+    return generator(rng, tokens)
+
+
+def _small_memory(rng, tokens):
+    return _memory(rng, tokens, max_size=4096)
+
+
+KINDS = {
+    'breakpoints': _breakpoints,
+    'varobj': _varobj,
+    'stopped': _stopped,
+    'console': _console,
+    'memory': _memory,
+    'mixed': _mixed,
+}
+
+
+def generate(kind='mixed', size=1 << 20, seed=0):
+    '''
+    Returns a transcript of the given kind (a key of `KINDS`) of at
+    least `size` characters, made of complete lines.
+    '''
+    rng = random.Random(seed)
+    tokens = itertools.count(1)
+    exchange = KINDS[kind]
+    pieces = []
+    total = 0
+
+    while total < size:
+        piece = '\n'.join(exchange(rng, tokens)) + '\n'
+        pieces.append(piece)
+        total += len(piece)
+
+    return ''.join(pieces)
+
+
+def parse_size(text):
+    '''
+    Converts a size like `512k` or `10M` to a number of characters.
+    '''
+    units = {'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30}
+    unit = units.get(text[-1:].lower())
+
+    if unit is None:
+        return int(text)
+
+    return int(float(text[:-1]) * unit)
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description='Generate a synthetic MI transcript')
+    argparser.add_argument('output', help='The file to write')
+    argparser.add_argument('--kind', choices=sorted(KINDS), default='mixed')
+    argparser.add_argument('--size', type=parse_size, default='1M',
+                           help='The minimal size, e.g. 512k or 10M')
+    argparser.add_argument('--seed', type=int, default=0)
+    args = argparser.parse_args()
+
+    with open(args.output, 'w') as f:
+        f.write(generate(args.kind, args.size, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+'''
+Measures the decoding of C-string escapes with `CString.decoded` and
+their encoding with `parser.escape()` on escape-heavy console output
+(disassembly dumps, backtraces and listings), compared with
+straightforward pure Python versions.
+
+    python3 -m benchmarks.cstring
+'''
+
+import re
+import timeit
+
+from pygdbmi import parser
+from benchmarks import corpus
+
+
+_ESCAPE_RE = re.compile(r'\\([0-7]{1,3}|.)')
+_ESCAPES = {'n': '\n', 't': '\t', '"': '"', '\\': '\\'}
+
+
+def _naive_unescape(value):
+    # Decodes escapes one at a time, octal escapes being UTF-8 bytes.
+    def replace(m):
+        escape = m.group(1)
+
+        if escape[0].isdigit():
+            return chr(int(escape, 8))
+
+        return _ESCAPES.get(escape, escape)
+
+    return _ESCAPE_RE.sub(replace, value).encode('latin-1').decode()
+
+
+def _naive_escape(text):
+    out = ''
+
+    for c in text:
+        if c in '"\\':
+            out += '\\' + c
+        elif c == '\n':
+            out += '\\n'
+        elif c == '\t':
+            out += '\\t'
+        else:
+            out += c
+
+    return out
+
+
+def main(repeat=5, size=1 << 20):
+    records = parser.StreamParser().feed(corpus.generate('console', size))
+    cstrings = [r.record.output.output for r in records
+                if isinstance(r, parser.OutOfBandRecord) and
+                isinstance(r.record, parser.StreamRecord)]
+    values = [c.value for c in cstrings]
+    texts = [c.decoded for c in cstrings]
+    size = sum(len(v) for v in values) / 1e6
+
+    assert texts == [_naive_unescape(v) for v in values]
+    assert [parser.unescape(parser.escape(t)) for t in texts] == texts
+
+    def decoded():
+        # Drop the cached values to measure the decoding.
+        for c in cstrings:
+            c._decoded = None
+            c.decoded
+
+    benchmarks = (
+        ('naive unescape', lambda: [_naive_unescape(v) for v in values]),
+        ('CString.decoded', decoded),
+        ('cached decoded', lambda: [c.decoded for c in cstrings]),
+        ('naive escape', lambda: [_naive_escape(t) for t in texts]),
+        ('parser.escape', lambda: [parser.escape(t) for t in texts]),
+    )
+
+    for name, fn in benchmarks:
+        t = min(timeit.repeat(fn, number=1, repeat=repeat))
+        print('{:<20} {:8.3f} s  {:8.2f} MB/s'.format(name, t, size / t))
+
+
+if __name__ == '__main__':
+    main()
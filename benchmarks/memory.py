@@ -0,0 +1,41 @@
+'''
+Measures the memory retained by parsed records, in bytes per record.
+
+    python3 -m benchmarks.memory
+'''
+
+import gc
+import tracemalloc
+
+from pygdbmi import parser
+from benchmarks import corpus
+
+
+def _measure(text, **kwargs):
+    sp = parser.StreamParser(**kwargs)
+    gc.collect()
+    tracemalloc.start()
+    records = sp.feed(text)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return size / len(records)
+
+
+def main(size=4 << 20):
+    text = corpus.generate('stopped', size)
+    configs = (
+        ('tree', {}),
+        ('tree, interned values', {'intern_values': True}),
+        ('native', {'native': True}),
+        ('native, interned values', {'native': True, 'intern_values': True}),
+    )
+
+    for name, kwargs in configs:
+        per_record = _measure(text, **kwargs)
+        print('{:<25} {:8.0f} bytes/record'.format(name, per_record))
+
+
+if __name__ == '__main__':
+    main()
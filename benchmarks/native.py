@@ -0,0 +1,36 @@
+'''
+Compares parsing in native mode with parsing to a tree followed by a
+conversion with `NativeVisitor`.
+
+    python3 -m benchmarks.native
+'''
+
+import timeit
+
+from pygdbmi import parser
+from pygdbmi import visitors
+from benchmarks import corpus
+
+
+def main(repeat=5, size=1 << 20):
+    text = corpus.generate('mixed', size)
+    visitor = visitors.NativeVisitor()
+
+    def ast():
+        stream_parser = parser.StreamParser()
+
+        return [visitor.visit(r) for r in stream_parser.feed(text)]
+
+    def native():
+        return parser.StreamParser(native=True).feed(text)
+
+    assert ast() == native()
+    size = len(text) / 1e6
+
+    for name, fn in (('AST + NativeVisitor', ast), ('native', native)):
+        t = min(timeit.repeat(fn, number=1, repeat=repeat))
+        print('{:<20} {:8.3f} s  {:8.2f} MB/s'.format(name, t, size / t))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+'''
+Measures the throughput of the NDJSON export of `JsonVisitor`, compared
+with converting the records with `NativeVisitor` and serializing them
+with `json.dumps()`.
+
+    python3 -m benchmarks.ndjson
+'''
+
+import io
+import json
+import timeit
+
+from pygdbmi import parser
+from pygdbmi import visitors
+from benchmarks import corpus
+
+
+def main(repeat=5, size=1 << 20):
+    text = corpus.generate('mixed', size)
+    records = parser.StreamParser().feed(text)
+    native_visitor = visitors.NativeVisitor()
+
+    def json_visitor():
+        outfile = io.StringIO()
+        visitor = visitors.JsonVisitor(outfile)
+
+        for record in records:
+            visitor.visit(record)
+
+        return outfile.getvalue()
+
+    def dumps():
+        outfile = io.StringIO()
+
+        for record in records:
+            outfile.write(json.dumps(native_visitor.visit(record)))
+            outfile.write('\n')
+
+        return outfile.getvalue()
+
+    assert json_visitor() == dumps()
+    size = len(text) / 1e6
+
+    for name, fn in (('NativeVisitor + json', dumps),
+                     ('JsonVisitor', json_visitor)):
+        t = min(timeit.repeat(fn, number=1, repeat=repeat))
+        print('{:<20} {:8.3f} s  {:8.2f} MB/s'.format(name, t, size / t))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+'''
+Measures the startup cost of each entry point of pygdbmi with
+`python -X importtime`: the cumulative import time of the module, and
+the modules it imports which take the longest.
+
+    python3 -m benchmarks.startup
+'''
+
+import os
+import subprocess
+import sys
+
+
+ENTRY_POINTS = [
+    'pygdbmi.parser',
+    'pygdbmi.visitors',
+    'pygdbmi.objects',
+    'pygdbmi.query',
+    'pygdbmi.cli.pprint',
+]
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_times(module):
+    # Returns a dict mapping `module` and the modules imported while
+    # importing it in a new interpreter to their (self, cumulative)
+    # import times, in microseconds.
+    env = dict(os.environ, PYTHONPATH=_ROOT_DIR)
+
+    # Measure with bytecode caching, as in a normal installation.
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                           'import ' + module],
+                          check=True, stderr=subprocess.PIPE,
+                          universal_newlines=True, env=env)
+    entries = []
+
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = len(name) - len(name.lstrip())
+        entries.append((name.strip(), int(self_us), int(cumulative_us),
+                        depth))
+
+    # The modules imported by a module are listed before it, nested
+    # deeper.
+    for index, (name, self_us, cumulative_us, depth) in enumerate(entries):
+        if name == module:
+            times = {name: (self_us, cumulative_us)}
+
+            for name, self_us, cumulative_us, child_depth in \
+                    reversed(entries[:index]):
+                if child_depth <= depth:
+                    break
+
+                times[name] = self_us, cumulative_us
+
+            return times
+
+    raise RuntimeError('{} was already imported'.format(module))
+
+
+def import_time(module, repeat=5):
+    '''
+    Returns the best cumulative import time of `module`, in a new
+    interpreter, in milliseconds, and the import times of the modules
+    it imports during this best run.
+    '''
+    # The first run writes the bytecode caches.
+    _import_times(module)
+    runs = [_import_times(module) for i in range(repeat)]
+    best = min(runs, key=lambda times: times[module][1])
+
+    return best[module][1] / 1e3, best
+
+
+def main(repeat=5, top=5):
+    for module in ENTRY_POINTS:
+        ms, times = import_time(module, repeat)
+        print('{:<24} {:8.1f} ms'.format(module, ms))
+        slowest = sorted(times.items(), key=lambda item: -item[1][0])
+
+        for name, (self_us, cumulative_us) in slowest[:top]:
+            print('    {:<30} {:8.1f} ms'.format(name, self_us / 1e3))
+
+
+if __name__ == '__main__':
+    main()
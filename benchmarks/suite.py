@@ -0,0 +1,266 @@
+'''
+Runs the benchmark suite on synthetic transcripts (see
+`benchmarks.corpus`) and optionally saves the results as a baseline, or
+compares them with a saved baseline.
+
+For each kind of transcript, it measures the throughput of the parser
+(tree and native modes), of `PrettyPrintVisitor` and `JsonVisitor`,
+and of loading the records from a cache file (see `pygdbmi.store`), the
+parse latency per record, and the peak memory used by parsing. It
+also measures the throughput of `gdb-mi-pprint` and the import time of
+the entry points (see `benchmarks.startup`).
+
+    python3 -m benchmarks.suite --save before
+    python3 -m benchmarks.suite --compare before
+
+Baselines are saved in `benchmarks/baselines/NAME.json`. The comparison
+exits with status 1 if a metric is worse than its baseline by more than
+the threshold.
+'''
+
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+
+from pygdbmi import parser
+from pygdbmi import store
+from pygdbmi import visitors
+from benchmarks import corpus
+from benchmarks import startup
+
+
+_BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'baselines')
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Unit of each kind of metric, and whether higher values are better.
+_UNITS = {
+    'MB/s': True,
+    'us': False,
+    'MB': False,
+    'ms': False,
+}
+
+
+def _throughput(fn, size, repeat):
+    # Returns the best throughput of `fn`, which processes `size`
+    # characters, in MB/s.
+    return size / 1e6 / min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def _parse(text, **kwargs):
+    stream_parser = parser.StreamParser(**kwargs)
+
+    return stream_parser.feed(text) + stream_parser.close()
+
+
+def _render(records, visitor_cls):
+    visitor = visitor_cls(io.StringIO())
+
+    for record in records:
+        visitor.visit(record)
+
+
+def _latencies(text, max_records=2000):
+    # Returns the median and 99th percentile of the time it takes to
+    # parse one record, in microseconds.
+    lines = [line + '\n' for line in text.splitlines() if line != '(gdb)']
+    step = max(1, len(lines) // max_records)
+    times = []
+
+    for line in lines[::step]:
+        start = time.perf_counter()
+        parser.parse(line, strict=False)
+        times.append((time.perf_counter() - start) * 1e6)
+
+    times.sort()
+
+    return statistics.median(times), times[int(len(times) * 0.99)]
+
+
+def _peak_memory(text):
+    # Returns the peak memory used by parsing `text` to trees, in MB.
+    tracemalloc.start()
+    records = _parse(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+
+    return peak / 1e6
+
+
+def _run(args, repeat):
+    # Returns the best wall time of running `args`, in ms.
+    env = dict(os.environ, PYTHONPATH=_ROOT_DIR)
+    times = []
+
+    for i in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, check=True, stdout=subprocess.DEVNULL, env=env)
+        times.append((time.perf_counter() - start) * 1e3)
+
+    return min(times)
+
+
+def _load_cache(records, size, repeat):
+    # Returns the throughput of loading `records`, the records of `size`
+    # characters of MI output, from a cache file.
+    fd, path = tempfile.mkstemp(suffix='.cache')
+    os.close(fd)
+
+    try:
+        store.save_parsed(path, records)
+
+        return _throughput(lambda: store.load_parsed(path), size, repeat)
+    finally:
+        os.remove(path)
+
+
+def _bench_kind(kind, size, repeat):
+    text = corpus.generate(kind, size)
+    records = _parse(text)
+    results = {}
+
+    results['parse tree'] = _throughput(lambda: _parse(text), len(text),
+                                        repeat), 'MB/s'
+    results['parse native'] = _throughput(
+        lambda: _parse(text, native=True), len(text), repeat), 'MB/s'
+    results['pprint'] = _throughput(
+        lambda: _render(records, visitors.PrettyPrintVisitor), len(text),
+        repeat), 'MB/s'
+    results['ndjson'] = _throughput(
+        lambda: _render(records, visitors.JsonVisitor), len(text),
+        repeat), 'MB/s'
+    results['load cache'] = _load_cache(records, len(text), repeat), 'MB/s'
+    median, p99 = _latencies(text)
+    results['latency median'] = median, 'us'
+    results['latency p99'] = p99, 'us'
+    results['peak memory'] = _peak_memory(text), 'MB'
+
+    return {'{}: {}'.format(kind, name): value
+            for name, value in results.items()}
+
+
+def _bench_cli(size, repeat):
+    fd, path = tempfile.mkstemp(suffix='.mi')
+
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(corpus.generate('mixed', size))
+
+        cli = [sys.executable, '-m', 'pygdbmi.cli.pprint', path]
+        t = _run(cli, repeat)
+
+        return {'cli: pprint': (size / 1e6 / (t / 1e3), 'MB/s')}
+    finally:
+        os.remove(path)
+
+
+def _bench_imports(repeat):
+    return {'import: ' + module:
+            (startup.import_time(module, repeat)[0], 'ms')
+            for module in startup.ENTRY_POINTS}
+
+
+def run(kinds, size, repeat=3, cli=True):
+    '''
+    Runs the benchmarks on transcripts of `size` characters of each of
+    `kinds` and returns a dict mapping metric names to (value, unit).
+    '''
+    results = {}
+
+    for kind in kinds:
+        results.update(_bench_kind(kind, size, repeat))
+
+    if cli:
+        results.update(_bench_cli(size, repeat))
+        results.update(_bench_imports(repeat * 3))
+
+    return results
+
+
+def _baseline_path(name):
+    return os.path.join(_BASELINES_DIR, name + '.json')
+
+
+def compare(results, baseline, threshold):
+    '''
+    Prints `results` next to `baseline` and returns the names of the
+    metrics worse than their baseline by more than `threshold` (a
+    fraction).
+    '''
+    regressions = []
+
+    for name, (value, unit) in results.items():
+        if name not in baseline:
+            print('{:<40} {:10.2f} {:<4}'.format(name, value, unit))
+            continue
+
+        base = baseline[name][0]
+        change = (value - base) / base if base else 0.0
+        worse = -change if _UNITS[unit] else change
+        flag = ''
+
+        if worse > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+
+        print('{:<40} {:10.2f} {:<4} {:+7.1%}{}'.format(name, value, unit,
+                                                         change, flag))
+
+    return regressions
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='Run the benchmarks')
+    argparser.add_argument('--kinds', default=','.join(sorted(corpus.KINDS)),
+                           help='Comma-separated kinds of transcripts')
+    argparser.add_argument('--size', type=corpus.parse_size, default='2M',
+                           help='The size of each transcript, e.g. 10M')
+    argparser.add_argument('--repeat', type=int, default=3)
+    argparser.add_argument('--no-cli', action='store_true',
+                           help='Skip the CLI and import benchmarks')
+    argparser.add_argument('--save', metavar='NAME',
+                           help='Save the results as baseline NAME')
+    argparser.add_argument('--compare', metavar='NAME',
+                           help='Compare the results with baseline NAME')
+    argparser.add_argument('--threshold', type=float, default=0.1,
+                           help='Tolerated regression (default: 0.1)')
+    args = argparser.parse_args()
+
+    kinds = args.kinds.split(',')
+
+    for kind in kinds:
+        if kind not in corpus.KINDS:
+            argparser.error('unknown kind of transcript: {}'.format(kind))
+
+    baseline = {}
+
+    if args.compare is not None:
+        with open(_baseline_path(args.compare)) as f:
+            baseline = json.load(f)
+
+    results = run(kinds, args.size, args.repeat, not args.no_cli)
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save is not None:
+        os.makedirs(_BASELINES_DIR, exist_ok=True)
+
+        with open(_baseline_path(args.save), 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if regressions:
+        print('{} regression(s)'.format(len(regressions)), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
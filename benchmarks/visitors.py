@@ -0,0 +1,192 @@
+'''
+Compares `PrettyPrintVisitor`, which walks the trees with an explicit
+stack, with the recursive implementation it replaced.
+
+    python3 -m benchmarks.visitors
+'''
+
+import io
+import sys
+import timeit
+
+from pygdbmi import parser
+from pygdbmi import visitors
+from benchmarks import corpus
+
+
+# The recursive pretty-printer, without colors.
+
+class RecursivePrettyPrintVisitor(visitors.BaseVisitor):
+
+    class Indenter:
+        def __init__(self):
+            self._level = 0
+
+        def __enter__(self):
+            self._level += 1
+
+        def __exit__(self, type_, value, traceback):
+            self._level -= 1
+
+        def __call__(self):
+            return '  ' * self._level
+
+    def __init__(self, outfile=sys.stdout):
+        super(RecursivePrettyPrintVisitor, self).__init__()
+        self._outfile = outfile
+        self._indent = RecursivePrettyPrintVisitor.Indenter()
+
+        self._gos = RecursivePrettyPrintVisitor._get_out_str_no_colors
+
+    @staticmethod
+    def _get_out_str_no_colors(s, c, attrs=[]):
+        return s
+
+
+    def visit_output(self, output):
+        for oob_record in output.oob_records:
+            self.visit(oob_record)
+
+        if output.result_record is not None:
+            self.visit(output.result_record)
+
+    def _print_results(self, results):
+        with self._indent:
+            for i, result in enumerate(results):
+                self._outfile.write(self._indent())
+                self.visit(result)
+                if i == len(results) - 1:
+                    self._outfile.write('\n')
+                else:
+                    self._outfile.write(',\n')
+
+    def visit_result_record(self, rr):
+        maybe_comma = ',' if len(rr.results) > 0 else ''
+        ctoken = ''
+
+        if rr.token is not None:
+            ctoken = self._gos('{}'.format(rr.token.value), 'red', ['bold'])
+
+        cresult_class = self._gos('^' + rr.result_class,
+                                  'green', ['bold'])
+
+        self._outfile.write('{}{}{}\n'.format(ctoken, cresult_class,
+                                              maybe_comma))
+
+        self._print_results(rr.results)
+
+    def _print_async_record(self, sigil, ar):
+        if ar.token is not None:
+            self._outfile.write(self._gos('{}'.format(ar.token.value),
+                                          'red', ['bold']))
+
+        self._outfile.write(self._gos(sigil, 'green', ['bold']))
+        self.visit(ar.output)
+
+    def visit_notify_async_record(self, ar):
+        self._print_async_record('=', ar)
+
+    def visit_status_async_record(self, ar):
+        self._print_async_record('+', ar)
+
+    def visit_exec_async_record(self, ar):
+        self._print_async_record('*', ar)
+
+    def _print_stream_output(self, sigil, output):
+        self._outfile.write(self._gos(sigil, 'green', ['bold']))
+        self.visit(output.output)
+        self._outfile.write('\n')
+
+    def visit_console_stream_output(self, output):
+        self._print_stream_output('~', output)
+
+    def visit_target_stream_output(self, output):
+        self._print_stream_output('@', output)
+
+    def visit_log_stream_output(self, output):
+        self._print_stream_output('&', output)
+
+    def visit_async_output(self, output):
+        self._outfile.write(self._gos(output.async_class, 'green', ['bold']))
+
+        if output.results:
+            self._outfile.write(',')
+        self._outfile.write('\n')
+
+        self._print_results(output.results)
+
+    def visit_result(self, result):
+        cvariable_name = self._gos(result.variable.name, 'blue')
+        self._outfile.write('{} = '.format(cvariable_name))
+        self.visit(result.value)
+
+    def visit_value(self, value):
+        self.visit(value.value)
+
+    def visit_cstring(self, cstring):
+        cquote = self._gos('"', 'yellow')
+        cvalue = self._gos(cstring.value, 'yellow', ['bold'])
+        self._outfile.write('{quot}{val}{quot}'.format(quot=cquote, val=cvalue))
+
+    def visit_list(self, list_):
+        if len(list_.elements) == 0:
+            self._outfile.write('[]')
+            return
+
+        self._outfile.write('[\n')
+        with self._indent:
+            for i, element in enumerate(list_.elements):
+                self._outfile.write(self._indent())
+                self.visit(element)
+                if i == len(list_.elements) - 1:
+                    self._outfile.write('\n')
+                else:
+                    self._outfile.write(',\n')
+        self._outfile.write(self._indent())
+        self._outfile.write(']')
+
+    def visit_tuple(self, tuple_):
+        if len(tuple_.elements) == 0:
+            self._outfile.write('{}')
+            return
+
+        self._outfile.write('{\n')
+        with self._indent:
+            for i, element in enumerate(tuple_.elements):
+                self._outfile.write(self._indent())
+                self.visit(element)
+                if i == len(tuple_.elements) - 1:
+                    self._outfile.write('\n')
+                else:
+                    self._outfile.write(',\n')
+        self._outfile.write(self._indent())
+        self._outfile.write('}')
+
+
+def main(repeat=5, size=1 << 20):
+    text = corpus.generate('mixed', size)
+    records = parser.StreamParser().feed(text)
+
+    def render(visitor_cls):
+        outfile = io.StringIO()
+        visitor = visitor_cls(outfile)
+
+        for record in records:
+            visitor.visit(record)
+
+        return outfile.getvalue()
+
+    assert render(visitors.PrettyPrintVisitor) == \
+        render(RecursivePrettyPrintVisitor)
+    size = len(text) / 1e6
+
+    for name, visitor_cls in (
+            ('recursive', RecursivePrettyPrintVisitor),
+            ('iterative', visitors.PrettyPrintVisitor)):
+        t = min(timeit.repeat(lambda: render(visitor_cls), number=1,
+                              repeat=repeat))
+        print('{:<20} {:8.3f} s  {:8.2f} MB/s'.format(name, t, size / t))
+
+
+if __name__ == '__main__':
+    main()
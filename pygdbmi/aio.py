@@ -0,0 +1,224 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Simon Marchi <simon.marchi@polymtl.ca>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+import asyncio
+from pygdbmi import parser
+
+
+def _feed(feed, data, on_error):
+    # Parses `data` with `feed`, passing the errors to `on_error` if
+    # set, and carrying on with the following lines: the records of the
+    # lines preceding a bad line are returned by the next call.
+    while True:
+        try:
+            return feed(data)
+        except parser.ParseError as e:
+            if on_error is not None:
+                on_error(e)
+
+            data = b''
+
+
+async def read_records(reader, encoding='utf-8', chunk_size=65536,
+                       on_error=None):
+    '''
+    Asynchronously iterates on the MI records (`OutOfBandRecord` and
+    `ResultRecord` objects) read from `reader`, an
+    `asyncio.StreamReader` connected to GDB's standard output.
+
+    Each record is yielded as soon as its line is complete, without
+    waiting for the next `(gdb)` prompt.
+
+    Lines which can't be parsed, such as the output of the inferior
+    when it shares GDB's terminal, are skipped: the `ParseError` is
+    passed to `on_error` if set.
+    '''
+    stream_parser = parser.StreamParser(encoding)
+
+    while True:
+        data = await reader.read(chunk_size)
+
+        if not data:
+            break
+
+        for record in _feed(stream_parser.feed, data, on_error):
+            yield record
+
+    for record in _feed(lambda data: stream_parser.close(), b'', on_error):
+        yield record
+
+
+def _is_response(record, token):
+    return (isinstance(record, parser.ResultRecord) and
+            record.token is not None and record.token.value == token)
+
+
+async def execute(writer, records, command, token, on_record=None):
+    '''
+    Writes the MI command `command`, prefixed with `token`, to `writer`
+    (an `asyncio.StreamWriter` connected to GDB's standard input), and
+    waits for the `ResultRecord` with the same token in `records`, an
+    asynchronous iterator such as the one returned by `read_records()`.
+
+    Every other record read in the meantime is passed to `on_record`,
+    if set.
+
+    Raises `EOFError` if `records` ends before the response arrives.
+    '''
+    writer.write('{}{}\n'.format(token, command).encode())
+    await writer.drain()
+
+    async for record in records:
+        if _is_response(record, token):
+            return record
+
+        if on_record is not None:
+            on_record(record)
+
+    raise EOFError('MI output ended before the response '
+                   'to token {}'.format(token))
+
+
+class Session:
+    '''
+    MI session over the standard output (`reader`) and standard input
+    (`writer`) streams of a GDB process, supporting pipelined commands.
+
+    `send()` assigns a new token to a command, writes it without
+    waiting for any previous reply, and returns a future which is
+    resolved with the matching `ResultRecord` when it arrives. Pending
+    commands are kept in a token-indexed table. Every other record is
+    passed to `on_record`, if set, and the errors of the lines which
+    can't be parsed to `on_error` (see `read_records()`).
+
+    Once GDB's output ends, or can't be read, the pending futures and
+    the ones returned by later calls to `send()` fail with `EOFError`,
+    or with the exception raised while reading.
+
+    The session reads GDB's output between `start()` and `close()`, or
+    within an `async with` block:
+
+        async with Session(proc.stdout, proc.stdin) as session:
+            futures = [session.send(cmd) for cmd in commands]
+            responses = await asyncio.gather(*futures)
+    '''
+
+    def __init__(self, reader, writer, on_record=None, encoding='utf-8',
+                 first_token=1, on_error=None):
+        self._records = read_records(reader, encoding, on_error=on_error)
+        self._writer = writer
+        self._on_record = on_record
+        self._next_token = first_token
+        self._pending = {}
+        self._task = None
+        self._error = None
+
+    async def __aenter__(self):
+        self.start()
+
+        return self
+
+    async def __aexit__(self, type_, value, traceback):
+        await self.close()
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._read())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+            self._task = None
+
+        if self._error is None:
+            self._error = EOFError('MI session closed')
+
+        self._fail_pending(self._error)
+
+    def send(self, command):
+        future = asyncio.get_running_loop().create_future()
+
+        if self._error is not None:
+            # Nothing would ever resolve the future.
+            future.set_exception(self._error)
+
+            return future
+
+        token = self._next_token
+        self._next_token += 1
+        self._pending[token] = future
+        self._writer.write('{}{}\n'.format(token, command).encode())
+
+        return future
+
+    async def drain(self):
+        await self._writer.drain()
+
+    async def execute(self, command):
+        future = self.send(command)
+        await self.drain()
+
+        return await future
+
+    def _fail_pending(self, exc):
+        pending = self._pending
+        self._pending = {}
+
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    async def _read(self):
+        # Reads the records until the end of GDB's output. A failure is
+        # reported through the futures, not by the task, which `close()`
+        # awaits.
+        try:
+            async for record in self._records:
+                if isinstance(record, parser.ResultRecord) and \
+                        record.token is not None:
+                    future = self._pending.pop(record.token.value, None)
+
+                    if future is not None:
+                        if not future.done():
+                            future.set_result(record)
+
+                        continue
+
+                if self._on_record is not None:
+                    self._on_record(record)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._error = e
+        else:
+            self._error = EOFError('MI output ended before the response')
+
+        self._fail_pending(self._error)
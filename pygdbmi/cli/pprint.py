@@ -20,12 +20,172 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
+import io
 import sys
 import argparse
 from pygdbmi import parser
+from pygdbmi import parallel
+from pygdbmi import store
 from pygdbmi import visitors
 
 
+_CHUNK_SIZE = 65536
+
+
+def _parse_chunk(feed, data):
+    # Parses `data` with `feed`, reporting parse errors and carrying on
+    # with the following lines.
+    records = []
+    errors = 0
+
+    while True:
+        try:
+            records += feed(data)
+        except parser.ParseError as e:
+            print('Error: parse error: {}'.format(e), file=sys.stderr)
+            errors += 1
+            data = b''
+        else:
+            return records, errors
+
+
+def pprint_stream(infile, visitor, line_filter=None, stats=None):
+    '''
+    Pretty-prints the records read from the binary file object `infile`
+    with `visitor`, record by record, as the input arrives, skipping the
+    lines rejected by `line_filter` if set. If `stats` is a
+    `parser.ParseStats`, the parsing and rendering of the records are
+    accounted for in it. Returns the number of lines that couldn't be
+    parsed.
+    '''
+    stream_parser = parser.StreamParser(line_filter=line_filter, stats=stats)
+    read = getattr(infile, 'read1', infile.read)
+    errors = 0
+
+    while True:
+        data = read(_CHUNK_SIZE)
+
+        if data:
+            records, chunk_errors = _parse_chunk(stream_parser.feed, data)
+        else:
+            records, chunk_errors = _parse_chunk(
+                lambda data: stream_parser.close(), data)
+
+        errors += chunk_errors
+
+        for record in records:
+            if stats is not None:
+                stats.visit(visitor, record)
+            else:
+                visitor.visit(record)
+
+        sys.stdout.flush()
+
+        if not data:
+            return errors
+
+
+def pprint_cached(path, cache_path, visitor, stats=None):
+    '''
+    Pretty-prints the records of the file at `path` with `visitor`,
+    loading them from the cache file at `cache_path` if it's up to
+    date, or parsing the file and writing the cache file otherwise (see
+    `store.parse_file()`). If `stats` is a `parser.ParseStats`, the
+    parsing and rendering of the records are accounted for in it.
+    Returns the number of lines that couldn't be parsed.
+    '''
+    records, errors = store.parse_file(path, cache_path, stats)
+
+    for record in records:
+        if stats is not None:
+            stats.visit(visitor, record)
+        else:
+            visitor.visit(record)
+
+    sys.stdout.flush()
+
+    for offset, line, reason in errors:
+        e = parser.ParseError(reason, line)
+        print('Error: parse error: {}'.format(e), file=sys.stderr)
+
+    return len(errors)
+
+
+def _make_visitor(format_, outfile, **options):
+    # Creates the visitor rendering records in `format_`, `options`
+    # being the options of the pretty-printer.
+    if format_ == 'ndjson':
+        return visitors.JsonVisitor(outfile=outfile)
+
+    return visitors.PrettyPrintVisitor(outfile=outfile, **options)
+
+
+def _pprint_chunk(path, start, end, options, line_filter):
+    # Parses and renders a chunk of the input file in a worker process,
+    # `options` being the arguments of `_make_visitor()`.
+    text = parallel.read_chunk(path, start, end)
+    records, errors = parallel.parse_chunk_lines(text,
+                                                 line_filter=line_filter)
+    outfile = io.StringIO()
+    visitor = _make_visitor(outfile=outfile, **options)
+    pieces = []
+    index = 0
+
+    for error_index, line, reason in errors + [(len(records), None, None)]:
+        for record in records[index:error_index]:
+            visitor.visit(record)
+
+        index = error_index
+        pieces.append(outfile.getvalue())
+        outfile.seek(0)
+        outfile.truncate()
+
+        if line is not None:
+            pieces.append((line, reason))
+
+    return pieces, text.count('\n')
+
+
+def pprint_parallel(path, jobs, outfile=sys.stdout, en_colors=False,
+                    chunk_size=parallel.DEFAULT_CHUNK_SIZE, line_filter=None,
+                    max_depth=None, max_items=None, compact=False,
+                    format_='pretty'):
+    '''
+    Pretty-prints the records of the file at `path` to `outfile`,
+    parsing and rendering the file with `jobs` processes, skipping the
+    lines rejected by `line_filter` if set. `max_depth`, `max_items` and
+    `compact` are passed to `PrettyPrintVisitor`. With `format_` set to
+    'ndjson', the records are written as JSON by `JsonVisitor` instead.
+    Returns the number of lines that couldn't be parsed.
+    '''
+    first_line = 1
+    errors = 0
+    options = {
+        'format_': format_,
+        'en_colors': en_colors,
+        'max_depth': max_depth,
+        'max_items': max_items,
+        'compact': compact,
+    }
+
+    for pieces, line_count in parallel.map_file_chunks(
+            path, _pprint_chunk, (options, line_filter), jobs,
+            chunk_size):
+        for piece in pieces:
+            if type(piece) is str:
+                outfile.write(piece)
+            else:
+                line, reason = piece
+                e = parser.ParseError(reason, first_line + line - 1)
+                outfile.flush()
+                print('Error: parse error: {}'.format(e), file=sys.stderr)
+                errors += 1
+
+        first_line += line_count
+
+    return errors
+
+
 def main():
     argparser = argparse.ArgumentParser(description='Pretty-print some GDB MI records')
     argparser.add_argument('input_file',
@@ -34,29 +194,116 @@ def main():
                            help='The file from which to read the MI data. Use - for stdin.')
     argparser.add_argument('-c', '--colors', action='store_true',
                            help='Enable colored output, if possible')
+    argparser.add_argument('-j', '--jobs', type=int, default=1,
+                           help='Number of processes to parse the input '
+                                'file with (not available with stdin)')
+    argparser.add_argument('--only', metavar='PATTERNS',
+                           help='Only print the result and async records '
+                                'matching one of these comma-separated '
+                                'patterns (e.g. \'*stopped,=breakpoint-*\')')
+    argparser.add_argument('--no-streams', action='store_true',
+                           help='Do not print stream records')
+    argparser.add_argument('--max-depth', type=int,
+                           help='Elide the lists and tuples nested deeper '
+                                'than this number of levels (not available '
+                                'with --format ndjson)')
+    argparser.add_argument('--max-items', type=int,
+                           help='Only print this number of results or '
+                                'elements of each record, list and tuple '
+                                '(not available with --format ndjson)')
+    argparser.add_argument('--compact', action='store_true',
+                           help='Print each record on a single line (not '
+                                'available with --format ndjson)')
+    argparser.add_argument('--format', choices=('pretty', 'ndjson'),
+                           default='pretty',
+                           help='Output format: pretty-printed records '
+                                '(default), or one JSON object per record')
+    argparser.add_argument('--stats', action='store_true',
+                           help='Print statistics about the parsed records '
+                                'on the standard error at the end (not '
+                                'available with --jobs)')
+    argparser.add_argument('--cache', metavar='CACHE-FILE',
+                           help='Load the parsed records from this cache '
+                                'file if it is up to date, otherwise parse '
+                                'the input file and write the cache file '
+                                '(not available with stdin, --jobs, --only '
+                                'and --no-streams)')
 
     args = argparser.parse_args()
     input_file = args.input_file
 
+    if args.format == 'ndjson' and (args.max_depth is not None or
+                                    args.max_items is not None or
+                                    args.compact):
+        argparser.error('--max-depth, --max-items and --compact are not '
+                        'available with --format ndjson')
+
+    try:
+        visitor = _make_visitor(args.format, sys.stdout,
+                                en_colors=args.colors,
+                                max_depth=args.max_depth,
+                                max_items=args.max_items,
+                                compact=args.compact)
+    except ValueError as e:
+        argparser.error(str(e))
+
+    if args.jobs < 1:
+        argparser.error('the number of jobs must be at least 1')
+
+    if args.stats and args.jobs > 1:
+        argparser.error('--stats is not available with --jobs')
+
+    if args.cache is not None:
+        if input_file == '-' or args.jobs > 1:
+            argparser.error('--cache is not available with stdin and --jobs')
+
+        if args.only is not None or args.no_streams:
+            argparser.error('--cache is not available with --only and '
+                            '--no-streams')
+
+    stats = parser.ParseStats() if args.stats else None
+
+    line_filter = None
+
+    if args.only is not None or args.no_streams:
+        only = None if args.only is None else args.only.split(',')
+
+        try:
+            line_filter = parser.RecordFilter(only, not args.no_streams)
+        except ValueError as e:
+            argparser.error(str(e))
+
     if input_file == '-':
-        mi_output = sys.stdin.read()
+        if args.jobs > 1:
+            argparser.error('--jobs is not available when reading stdin')
+
+        errors = pprint_stream(sys.stdin.buffer, visitor, line_filter, stats)
     else:
         try:
-            with open(input_file) as f:
-                mi_output = f.read()
+            if args.cache is not None:
+                errors = pprint_cached(input_file, args.cache, visitor,
+                                       stats)
+            elif args.jobs > 1:
+                errors = pprint_parallel(input_file, args.jobs,
+                                         en_colors=args.colors,
+                                         line_filter=line_filter,
+                                         max_depth=args.max_depth,
+                                         max_items=args.max_items,
+                                         compact=args.compact,
+                                         format_=args.format)
+            else:
+                with open(input_file, 'rb') as f:
+                    errors = pprint_stream(f, visitor, line_filter, stats)
         except FileNotFoundError as e:
             print('Error: file not found: {}'.format(e), file=sys.stderr)
             sys.exit(1)
 
-    try:
-        tree = parser.parse(mi_output, False)
-    except parser.ParseError as e:
-        print('Error: parse error: {}'.format(e),
-              file=sys.stderr)
-        sys.exit(1)
+    if stats is not None:
+        sys.stdout.flush()
+        sys.stderr.write(stats.summary())
 
-    visitor = visitors.PrettyPrintVisitor(en_colors=args.colors)
-    visitor.visit(tree)
+    if errors:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
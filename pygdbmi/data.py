@@ -0,0 +1,175 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Simon Marchi <simon.marchi@polymtl.ca>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+import re
+import array
+import typing
+import itertools
+from pygdbmi import parser
+from pygdbmi import schemas
+
+
+# array typecodes of unsigned integers by size in bytes.
+_TYPECODES = {array.array(c).itemsize: c for c in 'BHILQ'}
+
+_HEX_WORD_RE = re.compile(r'0x[0-9a-fA-F]{1,16}\Z')
+
+# Raw lines are scanned with these, relying on the layout of GDB's output.
+_DATA_RE = re.compile(r'data=\[([^\]]*)\]')
+_DATA_WORD_RE = re.compile(r'"(0x[0-9a-fA-F]+)"')
+_REGISTER_RE = re.compile(r'\{number="([0-9]+)",'
+                          r'value="(0x[0-9a-fA-F]{1,16})"\}')
+
+
+def _hex_bytes(value):
+    return bytes.fromhex(schemas._str(value))
+
+
+def _strings(value):
+    # Elements of a list of values, as a node (frozen or not) or a
+    # native list: C-string values or tuples.
+    if isinstance(value, parser.Value):
+        value = value.value
+
+    if isinstance(value, (list, tuple)):
+        return value
+
+    return [_str_or_node(e.value) for e in value.elements]
+
+
+def _str_or_node(value):
+    return value.value if isinstance(value, parser.CString) else value
+
+
+def _row_data(row):
+    # Value of the `data` result of a `-data-read-memory` row.
+    if isinstance(row, dict):
+        return row['data']
+
+    for result in row.elements:
+        if result.variable.name == 'data':
+            return result.value
+
+    return []
+
+
+def _hex_array(typecode, strings):
+    # Converts hex numbers to an array without keeping an int per number.
+    return array.array(typecode, map(int, strings, itertools.repeat(16)))
+
+
+def _numpy_array(arr):
+    import numpy
+
+    return numpy.frombuffer(arr, 'u{}'.format(arr.itemsize))
+
+
+class MemoryBlock(typing.NamedTuple):
+    begin: int = None
+    offset: int = None
+    end: int = None
+    contents: bytes = None
+
+
+_MEMORY_BLOCKS = schemas.TupleOf(schemas.Schema(MemoryBlock, {
+    'begin': schemas._address,
+    'offset': schemas._address,
+    'end': schemas._address,
+    'contents': _hex_bytes,
+}))
+
+
+def read_memory_bytes(record):
+    '''
+    Decodes the memory blocks of a `-data-read-memory-bytes` result:
+    `record` is either the raw result line or the value of its `memory`
+    result (a node or a native list). Returns a tuple of `MemoryBlock`
+    objects, whose `contents` are `bytes` objects converted from hex in
+    a single pass.
+    '''
+    if type(record) is str:
+        return tuple([_MEMORY_BLOCKS._decode_element(block.value)
+                      for block in parser.iter_list(record, 'memory')])
+
+    return _MEMORY_BLOCKS.decode(record)
+
+
+def read_memory(record, word_size, numpy=False):
+    '''
+    Decodes the words of a `-data-read-memory` result, read with the
+    `x` format and words of `word_size` bytes: `record` is either the
+    raw result line or the value of its `memory` result (a node or a
+    native list).
+
+    Returns the words of all the rows as an `array.array` of unsigned
+    integers of `word_size` bytes, or a NumPy array if `numpy` is true
+    (NumPy must be installed). The words of a raw line are extracted
+    with regular expressions, without parsing it.
+    '''
+    if type(record) is str:
+        strings = itertools.chain.from_iterable(
+            _DATA_WORD_RE.findall(m.group(1))
+            for m in _DATA_RE.finditer(record))
+    else:
+        strings = itertools.chain.from_iterable(
+            _strings(_row_data(row)) for row in _strings(record))
+
+    words = _hex_array(_TYPECODES[word_size], strings)
+
+    return _numpy_array(words) if numpy else words
+
+
+def register_values(record, numpy=False):
+    '''
+    Decodes the values of a `-data-list-register-values x` result:
+    `record` is either the raw result line or the value of its
+    `register-values` result (a node or a native list).
+
+    Returns a `(numbers, values)` tuple of arrays of unsigned integers
+    (`array.array` objects, or NumPy arrays if `numpy` is true),
+    `values` being 64-bit. Registers whose values aren't hex numbers
+    fitting in 64 bits (e.g. vector registers) are left out. The values
+    of a raw line are extracted with regular expressions, without
+    parsing it.
+    '''
+    if type(record) is str:
+        registers = _REGISTER_RE.findall(record)
+        numbers = [r[0] for r in registers]
+        values = [r[1] for r in registers]
+    else:
+        registers = schemas.decode('register-values', record)
+        numbers = [r.number for r in registers]
+        values = [r.value for r in registers]
+        scalar = [_HEX_WORD_RE.match(v) is not None for v in values]
+
+        if not all(scalar):
+            numbers = list(itertools.compress(numbers, scalar))
+            values = list(itertools.compress(values, scalar))
+
+    numbers = array.array(_TYPECODES[4], map(int, numbers))
+    values = _hex_array(_TYPECODES[8], values)
+
+    if numpy:
+        return _numpy_array(numbers), _numpy_array(values)
+
+    return numbers, values
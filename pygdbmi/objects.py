@@ -20,43 +20,291 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-class ResultRecord:
-    def __init__(self, token):
+from pygdbmi import parser
+from pygdbmi import schemas
+
+
+def _decode(value):
+    # Converts a `Value` node to plain Python objects, as in native mode,
+    # without recursion.
+    return parser._native_value(value)
+
+
+def _decode_result(result):
+    return result.variable.name, _decode(result.value)
+
+
+def _field(name):
+    # Property returning the decoded value of the result named `name`.
+    return property(lambda self: self._result(name),
+                    doc='Value of the `{}` result.'.format(name))
+
+
+class Record:
+    '''
+    Base of the records carrying results (`Result` nodes), which are
+    decoded to plain Python objects (as in native mode) on first access
+    only, one result at a time.
+
+    The C-strings of the fields (e.g. `StoppedAsyncRecord.reason`) have
+    their escape sequences decoded (see `parser.unescape()`), as the
+    output of stream records. Those of `results` are left as is, as in
+    native mode.
+    '''
+
+    def __init__(self, token, results=()):
         self._token = token
+        self._result_nodes = results
+        self._decoded = {}
+        self._results = None
 
     @property
     def token(self):
         return self._token
 
-
-class DoneResultRecord(ResultRecord):
-    def __init__(self, token, results):
-        self._results = results
-        super().__init__(token)
-
     @property
     def results(self):
+        if self._results is None:
+            self._results = parser._native_results(
+                [_decode_result(r) for r in self._result_nodes])
+
         return self._results
 
+    def decode(self, name):
+        '''
+        Returns the result named `name` decoded by the decoder registered
+        for this name (see `schemas.decode()`), or `None` if there's no
+        such result. Unlike the fields, the value isn't cached.
+        '''
+        for result in self._result_nodes:
+            if result.variable.name == name:
+                return schemas.decode(name, result.value)
+
+        return None
+
+    def _result(self, name):
+        try:
+            return self._decoded[name]
+        except KeyError:
+            pass
+
+        value = None
+
+        for result in self._result_nodes:
+            if result.variable.name == name:
+                value = parser._native_value(result.value, decoded=True)
+                break
+
+        self._decoded[name] = value
+
+        return value
+
+
+class ResultRecord(Record):
+    pass
+
+
+class DoneResultRecord(ResultRecord):
+    pass
+
+
+class RunningResultRecord(DoneResultRecord):
+    pass
+
 
 class ConnectedResultRecord(ResultRecord):
     pass
 
 
 class ErrorResultRecord(ResultRecord):
-    def __init__(self, token, msg, code):
-        self._msg = msg
-        self._code = code
-        super().__init__(token)
+    msg = _field('msg')
+    code = _field('code')
+
+
+class ExitResultRecord(ResultRecord):
+    pass
+
+
+_RESULT_RECORD_CLASSES = {
+    'done': DoneResultRecord,
+    'running': RunningResultRecord,
+    'connected': ConnectedResultRecord,
+    'error': ErrorResultRecord,
+    'exit': ExitResultRecord,
+}
+
+
+def result_record(token, result_class, results):
+    '''
+    Creates the result record object for the result class
+    `result_class`, with the `Result` nodes `results`.
+    '''
+    return _RESULT_RECORD_CLASSES[result_class](token, results)
+
+
+class AsyncRecord(Record):
+    def __init__(self, token, async_class, results=()):
+        self._async_class = async_class
+        super().__init__(token, results)
 
     @property
-    def msg(self):
-        return self._msg
+    def async_class(self):
+        return self._async_class
+
+
+class ExecAsyncRecord(AsyncRecord):
+    pass
+
+
+class StatusAsyncRecord(AsyncRecord):
+    pass
+
+
+class NotifyAsyncRecord(AsyncRecord):
+    pass
+
+
+class RunningAsyncRecord(ExecAsyncRecord):
+    thread_id = _field('thread-id')
+
+
+class StoppedAsyncRecord(ExecAsyncRecord):
+    reason = _field('reason')
+    thread_id = _field('thread-id')
+    stopped_threads = _field('stopped-threads')
+    core = _field('core')
+    frame = _field('frame')
+    bkptno = _field('bkptno')
+    signal_name = _field('signal-name')
+    exit_code = _field('exit-code')
+
+
+class ThreadGroupAddedAsyncRecord(NotifyAsyncRecord):
+    id = _field('id')
+
+
+class ThreadGroupRemovedAsyncRecord(NotifyAsyncRecord):
+    id = _field('id')
+
+
+class ThreadGroupStartedAsyncRecord(NotifyAsyncRecord):
+    id = _field('id')
+    pid = _field('pid')
+
+
+class ThreadGroupExitedAsyncRecord(NotifyAsyncRecord):
+    id = _field('id')
+    exit_code = _field('exit-code')
+
+
+class ThreadCreatedAsyncRecord(NotifyAsyncRecord):
+    id = _field('id')
+    group_id = _field('group-id')
+
+
+class ThreadExitedAsyncRecord(NotifyAsyncRecord):
+    id = _field('id')
+    group_id = _field('group-id')
+
+
+class ThreadSelectedAsyncRecord(NotifyAsyncRecord):
+    id = _field('id')
+    frame = _field('frame')
+
+
+class LibraryLoadedAsyncRecord(NotifyAsyncRecord):
+    id = _field('id')
+    target_name = _field('target-name')
+    host_name = _field('host-name')
+    symbols_loaded = _field('symbols-loaded')
+    thread_group = _field('thread-group')
+
+
+class LibraryUnloadedAsyncRecord(NotifyAsyncRecord):
+    id = _field('id')
+    target_name = _field('target-name')
+    host_name = _field('host-name')
+    thread_group = _field('thread-group')
+
+
+class BreakpointCreatedAsyncRecord(NotifyAsyncRecord):
+    bkpt = _field('bkpt')
+
+
+class BreakpointModifiedAsyncRecord(NotifyAsyncRecord):
+    bkpt = _field('bkpt')
+
+
+class BreakpointDeletedAsyncRecord(NotifyAsyncRecord):
+    id = _field('id')
+
+
+_ASYNC_RECORD_CLASSES = {
+    'exec': {
+        'running': RunningAsyncRecord,
+        'stopped': StoppedAsyncRecord,
+    },
+    'status': {},
+    'notify': {
+        'thread-group-added': ThreadGroupAddedAsyncRecord,
+        'thread-group-removed': ThreadGroupRemovedAsyncRecord,
+        'thread-group-started': ThreadGroupStartedAsyncRecord,
+        'thread-group-exited': ThreadGroupExitedAsyncRecord,
+        'thread-created': ThreadCreatedAsyncRecord,
+        'thread-exited': ThreadExitedAsyncRecord,
+        'thread-selected': ThreadSelectedAsyncRecord,
+        'library-loaded': LibraryLoadedAsyncRecord,
+        'library-unloaded': LibraryUnloadedAsyncRecord,
+        'breakpoint-created': BreakpointCreatedAsyncRecord,
+        'breakpoint-modified': BreakpointModifiedAsyncRecord,
+        'breakpoint-deleted': BreakpointDeletedAsyncRecord,
+    },
+}
+
+_ASYNC_RECORD_BASE_CLASSES = {
+    'exec': ExecAsyncRecord,
+    'status': StatusAsyncRecord,
+    'notify': NotifyAsyncRecord,
+}
+
+
+def async_record(type_, token, async_class, results):
+    '''
+    Creates the async record object for the async class `async_class`
+    of an `'exec'`, `'status'` or `'notify'` record (`type_`), with the
+    `Result` nodes `results`. Unknown classes get a generic
+    `ExecAsyncRecord`, `StatusAsyncRecord` or `NotifyAsyncRecord`.
+    '''
+    cls = _ASYNC_RECORD_CLASSES[type_].get(async_class,
+                                           _ASYNC_RECORD_BASE_CLASSES[type_])
+
+    return cls(token, async_class, results)
+
+
+class StreamRecord:
+    def __init__(self, output):
+        self._output = output
+        self._decoded = None
 
     @property
-    def code(self):
-        return self._code
+    def output(self):
+        '''
+        The output, with its escape sequences decoded (see
+        `parser.unescape()`).
+        '''
+        if self._decoded is None:
+            self._decoded = parser.unescape(self._output)
 
+        return self._decoded
 
-class ExitResultRecord(ResultRecord):
+
+class ConsoleStreamRecord(StreamRecord):
+    pass
+
+
+class TargetStreamRecord(StreamRecord):
+    pass
+
+
+class LogStreamRecord(StreamRecord):
     pass
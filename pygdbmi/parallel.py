@@ -0,0 +1,164 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Simon Marchi <simon.marchi@polymtl.ca>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+import os
+import collections
+from pygdbmi import parser
+
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def _file_chunks(path, chunk_size):
+    # Yields (start, end) offsets splitting the file at `path` in chunks of
+    # about `chunk_size` bytes, each ending at the end of a line.
+    size = os.path.getsize(path)
+    start = 0
+
+    with open(path, 'rb') as f:
+        while start < size:
+            f.seek(min(start + chunk_size, size))
+            end = f.tell() + len(f.readline())
+            yield start, end
+            start = end
+
+
+def read_chunk(path, start, end):
+    '''
+    Returns the text of the chunk of the file at `path` between the
+    offsets `start` and `end`.
+    '''
+    with open(path, 'rb') as f:
+        f.seek(start)
+
+        return f.read(end - start).decode()
+
+
+def parse_chunk_lines(text, **kwargs):
+    '''
+    Parses the lines of `text` with a `StreamParser` created with
+    `kwargs`, and returns a list of records and a list of errors. Each
+    error is a tuple: the index of the record following the bad line,
+    the line number in `text` and the `ParseError` reason. Bad lines are
+    skipped.
+    '''
+    stream_parser = parser.StreamParser(**kwargs)
+    records = []
+    errors = []
+
+    # Feed one line at a time, so that an error's position among the
+    # records is known.
+    for line in text.splitlines(True) + [None]:
+        try:
+            if line is None:
+                records += stream_parser.close()
+            else:
+                records += stream_parser.feed(line)
+        except parser.ParseError as e:
+            errors.append((len(records), e.line, e.reason))
+
+    return records, errors
+
+
+def _parse_chunk(path, start, end, native, intern_values, line_filter):
+    text = read_chunk(path, start, end)
+    records, errors = parse_chunk_lines(text, native=native,
+                                        intern_values=intern_values,
+                                        line_filter=line_filter)
+
+    return records, errors, text.count('\n')
+
+
+def map_file_chunks(path, fn, args=(), jobs=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE):
+    '''
+    Splits the file at `path` in line-aligned chunks of about
+    `chunk_size` bytes, calls `fn(path, start, end, *args)` for each
+    chunk (`start` and `end` being its offsets in the file) in a pool of
+    `jobs` processes (the number of CPUs by default), and yields the
+    results in the order of the chunks.
+
+    At most two chunks per job are in flight at once.
+    '''
+    # Imported here, as it's slow to import and only needed here.
+    import concurrent.futures
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        pending = collections.deque()
+        chunks = _file_chunks(path, chunk_size)
+
+        while True:
+            for start, end in chunks:
+                pending.append(executor.submit(fn, path, start, end, *args))
+
+                if len(pending) >= 2 * jobs:
+                    break
+
+            if not pending:
+                return
+
+            yield pending.popleft().result()
+
+
+def parse_file_parallel(path, jobs=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                        native=False, intern_values=False, on_error=None,
+                        line_filter=None):
+    '''
+    Parses the MI records of the file at `path` using `jobs` processes
+    (the number of CPUs by default), and yields them in order.
+
+    The file is split in line-aligned chunks of about `chunk_size`
+    bytes (see `map_file_chunks()`), which are parsed like a
+    `StreamParser` would, with the given `native`, `intern_values` and
+    `line_filter` options (`line_filter` must be picklable). Native
+    mode scales best, since its records are much cheaper to transfer
+    between processes than nodes.
+
+    If a line can't be parsed, `on_error` is called with the
+    `ParseError` if set, and the line is skipped; otherwise, the
+    `ParseError` is raised once the records of the preceding lines are
+    yielded.
+    '''
+    first_line = 1
+    results = map_file_chunks(path, _parse_chunk,
+                              (native, intern_values, line_filter), jobs,
+                              chunk_size)
+
+    for records, errors, line_count in results:
+        index = 0
+
+        for error_index, line, reason in errors:
+            yield from records[index:error_index]
+            index = error_index
+            error = parser.ParseError(reason, first_line + line - 1)
+
+            if on_error is None:
+                raise error
+
+            on_error(error)
+
+        yield from records[index:]
+        first_line += line_count
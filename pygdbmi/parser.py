@@ -21,15 +21,169 @@
 # THE SOFTWARE.
 
 import re
-import pypeg2
-import pygdbmi.objects
+import sys
+import time
+import codecs
+import collections
+
+
+class _LazyRegex:
+    '''
+    Regular expression compiled when first used, for the ones which
+    most programs don't need, to keep their compilation out of the
+    import. Its methods are those of the compiled pattern.
+    '''
+
+    _METHODS = ('match', 'fullmatch', 'search', 'sub', 'subn', 'split',
+                'findall', 'finditer')
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def __getattr__(self, name):
+        regex = re.compile(self.pattern)
+
+        # Bind the methods to this object so that this isn't called again.
+        for method in self._METHODS:
+            setattr(self, method, getattr(regex, method))
+
+        return getattr(regex, name)
+
+
+# Escapes which codecs.escape_decode() doesn't decode like GDB (e.g. `\e`),
+# or rejects (a trailing backslash, which _CSTRING_RE accepts). Values
+# with such escapes are decoded with _ESCAPE_RE.
+_UNSAFE_ESCAPE_RE = _LazyRegex(
+    r'\\(?:[^0-7abfnrtv"\'\\]|[4-7][0-7]{2}|\Z)')
+_ESCAPE_RE = _LazyRegex(rb'(?s)\\([0-7]{1,3}|.)')
+_NAMED_ESCAPES = {
+    b'a': b'\a', b'b': b'\b', b'e': b'\x1b', b'f': b'\f', b'n': b'\n',
+    b'r': b'\r', b't': b'\t', b'v': b'\v',
+}
+
+
+def _unescape_match(m):
+    escape = m.group(1)
+
+    if escape[0] in b'01234567':
+        return bytes([int(escape, 8) & 0xff])
+
+    # Unknown escapes stand for the escaped character.
+    return _NAMED_ESCAPES.get(escape, escape)
+
+
+def unescape(value):
+    '''
+    Decodes the escape sequences of the C-string value `value` (the
+    text between its quotes), e.g. `\\n`, `\\"` or octal escapes,
+    which encode UTF-8 bytes. Invalid UTF-8 sequences are decoded as
+    lone surrogates (the `surrogateescape` error handler), which
+    `escape()` encodes back.
+    '''
+    if '\\' not in value:
+        return value
+
+    if _UNSAFE_ESCAPE_RE.search(value) is None:
+        data = codecs.escape_decode(value.encode())[0]
+    else:
+        data = _ESCAPE_RE.sub(_unescape_match, value.encode())
+
+    return data.decode('utf-8', 'surrogateescape')
+
+
+_NEEDS_ESCAPE_RE = _LazyRegex('[\x00-\x1f"\\\\\x7f\udc80-\udcff]')
+# Characters escaped by _escape_match(), once the common ones are replaced.
+_OTHER_ESCAPE_RE = _LazyRegex('[\x00-\x08\x0b-\x1f\x7f\udc80-\udcff]')
+_CHAR_ESCAPES = {
+    '\a': '\\a', '\b': '\\b', '\f': '\\f', '\r': '\\r', '\v': '\\v',
+}
+
+
+def _escape_match(m):
+    c = m.group()
+    escape = _CHAR_ESCAPES.get(c)
+
+    if escape is not None:
+        return escape
+
+    # Lone surrogates stand for the bytes of invalid UTF-8 sequences.
+    code = ord(c)
+
+    return '\\{:03o}'.format(code - 0xdc00 if code > 0xff else code)
+
+
+def escape(text):
+    '''
+    Encodes `text` as the value of a C-string (without the quotes), for
+    instance to build an MI command: the reverse of `unescape()`.
+    Control characters, quotes and backslashes are escaped; other
+    characters are kept as is.
+    '''
+    if _NEEDS_ESCAPE_RE.search(text) is None:
+        return text
+
+    text = text.replace('\\', '\\\\').replace('"', '\\"')
+    text = text.replace('\n', '\\n').replace('\t', '\\t')
+
+    if _OTHER_ESCAPE_RE.search(text) is not None:
+        text = _OTHER_ESCAPE_RE.sub(_escape_match, text)
+
+    return text
 
 
 class CString:
-    grammar = re.compile(r'"(\\.|[^"])*"')
+    __slots__ = ('_value', '_utf8', '_decoded')
 
     def __init__(self, string):
-        self.value = string[1:-1]
+        self._value = string[1:-1]
+        self._decoded = None
+
+    @classmethod
+    def from_utf8(cls, data):
+        '''
+        Creates a C-string from the UTF-8 encoded text between its quotes,
+        `data`, which is only decoded when `value` is first accessed.
+        Invalid UTF-8 sequences are decoded as lone surrogates, as by
+        `unescape()`.
+        '''
+        cstring = cls.__new__(cls)
+        cstring._value = None
+        cstring._utf8 = data
+        cstring._decoded = None
+
+        return cstring
+
+    @property
+    def value(self):
+        if self._value is None:
+            self._value = self._utf8.decode('utf-8', 'surrogateescape')
+            self._utf8 = None
+
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self._decoded = None
+
+    @property
+    def decoded(self):
+        '''
+        The value with its escape sequences decoded (see `unescape()`),
+        computed on first access.
+        '''
+        decoded = self._decoded
+
+        if decoded is None:
+            decoded = unescape(self.value)
+            # Bypass __setattr__, which frozen nodes forbid: caching the
+            # decoded value doesn't change the node.
+            _set_decoded(self, decoded)
+
+        return decoded
+
+    def __reduce__(self):
+        return CString, ('"' + self.value + '"',)
 
     def __str__(self):
         v = self.value.replace('&', '&amp;')
@@ -39,27 +193,38 @@ class CString:
         return '<c-string>{}</c-string>'.format(v)
 
 
+_set_decoded = CString._decoded.__set__
+
+
 class Variable:
-    grammar = re.compile(r'^[A-Za-z_-][A-Za-z_0-9-]*')
+    __slots__ = ('name',)
 
     def __init__(self, name):
-        self.name = name
+        self.name = sys.intern(name)
+
+    def __reduce__(self):
+        return Variable, (self.name,)
 
     def __str__(self):
         return '<variable>{}</variable>'.format(self.name)
 
 
 class Result:
+    __slots__ = ('variable', 'value')
+
     def __init__(self, args):
         self.variable = args[0]
         self.value = args[1]
 
+    def __reduce__(self):
+        return Result, ([self.variable, self.value],)
+
     def __str__(self):
         return '<result>{}{}</result>'.format(self.variable, self.value)
 
 
 class Tuple:
-    grammar = '{', pypeg2.optional(pypeg2.csl(Result)), '}'
+    __slots__ = ('elements',)
 
     def __init__(self, elements=[]):
         if type(elements) is list:
@@ -67,28 +232,28 @@ class Tuple:
         else:
             self.elements = [elements]
 
-    def __str__(self):
-        ret = '<tuple>'
-
-        for elem in self.elements:
-            ret += str(elem)
+    def __reduce__(self):
+        return Tuple, (list(self.elements),)
 
-        ret += '</tuple>'
-
-        return ret
+    def __str__(self):
+        return '<tuple>{}</tuple>'.format(''.join(map(str, self.elements)))
 
 
 class Value:
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
+    def __reduce__(self):
+        return Value, (self.value,)
 
     def __str__(self):
         return '<value>{}</value>'.format(self.value)
 
 
 class List:
-    grammar = '[', pypeg2.optional([pypeg2.csl(Value), pypeg2.csl(Result)]), ']'
+    __slots__ = ('elements',)
 
     def __init__(self, elements=[]):
         if type(elements) is list:
@@ -96,134 +261,138 @@ class List:
         else:
             self.elements = [elements]
 
-    def __str__(self):
-        ret = '<list>'
-
-        for elem in self.elements:
-            ret += str(elem)
+    def __reduce__(self):
+        return List, (list(self.elements),)
 
-        ret += '</list>'
-
-        return ret
-
-
-Value.grammar = [CString, Tuple, List]
-Result.grammar = Variable, '=', Value
+    def __str__(self):
+        return '<list>{}</list>'.format(''.join(map(str, self.elements)))
 
 
 class Token:
     '''
     The token is the optional identifier used to match commands and responses.
     '''
-    grammar = re.compile(r'[0-9]+')
+    __slots__ = ('value',)
 
     def __init__(self, value):
         self.value = int(value)
 
+    def __reduce__(self):
+        return Token, (self.value,)
+
     def __str__(self):
         return '<token>{}</token>'.format(self.value)
 
 
-_Nl = pypeg2.ignore(re.compile(r'\r\n|\r|\n'))
-
-
 class ResultRecord:
-    grammar = (
-        pypeg2.optional(Token),
-        '^',
-        re.compile(r'done|running|connected|error|exit'),
-        pypeg2.optional((',', pypeg2.csl(Result))),
-        _Nl
-    )
+    __slots__ = ('token', 'result_class', 'results')
 
     def __init__(self, args):
         self.token = None
 
-        if type(args[0]) is Token:
+        if isinstance(args[0], Token):
             self.token = args[0]
             args.pop(0)
 
-        self.result_class = args[0]
+        self.result_class = sys.intern(args[0])
         args.pop(0)
         self.results = args
 
+    def __reduce__(self):
+        if self.token is None:
+            args = [self.result_class]
+        else:
+            args = [self.token, self.result_class]
+
+        return ResultRecord, (args + list(self.results),)
+
     def __str__(self):
         fmt = '<result-record><token>{}</token><result-class>{}</result-class><results>{}</results></result-record>'
-        results = ''
-
-        for result in self.results:
-            results += str(result)
+        results = ''.join(map(str, self.results))
 
         return fmt.format(self.token, self.result_class, results)
 
 
 class _StreamOutput:
+    __slots__ = ('output',)
+
     def __init__(self, cstr):
         self.output = cstr
 
+    def __reduce__(self):
+        return type(self), (self.output,)
+
     def __str__(self):
         fmt = '<{xn}>{output}</{xn}>'
 
         return fmt.format(xn=self._xml_name, output=self.output)
 
 class ConsoleStreamOutput(_StreamOutput):
-    grammar = '~', CString, _Nl
+    __slots__ = ()
     _xml_name = 'console-stream-output'
 
 
 class TargetStreamOutput(_StreamOutput):
-    grammar = '@', CString, _Nl
+    __slots__ = ()
     _xml_name = 'target-stream-output'
 
 
 class LogStreamOutput(_StreamOutput):
-    grammar = '&', CString, _Nl
+    __slots__ = ()
     _xml_name = 'log-stream-output'
 
 
 class StreamRecord:
-    grammar = [ConsoleStreamOutput, TargetStreamOutput, LogStreamOutput]
+    __slots__ = ('output',)
 
     def __init__(self, output):
         self.output = output
 
+    def __reduce__(self):
+        return StreamRecord, (self.output,)
+
     def __str__(self):
         fmt = '<stream-record>{}</stream-record>'
 
         return fmt.format(self.output)
 
 
-_AsyncClass = re.compile(r'[a-zA-Z][a-zA-Z0-9_-]+')
-
-
 class AsyncOutput:
-    grammar = _AsyncClass, pypeg2.optional((',', pypeg2.csl(Result)))
+    __slots__ = ('async_class', 'results')
 
     def __init__(self, args):
-        self.async_class = args[0]
+        self.async_class = sys.intern(args[0])
         args.pop(0)
         self.results = args
 
+    def __reduce__(self):
+        return AsyncOutput, ([self.async_class] + list(self.results),)
+
     def __str__(self):
         fmt = '<async-output><async-class>{}</async-class><results>{}</results></async-output>'
-        results = ''
-
-        for result in self.results:
-            results += str(result)
+        results = ''.join(map(str, self.results))
 
         return fmt.format(self.async_class, results)
 
 
 class _AsyncOutput:
+    __slots__ = ('token', 'output')
+
     def __init__(self, args):
         self.token = None
 
-        if type(args[0]) is Token:
+        if isinstance(args[0], Token):
             self.token = args[0]
             args.pop(0)
 
         self.output = args[0]
 
+    def __reduce__(self):
+        if self.token is None:
+            return type(self), ([self.output],)
+
+        return type(self), ([self.token, self.output],)
+
     def __str__(self):
         fmt = '<{xn}><token>{token}</token>{output}</{xn}>'
 
@@ -232,26 +401,29 @@ class _AsyncOutput:
 
 
 class NotifyAsyncOutput(_AsyncOutput):
-    grammar = pypeg2.optional(Token), '=', AsyncOutput, _Nl
+    __slots__ = ()
     _xml_name = 'notify-async-output'
 
 
 class StatusAsyncOutput(_AsyncOutput):
-    grammar = pypeg2.optional(Token), '+', AsyncOutput, _Nl
+    __slots__ = ()
     _xml_name = 'status-async-output'
 
 
 class ExecAsyncOutput(_AsyncOutput):
-    grammar = pypeg2.optional(Token), '*', AsyncOutput, _Nl
+    __slots__ = ()
     _xml_name = 'exec-async-output'
 
 
 class AsyncRecord:
-    grammar = [NotifyAsyncOutput, StatusAsyncOutput, ExecAsyncOutput]
+    __slots__ = ('output',)
 
     def __init__(self, output):
         self.output = output
 
+    def __reduce__(self):
+        return AsyncRecord, (self.output,)
+
     def __str__(self):
         fmt = '<async-record>{}</async-record>'
 
@@ -259,11 +431,14 @@ class AsyncRecord:
 
 
 class OutOfBandRecord:
-    grammar = [AsyncRecord, StreamRecord]
+    __slots__ = ('record',)
 
     def __init__(self, record):
         self.record = record
 
+    def __reduce__(self):
+        return OutOfBandRecord, (self.record,)
+
     def __str__(self):
         fmt = '<out-of-band-record>{}</out-of-band-record>'
 
@@ -271,30 +446,27 @@ class OutOfBandRecord:
 
 
 class Output:
-    grammar = (
-        pypeg2.maybe_some(OutOfBandRecord),
-        pypeg2.optional(ResultRecord),
-        '(gdb)',
-        _Nl
-    )
+    __slots__ = ('oob_records', 'result_record')
 
     def __init__(self, args):
         self.oob_records = []
         self.result_record = None
 
         for arg in args:
-            if type(arg) is OutOfBandRecord:
+            if isinstance(arg, OutOfBandRecord):
                 self.oob_records.append(arg)
-            elif type(arg) is ResultRecord:
+            elif isinstance(arg, ResultRecord):
                 self.result_record = arg
 
-    def __str__(self):
-        fmt = '<output><out-of-band-records>{}</out-of-band-records>{}</output>'
-        oob_records = ''
+    def __reduce__(self):
+        if self.result_record is None:
+            return Output, (list(self.oob_records),)
 
-        for oob_record in self.oob_records:
-            oob_records += str(oob_record)
+        return Output, (list(self.oob_records) + [self.result_record],)
 
+    def __str__(self):
+        fmt = '<output><out-of-band-records>{}</out-of-band-records>{}</output>'
+        oob_records = ''.join(map(str, self.oob_records))
         result_record = ''
 
         if self.result_record is not None:
@@ -303,17 +475,1640 @@ class Output:
         return fmt.format(oob_records, result_record)
 
 
+def _read_only(node, *args):
+    raise AttributeError('{} objects are read-only'
+                         .format(type(node).__name__))
+
+
+def _frozen_reduce(node):
+    fn, args = type(node).__bases__[0].__reduce__(node)
+
+    if fn is type(node):
+        fn = type(node).__bases__[0]
+
+    return _new_frozen, (fn, args)
+
+
+def _new_frozen(fn, args):
+    return freeze(fn(*args))
+
+
+# Node class -> frozen subclass, and node class -> names of its slots.
+_FROZEN_CLASSES = {}
+_SLOT_NAMES = {}
+
+
+def _slot_names(cls):
+    names = _SLOT_NAMES.get(cls)
+
+    if names is None:
+        names = _SLOT_NAMES[cls] = [
+            name for c in cls.__mro__ for name in c.__dict__.get('__slots__',
+                                                                 ())]
+
+    return names
+
+
+def _frozen_class(cls):
+    # Returns the frozen subclass of the node class `cls`.
+    frozen_cls = _FROZEN_CLASSES.get(cls)
+
+    if frozen_cls is None:
+        frozen_cls = _FROZEN_CLASSES[cls] = type(
+            'Frozen' + cls.__name__.lstrip('_'), (cls,), {
+                '__slots__': (),
+                '__module__': __name__,
+                '__setattr__': _read_only,
+                '__delattr__': _read_only,
+                '__reduce__': _frozen_reduce,
+            })
+
+    return frozen_cls
+
+
+def freeze(node):
+    '''
+    Makes the node tree `node` read-only, in place, and returns it.
+
+    Each node becomes an instance of a frozen subclass of its class,
+    whose attributes can't be set, and the lists of child nodes become
+    tuples. Frozen nodes can safely be shared, e.g. by `ParseCache`;
+    they're visited like the nodes of their base class.
+    '''
+    frozen_classes = set(_FROZEN_CLASSES.values())
+    # The tree is walked with an explicit stack, so that its depth is only
+    # limited by memory.
+    stack = [node]
+
+    while stack:
+        child = stack.pop()
+        cls = type(child)
+
+        if cls in frozen_classes:
+            continue
+
+        frozen_cls = _frozen_class(cls)
+        frozen_classes.add(frozen_cls)
+
+        if cls is CString:
+            # Decode a lazy value now: it can't be stored later.
+            child.value
+        else:
+            for name in _slot_names(cls):
+                value = getattr(child, name, None)
+
+                if type(value) is list:
+                    setattr(child, name, tuple(value))
+                    stack.extend(value)
+                elif not isinstance(value, (type(None), str, int)):
+                    stack.append(value)
+
+        child.__class__ = frozen_cls
+
+    return node
+
+
 class ParseError(RuntimeError):
+    '''
+    Raised when the input can't be parsed. `reason` describes the
+    problem and `line`, if known, is the number of the offending line.
+    '''
+
+    def __init__(self, reason, line=None):
+        if line is None:
+            msg = reason
+        else:
+            msg = '{} (line {})'.format(reason, line)
+
+        super().__init__(msg)
+        self.reason = reason
+        self.line = line
+
+
+_WHITESPACE_RE = re.compile(r'[\t ]*')
+_NL_RE = re.compile(r'\r\n|\r|\n')
+_TOKEN_RE = re.compile(r'[0-9]+')
+_VARIABLE_RE = re.compile(r'[A-Za-z_-][A-Za-z_0-9-]*')
+# Same as CString's grammar, in the "unrolled loop" form which the re module
+# matches much faster on long strings.
+_CSTRING_RE = re.compile(r'(?s)"[^"\\]*(?:\\.[^"\\]*)*\\?"')
+_RESULT_CLASS_RE = re.compile(r'done|running|connected|error|exit')
+_ASYNC_CLASS_RE = re.compile(r'[a-zA-Z][a-zA-Z0-9_-]+')
+
+# Tokens relevant when skipping over a value.
+_SKIP_RE = _LazyRegex(r'(?s)"[^"\\]*(?:\\.[^"\\]*)*\\?"|[\[\]{}\r\n]')
+
+_ASYNC_OUTPUT_CLASSES = {
+    '=': NotifyAsyncOutput,
+    '+': StatusAsyncOutput,
+    '*': ExecAsyncOutput,
+}
+
+_STREAM_OUTPUT_CLASSES = {
+    '~': ConsoleStreamOutput,
+    '@': TargetStreamOutput,
+    '&': LogStreamOutput,
+}
+
+
+class _Parser:
+    '''
+    Single-pass recursive-descent parser for the MI grammar.
+
+    It accepts the same language as the pypeg2 grammar (see
+    `_build_grammar()`) and builds the
+    same node objects (with the same constructor arguments), but only
+    scans the input once, without backtracking. Nested values are parsed
+    with an explicit stack rather than recursion, so that their depth is
+    only limited by memory.
+    '''
+
+    def __init__(self, text, first_line=1, intern_values=False):
+        self._text = text
+        self._pos = 0
+        self._first_line = first_line
+        self._intern_values = intern_values
+        self._skip_whitespace()
+
+    def _error(self, what):
+        line = self._first_line + self._text.count('\n', 0, self._pos)
+        raise ParseError('expecting {}'.format(what), line)
+
+    _make_value = Value
+    _make_tuple = Tuple
+    _make_list = List
+
+    @staticmethod
+    def _make_result(name, value):
+        return Result([Variable(name), value])
+
+    def _skip_whitespace(self):
+        self._pos = _WHITESPACE_RE.match(self._text, self._pos).end()
+
+    def _peek(self):
+        return self._text[self._pos:self._pos + 1]
+
+    def _match(self, regex, what):
+        m = regex.match(self._text, self._pos)
+
+        if m is None:
+            self._error(what)
+
+        self._pos = m.end()
+        self._skip_whitespace()
+
+        return m.group()
+
+    def _at(self, literal):
+        return self._text.startswith(literal, self._pos)
+
+    def _expect(self, literal):
+        if not self._at(literal):
+            self._error(repr(literal))
+
+        self._pos += len(literal)
+        self._skip_whitespace()
+
+    def _parse_value(self):
+        # Explicit stack of the containers being parsed, innermost last, so
+        # that deeply nested values don't exhaust the interpreter's stack.
+        # Each entry is `[elements, closing bracket, name]`, where `name` is
+        # the variable of the result being parsed, or `None` in a list of
+        # values.
+        stack = []
+        make_value = self._make_value
+        make_result = self._make_result
+
+        while True:
+            c = self._peek()
+
+            if c == '"':
+                value = make_value(
+                    self._cstring(self._match(_CSTRING_RE, 'c-string')))
+            elif c == '{' or c == '[':
+                self._expect(c)
+                close = '}' if c == '{' else ']'
+                c = self._peek()
+
+                if c != close:
+                    # Lists hold values or results, tuples only results.
+                    if close == ']' and c in ('"', '{', '['):
+                        name = None
+                    else:
+                        name = self._parse_name()
+
+                    stack.append([[], close, name])
+                    continue
+
+                self._expect(close)
+
+                if close == '}':
+                    value = make_value(self._make_tuple([]))
+                else:
+                    value = make_value(self._make_list([]))
+            else:
+                self._error('value')
+
+            # Add the value to its container, closing the containers it
+            # completes.
+            while stack:
+                frame = stack[-1]
+                elements, close, name = frame
+
+                if name is None:
+                    elements.append(value)
+                else:
+                    elements.append(make_result(name, value))
+
+                if self._peek() == ',':
+                    self._expect(',')
+
+                    if name is not None:
+                        frame[2] = self._parse_name()
+
+                    break
+
+                self._expect(close)
+                stack.pop()
+
+                if close == '}':
+                    value = make_value(self._make_tuple(elements))
+                else:
+                    value = make_value(self._make_list(elements))
+            else:
+                return value
+
+    def _parse_name(self):
+        name = self._match(_VARIABLE_RE, 'variable')
+        self._expect('=')
+
+        return name
+
+    def _parse_result(self):
+        name = self._parse_name()
+
+        return self._make_result(name, self._parse_value())
+
+    def _parse_elements(self, parse_element, elements):
+        elements.append(parse_element())
+
+        while self._peek() == ',':
+            self._expect(',')
+            elements.append(parse_element())
+
+        return elements
+
+    def _parse_results(self):
+        results = []
+
+        if self._peek() == ',':
+            self._expect(',')
+            self._parse_elements(self._parse_result, results)
+
+        self._match(_NL_RE, 'new line')
+
+        return results
+
+    def _cstring(self, text):
+        cstring = CString(text)
+
+        if self._intern_values:
+            cstring.value = sys.intern(cstring.value)
+
+        return cstring
+
+    @staticmethod
+    def _stream_record(sigil, cstring):
+        output = _STREAM_OUTPUT_CLASSES[sigil](cstring)
+
+        return OutOfBandRecord(StreamRecord(output))
+
+    @staticmethod
+    def _result_record(token, result_class, results):
+        if token is None:
+            args = [result_class]
+        else:
+            args = [Token(token), result_class]
+
+        args += results
+
+        return ResultRecord(args)
+
+    @staticmethod
+    def _async_record(sigil, token, async_class, results):
+        output = AsyncOutput([async_class] + results)
+
+        if token is None:
+            args = [output]
+        else:
+            args = [Token(token), output]
+
+        return OutOfBandRecord(AsyncRecord(_ASYNC_OUTPUT_CLASSES[sigil](args)))
+
+    @staticmethod
+    def _is_result_record(record):
+        return type(record) is ResultRecord
+
+    @staticmethod
+    def _output(records):
+        return Output(records)
+
+    def parse_record(self):
+        '''
+        Parses one out-of-band record or result record, including its
+        trailing new line.
+        '''
+        c = self._peek()
+
+        if c in _STREAM_OUTPUT_CLASSES:
+            self._expect(c)
+            cstring = self._cstring(self._match(_CSTRING_RE, 'c-string'))
+            self._match(_NL_RE, 'new line')
+
+            return self._stream_record(c, cstring)
+
+        token = None
+
+        if c.isdigit():
+            token = self._match(_TOKEN_RE, 'token')
+            c = self._peek()
+
+        if c == '^':
+            self._expect(c)
+            result_class = self._match(_RESULT_CLASS_RE, 'result class')
+
+            return self._result_record(token, result_class,
+                                       self._parse_results())
+
+        if c in _ASYNC_OUTPUT_CLASSES:
+            self._expect(c)
+            async_class = self._match(_ASYNC_CLASS_RE, 'async class')
+
+            return self._async_record(c, token, async_class,
+                                      self._parse_results())
+
+        self._error("a record or '(gdb)'")
+
+    def parse_line(self):
+        '''
+        Parses a text made of a single line: an out-of-band record, a
+        result record or a `(gdb)` prompt, in which case `None` is
+        returned.
+        '''
+        if self._at('(gdb)'):
+            self._expect('(gdb)')
+            self._match(_NL_RE, 'new line')
+            record = None
+        else:
+            record = self.parse_record()
+
+        if self._pos != len(self._text):
+            self._error('end of line')
+
+        return record
+
+    def parse_output(self):
+        records = []
+
+        while not self._at('(gdb)'):
+            record = self.parse_record()
+            records.append(record)
+
+            if self._is_result_record(record):
+                break
+
+        self._expect('(gdb)')
+        self._match(_NL_RE, 'new line')
+
+        if self._pos != len(self._text):
+            self._error('end of input')
+
+        return self._output(records)
+
+
+class RepeatedValues(list):
+    '''
+    In native mode, the values of a key appearing more than once in a
+    tuple (or in the results of a record), in order of appearance.
+    '''
+
+
+def _native_results(results):
+    d = dict(results)
+
+    if len(d) == len(results):
+        return d
+
+    d = {}
+
+    for name, value in results:
+        if name not in d:
+            d[name] = value
+        elif type(d[name]) is RepeatedValues:
+            d[name].append(value)
+        else:
+            d[name] = RepeatedValues([d[name], value])
+
+    return d
+
+
+def _native_value(node, decoded=False):
+    # Converts a `Value`, `CString`, `List` or `Tuple` node to plain Python
+    # objects, as in native mode, the C-strings having their escape
+    # sequences decoded if `decoded` is set, with an explicit stack of
+    # `[elements iterator, converted elements, name of the current result,
+    # whether the container is a tuple]` entries so that the depth of the
+    # tree is only limited by memory.
+    stack = []
+
+    while True:
+        if isinstance(node, Value):
+            node = node.value
+
+        if isinstance(node, CString):
+            value = node.decoded if decoded else node.value
+        else:
+            stack.append([iter(node.elements), [], None,
+                          isinstance(node, Tuple)])
+            value = None
+
+        while stack:
+            frame = stack[-1]
+
+            if value is not None:
+                if frame[2] is None:
+                    frame[1].append(value)
+                else:
+                    frame[1].append((frame[2], value))
+
+            element = next(frame[0], None)
+
+            if element is None:
+                stack.pop()
+                value = frame[1]
+
+                if frame[3]:
+                    value = _native_results(value)
+
+                continue
+
+            if isinstance(element, Result):
+                frame[2] = element.variable.name
+                node = element.value
+            else:
+                frame[2] = None
+                node = element
+
+            break
+        else:
+            return value
+
+
+_NATIVE_TYPES = {
+    '^': 'result',
+    '=': 'notify',
+    '+': 'status',
+    '*': 'exec',
+    '~': 'console',
+    '@': 'target',
+    '&': 'log',
+}
+
+
+class _NativeParser(_Parser):
+    '''
+    Variant of `_Parser` building plain Python objects instead of nodes
+    (see `parse()`).
+    '''
+
+    @staticmethod
+    def _make_value(value):
+        return value
+
+    @staticmethod
+    def _make_result(name, value):
+        return name, value
+
+    _make_tuple = staticmethod(_native_results)
+    _make_list = list
+
+    def _cstring(self, text):
+        value = text[1:-1]
+
+        if self._intern_values:
+            value = sys.intern(value)
+
+        return value
+
+    @staticmethod
+    def _stream_record(sigil, cstring):
+        return {'type': _NATIVE_TYPES[sigil], 'output': cstring}
+
+    @staticmethod
+    def _result_record(token, result_class, results):
+        return {
+            'type': 'result',
+            'token': None if token is None else int(token),
+            'class': result_class,
+            'results': _native_results(results),
+        }
+
+    @staticmethod
+    def _async_record(sigil, token, async_class, results):
+        return {
+            'type': _NATIVE_TYPES[sigil],
+            'token': None if token is None else int(token),
+            'class': async_class,
+            'results': _native_results(results),
+        }
+
+    @staticmethod
+    def _is_result_record(record):
+        return record['type'] == 'result'
+
+    @staticmethod
+    def _output(records):
+        return records
+
+
+class _PullParserMixin:
+    '''
+    Generator-based parsing methods for `_Parser` and its variants (see
+    `iter_events()` and `iter_list()`).
+    '''
+
+    def _events_value(self):
+        # Explicit stack of the containers being parsed, as in
+        # `_Parser._parse_value()`: each entry is `(closing bracket, whether
+        # the container holds results)`.
+        stack = []
+
+        while True:
+            c = self._peek()
+
+            if c == '"':
+                yield 'cstring', self._match(_CSTRING_RE, 'c-string')[1:-1]
+            elif c == '{' or c == '[':
+                self._expect(c)
+
+                if c == '{':
+                    close = '}'
+                    yield 'start_tuple', None
+                else:
+                    close = ']'
+                    yield 'start_list', None
+
+                c = self._peek()
+
+                if c != close:
+                    # Lists hold values or results, tuples only results.
+                    results = close == '}' or c not in ('"', '{', '[')
+                    stack.append((close, results))
+
+                    if results:
+                        yield 'result', self._parse_name()
+
+                    continue
+
+                self._expect(close)
+                yield 'end_tuple' if close == '}' else 'end_list', None
+            else:
+                self._error('value')
+
+            while stack:
+                close, results = stack[-1]
+
+                if self._peek() == ',':
+                    self._expect(',')
+
+                    if results:
+                        yield 'result', self._parse_name()
+
+                    break
+
+                self._expect(close)
+                stack.pop()
+                yield 'end_tuple' if close == '}' else 'end_list', None
+            else:
+                return
+
+    def _events_result(self):
+        yield 'result', self._parse_name()
+        yield from self._events_value()
+
+    def _events_record(self):
+        c = self._peek()
+
+        if c in _STREAM_OUTPUT_CLASSES:
+            self._expect(c)
+            yield 'start_record', (_NATIVE_TYPES[c], None, None)
+            yield 'cstring', self._match(_CSTRING_RE, 'c-string')[1:-1]
+            self._match(_NL_RE, 'new line')
+            yield 'end_record', None
+
+            return
+
+        token = None
+
+        if c.isdigit():
+            token = int(self._match(_TOKEN_RE, 'token'))
+            c = self._peek()
+
+        if c == '^':
+            self._expect(c)
+            record_class = self._match(_RESULT_CLASS_RE, 'result class')
+        elif c in _ASYNC_OUTPUT_CLASSES:
+            self._expect(c)
+            record_class = self._match(_ASYNC_CLASS_RE, 'async class')
+        else:
+            self._error("a record or '(gdb)'")
+
+        yield 'start_record', (_NATIVE_TYPES[c], token, record_class)
+
+        while self._peek() == ',':
+            self._expect(',')
+            yield from self._events_result()
+
+        self._match(_NL_RE, 'new line')
+        yield 'end_record', None
+
+    def events(self):
+        while self._pos < len(self._text):
+            if self._at('(gdb)'):
+                self._expect('(gdb)')
+                self._match(_NL_RE, 'new line')
+            elif _NL_RE.match(self._text, self._pos):
+                self._match(_NL_RE, 'new line')
+            else:
+                yield from self._events_record()
+
+    def _iter_elements(self):
+        c = self._peek()
+
+        if c == '{':
+            close = '}'
+            parse_element = self._parse_result
+        elif c == '[':
+            close = ']'
+            parse_element = self._parse_result
+        else:
+            self._error('list or tuple')
+
+        self._expect(c)
+        c = self._peek()
+
+        # Lists hold values or results, tuples only results.
+        if close == ']' and c in ('"', '{', '['):
+            parse_element = self._parse_value
+
+        if c != close:
+            yield parse_element()
+
+            while self._peek() == ',':
+                self._expect(',')
+                yield parse_element()
+
+        self._expect(close)
+
+    def _iter_result(self, path):
+        name = self._match(_VARIABLE_RE, 'variable')
+        self._expect('=')
+
+        if name != path[0]:
+            self._skip_value()
+
+            return
+
+        if len(path) == 1:
+            yield from self._iter_elements()
+
+            return
+
+        if self._peek() != '{':
+            # Only a tuple has named children.
+            self._skip_value()
+
+            return
+
+        self._expect('{')
+
+        if self._peek() != '}':
+            yield from self._iter_result(path[1:])
+
+            while self._peek() == ',':
+                self._expect(',')
+                yield from self._iter_result(path[1:])
+
+        self._expect('}')
+
+    def _skip_value(self):
+        c = self._peek()
+
+        if c == '"':
+            self._match(_CSTRING_RE, 'c-string')
+
+            return
+
+        if c not in ('{', '['):
+            self._error('value')
+
+        # Only the nesting is checked in the skipped subtree.
+        depth = 0
+
+        for m in _SKIP_RE.finditer(self._text, self._pos):
+            c = m.group()
+
+            if c in ('{', '['):
+                depth += 1
+            elif c in ('}', ']'):
+                depth -= 1
+
+                if depth == 0:
+                    self._pos = m.end()
+                    self._skip_whitespace()
+
+                    return
+            elif c in ('\r', '\n'):
+                self._pos = m.start()
+                break
+        else:
+            self._pos = len(self._text)
+
+        self._error("'}' or ']'")
+
+    def _skip_result(self):
+        self._match(_VARIABLE_RE, 'variable')
+        self._expect('=')
+        self._skip_value()
+
+    def _skip_record_header(self):
+        c = self._peek()
+
+        if c.isdigit():
+            self._match(_TOKEN_RE, 'token')
+            c = self._peek()
+
+        if c == '^':
+            self._expect(c)
+            self._match(_RESULT_CLASS_RE, 'result class')
+        elif c in _ASYNC_OUTPUT_CLASSES:
+            self._expect(c)
+            self._match(_ASYNC_CLASS_RE, 'async class')
+        else:
+            self._error('a result or async record')
+
+    def iter_list(self, path):
+        self._skip_record_header()
+
+        while self._peek() == ',':
+            self._expect(',')
+            yield from self._iter_result(path)
+
+        self._match(_NL_RE, 'new line')
+
+
+class _PullParser(_PullParserMixin, _Parser):
     pass
 
 
-def parse(mi_text, strict=True):
-    if not strict:
-        if not mi_text.endswith('(gdb)\n'):
-            mi_text += '(gdb)\n'
+class _NativePullParser(_PullParserMixin, _NativeParser):
+    pass
+
+
+_BYTES_RES = {
+    regex: _LazyRegex(regex.pattern.encode())
+    for regex in (_NL_RE, _TOKEN_RE, _VARIABLE_RE, _CSTRING_RE,
+                  _RESULT_CLASS_RE, _ASYNC_CLASS_RE)
+}
+_BYTES_WHITESPACE_RE = _LazyRegex(rb'[\t ]*')
+_BYTES_BLANK_LINE_RE = _LazyRegex(rb'\s*')
+_BYTES_NL_RE = _LazyRegex(rb'\n')
+
+
+class _BytesParser(_Parser):
+    '''
+    Variant of `_Parser` parsing a line of UTF-8 encoded MI output held in
+    a `memoryview` in place (see `parse_buffer()`).
+    '''
+
+    def _error(self, what):
+        raise ParseError('expecting {}'.format(what), self._first_line)
+
+    def _skip_whitespace(self):
+        self._pos = _BYTES_WHITESPACE_RE.match(self._text, self._pos).end()
+
+    def _peek(self):
+        if self._pos == len(self._text):
+            return ''
+
+        return chr(self._text[self._pos])
+
+    def _at(self, literal):
+        end = self._pos + len(literal)
+
+        return self._text[self._pos:end] == literal.encode()
+
+    def _match(self, regex, what):
+        m = _BYTES_RES[regex].match(self._text, self._pos)
+
+        if m is None:
+            self._error(what)
+
+        self._pos = m.end()
+        self._skip_whitespace()
+
+        if regex is _CSTRING_RE:
+            # Only copy the C-string's contents, without decoding them.
+            return self._text[m.start() + 1:m.end() - 1].tobytes()
+
+        return str(m.group(), 'ascii')
+
+    def _cstring(self, data):
+        return CString.from_utf8(data)
+
+
+class ParseCache:
+    '''
+    Size-bounded LRU cache of parsed record lines, for output in which
+    the same lines come up again and again (e.g. `*running` records
+    when stepping).
+
+    `parse_line()` returns the record of a line, parsing it and caching
+    the record, made read-only with `freeze()`, on a cache miss. The
+    same record object is returned for each identical line. At most
+    `maxsize` records are kept, the least recently used one being
+    evicted first. `intern_values` has the same meaning as for
+    `parse()`.
+
+    The `hits`, `misses` and `evictions` attributes count the cache
+    hits, misses and evicted records.
+    '''
+
+    def __init__(self, maxsize=1024, intern_values=False):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._intern_values = intern_values
+        self._records = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._records)
+
+    def clear(self):
+        '''
+        Removes all the records from the cache, keeping the counters.
+        '''
+        self._records.clear()
+
+    def parse_line(self, line, line_no=1):
+        '''
+        Returns the frozen record of `line`, a complete MI line, or `None`
+        for a `(gdb)` prompt. `line_no` is the line number reported in
+        a `ParseError`.
+        '''
+        record = self._records.get(line)
+
+        if record is not None:
+            self.hits += 1
+            self._records.move_to_end(line)
+
+            return record
+
+        self.misses += 1
+        record = _Parser(line, line_no, self._intern_values).parse_line()
+
+        if record is None:
+            return None
+
+        self._records[line] = freeze(record)
+
+        if len(self._records) > self.maxsize:
+            self._records.popitem(last=False)
+            self.evictions += 1
+
+        return record
+
+
+_CLASSIFY_RE = _LazyRegex(r'[\t ]*([0-9]*)[\t ]*([\^*+=~@&])'
+                         r'(?:[\t ]*([a-zA-Z][a-zA-Z0-9_-]*))?')
+
+
+def classify(line):
+    '''
+    Classifies the record `line` from its first characters, without
+    parsing it, and returns a `(type, token, class)` tuple as in native
+    mode (see `parse()`), `token` and `class` being `None` for stream
+    records. Returns `None` if `line` doesn't look like a record (e.g.
+    a `(gdb)` prompt).
+
+    The rest of the line isn't checked: it may not be a valid record.
+    '''
+    m = _CLASSIFY_RE.match(line)
+
+    if m is None:
+        return None
+
+    token, sigil, record_class = m.groups()
+
+    if sigil in _STREAM_OUTPUT_CLASSES:
+        return _NATIVE_TYPES[sigil], None, None
+
+    return _NATIVE_TYPES[sigil], int(token) if token else None, record_class
+
+
+class RecordFilter:
+    '''
+    Line filter selecting records from their first characters (see
+    `classify()`), to skip unwanted lines before parsing them, e.g.
+    with `StreamParser`'s `line_filter`.
+
+    `only`, if set, is an iterable of patterns selecting result and
+    async records: a sigil (`^`, `*`, `+` or `=`) followed by an
+    `fnmatch` pattern matching the record class, e.g. `'*stopped'` or
+    `'=breakpoint-*'`. Stream records are selected if `streams` is true.
+
+    Calling the filter with a line returns whether it's selected. Lines
+    which aren't classified are selected, so that the parser can skip
+    prompts and report invalid lines.
+    '''
+
+    def __init__(self, only=None, streams=True):
+        self._only_re = None
+        self._streams = streams
+
+        if only is not None:
+            import fnmatch
+
+            regexes = []
+
+            for pattern in only:
+                if pattern[:1] not in _ASYNC_OUTPUT_CLASSES and \
+                        pattern[:1] != '^':
+                    raise ValueError('invalid record pattern {!r}'
+                                     .format(pattern))
+
+                regexes.append(re.escape(pattern[0]) +
+                               fnmatch.translate(pattern[1:]))
+
+            self._only_re = re.compile('|'.join(regexes) or '(?!)')
+
+    def __call__(self, line):
+        m = _CLASSIFY_RE.match(line)
+
+        if m is None:
+            return True
+
+        sigil = m.group(2)
+
+        if sigil in _STREAM_OUTPUT_CLASSES:
+            return self._streams
+
+        if self._only_re is None:
+            return True
+
+        return self._only_re.match(sigil + (m.group(3) or '')) is not None
+
+
+def _count_nodes(record):
+    # Counts the nodes of the tree `record`, or the dicts, lists, tuples
+    # and values of the native record `record`.
+    count = 0
+    stack = [record]
+
+    while stack:
+        node = stack.pop()
+
+        if node is None:
+            continue
+
+        count += 1
+
+        if isinstance(node, (str, int, CString, Token, Variable)):
+            continue
+
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, (list, tuple)):
+            stack.extend(node)
+        else:
+            for name in _slot_names(type(node)):
+                value = getattr(node, name, None)
+
+                if isinstance(value, (list, tuple)):
+                    stack.extend(value)
+                elif value is not None and not isinstance(value, (str, int)):
+                    stack.append(value)
+
+    return count
+
+
+class RecordStats:
+    '''
+    Statistics of one kind of record (see `ParseStats`): number of
+    records, total size in characters (bytes for the usual ASCII MI
+    output), total number of nodes and total parse time in seconds.
+    `histogram[i]` is the number of records whose parse took less than
+    2 ** i microseconds, and at least half of that from i = 1.
+    '''
+
+    __slots__ = ('count', 'size', 'nodes', 'seconds', 'histogram')
+
+    def __init__(self):
+        self.count = 0
+        self.size = 0
+        self.nodes = 0
+        self.seconds = 0.0
+        self.histogram = []
+
+    def add(self, size, nodes, seconds):
+        '''
+        Counts a record of `size` characters and `nodes` nodes, parsed
+        in `seconds`.
+        '''
+        self.count += 1
+        self.size += size
+        self.nodes += nodes
+        self.seconds += seconds
+        self._add_to_histogram(int(seconds * 1e6).bit_length(), 1)
+
+    def merge(self, other):
+        '''
+        Adds the statistics of `other` to these.
+        '''
+        self.count += other.count
+        self.size += other.size
+        self.nodes += other.nodes
+        self.seconds += other.seconds
+
+        for bucket, count in enumerate(other.histogram):
+            self._add_to_histogram(bucket, count)
+
+    def _add_to_histogram(self, bucket, count):
+        histogram = self.histogram
+
+        if bucket >= len(histogram):
+            histogram.extend([0] * (bucket + 1 - len(histogram)))
+
+        histogram[bucket] += count
+
+    def percentile(self, fraction):
+        '''
+        Returns an upper bound, in seconds, of the parse time of the
+        given fraction of the records (e.g. 0.99), or 0 without records.
+        '''
+        remaining = fraction * self.count
+
+        for bucket, count in enumerate(self.histogram):
+            remaining -= count
+
+            if remaining <= 0:
+                return (1 << bucket) / 1e6
+
+        return 0.0
+
+
+class ParseStats:
+    '''
+    Statistics of the lines parsed by a `StreamParser` (see its `stats`
+    parameter).
+
+    `records` maps each kind of record, i.e. its sigil followed by its
+    class for result and async records (e.g. `'^done'`, `'*stopped'`,
+    `'=thread-created'` or `'~'`), to its `RecordStats`. `errors` counts
+    the lines that couldn't be parsed, `error_size` their total size in
+    characters and `error_seconds` the time spent on them before giving
+    up, i.e. the cost of recovering from the errors. Counting the nodes
+    of the records takes time: it's skipped if `count_nodes` is false.
+
+    If set, `before_parse(line)` is called before parsing each line, and
+    `after_parse(line, record, seconds)` after parsing it, `record` being
+    `None` for a `(gdb)` prompt and `seconds` the parse time.
+
+    `visit()` renders a record with a visitor, adding the time it took
+    to `visit_seconds`.
+    '''
+
+    def __init__(self, count_nodes=True, before_parse=None,
+                 after_parse=None):
+        self.records = {}
+        self.errors = 0
+        self.error_size = 0
+        self.error_seconds = 0.0
+        self.visit_seconds = 0.0
+        self.count_nodes = count_nodes
+        self.before_parse = before_parse
+        self.after_parse = after_parse
+
+    def _parse(self, parse_line, line, line_no):
+        # Parses `line` with `parse_line(line, line_no)` and accounts
+        # for it.
+        if self.before_parse is not None:
+            self.before_parse(line)
+
+        start = time.perf_counter()
+
+        try:
+            record = parse_line(line, line_no)
+        except ParseError:
+            self.errors += 1
+            self.error_size += len(line)
+            self.error_seconds += time.perf_counter() - start
+            raise
+
+        seconds = time.perf_counter() - start
+
+        if record is not None:
+            m = _CLASSIFY_RE.match(line)
+            kind = m.group(2) + (m.group(3) or '')
+            record_stats = self.records.get(kind)
+
+            if record_stats is None:
+                record_stats = self.records[kind] = RecordStats()
+
+            nodes = _count_nodes(record) if self.count_nodes else 0
+            record_stats.add(len(line), nodes, seconds)
+
+        if self.after_parse is not None:
+            self.after_parse(line, record, seconds)
+
+        return record
+
+    def visit(self, visitor, node):
+        '''
+        Visits `node` with `visitor`, accounting for the time it takes,
+        and returns what `visitor.visit()` returns.
+        '''
+        start = time.perf_counter()
+        ret = visitor.visit(node)
+        self.visit_seconds += time.perf_counter() - start
+
+        return ret
+
+    @property
+    def error_rate(self):
+        '''
+        Fraction of the parsed lines, `(gdb)` prompts excluded, which
+        couldn't be parsed.
+        '''
+        lines = self.total.count + self.errors
+
+        return self.errors / lines if lines else 0.0
+
+    @property
+    def total(self):
+        '''
+        `RecordStats` of all the records.
+        '''
+        total = RecordStats()
+
+        for record_stats in self.records.values():
+            total.merge(record_stats)
+
+        return total
+
+    def summary(self):
+        '''
+        Returns a human-readable summary of the statistics: a table of
+        the kinds of records, by decreasing total parse time, and a
+        histogram of the parse times.
+        '''
+        total = self.total
+        lines = ['{:<28} {:>8} {:>6} {:>10} {:>9} {:>9} {:>9}'.format(
+            'record', 'count', 'time', 'bytes/rec', 'nodes/rec', 'mean us',
+            'p99 us')]
+        items = sorted(self.records.items(), key=lambda item: -item[1].seconds)
+
+        for kind, record_stats in items + [('total', total)]:
+            count = record_stats.count or 1
+            lines.append(
+                '{:<28} {:>8} {:>6.1%} {:>10.0f} {:>9.1f} {:>9.1f} {:>9.0f}'
+                .format(kind, record_stats.count,
+                        record_stats.seconds / (total.seconds or 1),
+                        record_stats.size / count, record_stats.nodes / count,
+                        record_stats.seconds / count * 1e6,
+                        record_stats.percentile(0.99) * 1e6))
+
+        lines.append('')
+        lines.append('parse time: {:.3f} s, visit time: {:.3f} s'.format(
+            total.seconds, self.visit_seconds))
+        lines.append('errors: {} ({:.2%} of the lines, {} bytes), '
+                     'recovery time: {:.3f} s'.format(
+                         self.errors, self.error_rate, self.error_size,
+                         self.error_seconds))
+        lines.append('')
+        lines.append('parse time histogram:')
+        largest = max(total.histogram, default=0) or 1
+
+        for bucket, count in enumerate(total.histogram):
+            if count == 0 and not any(total.histogram[:bucket]):
+                continue
+
+            if bucket == 0:
+                bounds = '< 1 us'
+            else:
+                bounds = '< {} us'.format(1 << bucket)
+
+            lines.append('{:>12} {:>8} {}'.format(
+                bounds, count, '#' * (40 * count // largest)))
+
+        return '\n'.join(lines) + '\n'
+
+
+class StreamParser:
+    '''
+    Incremental parser for live MI output.
+
+    Chunks of `str` or `bytes` (decoded using `encoding`) of any size
+    are passed to `feed()`, which returns the records (`OutOfBandRecord`
+    and `ResultRecord` objects) of all the lines completed by this
+    chunk. Partial lines are buffered until their new line arrives.
+    `(gdb)` prompts and blank lines are skipped.
+
+    If a line can't be parsed, `feed()` raises `ParseError`; the records
+    of the lines preceding it are kept and returned by the next call,
+    and parsing resumes with the line following the bad one.
+
+    `native` and `intern_values` have the same meaning as for `parse()`.
+    If `line_filter` is set, it's called with each line before parsing
+    it, and the line is skipped if it returns false (see `RecordFilter`).
+
+    If `cache` is a `ParseCache`, lines are parsed through it, and the
+    records are frozen (see `freeze()`); `intern_values` is then the
+    cache's. `cache` can't be used in native mode.
+
+    If `stats` is a `ParseStats`, the parsed records and their parse
+    times are accounted for in it.
+    '''
+
+    def __init__(self, encoding='utf-8', native=False, intern_values=False,
+                 line_filter=None, cache=None, stats=None):
+        if native and cache is not None:
+            raise ValueError('a cache is not available in native mode')
+
+        self._parser_cls = _NativeParser if native else _Parser
+        self._intern_values = intern_values
+        self._line_filter = line_filter
+        self._cache = cache
+        self._stats = stats
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._partial = []
+        self._lines = collections.deque()
+        self._records = []
+        self._line_no = 0
+
+    def feed(self, data):
+        if not isinstance(data, str):
+            data = self._decoder.decode(data)
+
+        start = 0
+
+        while True:
+            end = data.find('\n', start) + 1
+
+            if end == 0:
+                break
+
+            if self._partial:
+                self._partial.append(data[start:end])
+                self._lines.append(''.join(self._partial))
+                self._partial = []
+            else:
+                self._lines.append(data[start:end])
+
+            start = end
+
+        if start < len(data):
+            self._partial.append(data[start:])
+
+        return self._parse_lines()
+
+    def close(self):
+        '''
+        Signals the end of the input, parsing the last line even if it's
+        not terminated by a new line.
+        '''
+        self._partial.append(self._decoder.decode(b'', final=True))
+        last_line = ''.join(self._partial)
+        self._partial = []
+
+        if last_line:
+            self._lines.append(last_line + '\n')
+
+        return self._parse_lines()
+
+    def _parse_lines(self):
+        records = self._records
+        self._records = []
+
+        while self._lines:
+            line = self._lines.popleft()
+            self._line_no += 1
+
+            if line.isspace():
+                continue
+
+            if self._line_filter is not None and not self._line_filter(line):
+                continue
+
+            try:
+                if self._stats is not None:
+                    record = self._stats._parse(self._parse_line, line,
+                                                self._line_no)
+                else:
+                    record = self._parse_line(line, self._line_no)
+            except ParseError:
+                self._records = records
+                raise
+
+            if record is not None:
+                records.append(record)
+
+        return records
+
+    def _parse_line(self, line, line_no):
+        if self._cache is not None:
+            return self._cache.parse_line(line, line_no)
+
+        return self._parser_cls(line, line_no,
+                                self._intern_values).parse_line()
+
+
+_grammar_built = False
+
+
+def _build_grammar():
+    # Builds the pypeg2 grammar of the nodes the first time the reference
+    # backend is used: pypeg2 (the optional `reference` dependency) isn't
+    # imported otherwise.
+    global _grammar_built
+    import pypeg2
+
+    if _grammar_built:
+        return pypeg2
+
+    nl = pypeg2.omit(re.compile(r'\r\n|\r|\n'))
+    results = pypeg2.csl(Result)
+
+    CString.grammar = re.compile(r'"(\\.|[^"])*"')
+    Variable.grammar = re.compile(r'^[A-Za-z_-][A-Za-z_0-9-]*')
+    Tuple.grammar = '{', pypeg2.optional(results), '}'
+    List.grammar = '[', pypeg2.optional([pypeg2.csl(Value), results]), ']'
+    Value.grammar = [CString, Tuple, List]
+    Result.grammar = Variable, '=', Value
+    Token.grammar = re.compile(r'[0-9]+')
+    ResultRecord.grammar = (
+        pypeg2.optional(Token),
+        '^',
+        re.compile(r'done|running|connected|error|exit'),
+        pypeg2.optional((',', results)),
+        nl
+    )
+    ConsoleStreamOutput.grammar = '~', CString, nl
+    TargetStreamOutput.grammar = '@', CString, nl
+    LogStreamOutput.grammar = '&', CString, nl
+    StreamRecord.grammar = [ConsoleStreamOutput, TargetStreamOutput,
+                            LogStreamOutput]
+    AsyncOutput.grammar = (re.compile(r'[a-zA-Z][a-zA-Z0-9_-]+'),
+                           pypeg2.optional((',', results)))
+    NotifyAsyncOutput.grammar = pypeg2.optional(Token), '=', AsyncOutput, nl
+    StatusAsyncOutput.grammar = pypeg2.optional(Token), '+', AsyncOutput, nl
+    ExecAsyncOutput.grammar = pypeg2.optional(Token), '*', AsyncOutput, nl
+    AsyncRecord.grammar = [NotifyAsyncOutput, StatusAsyncOutput,
+                           ExecAsyncOutput]
+    OutOfBandRecord.grammar = [AsyncRecord, StreamRecord]
+    Output.grammar = (
+        pypeg2.maybe_some(OutOfBandRecord),
+        pypeg2.optional(ResultRecord),
+        '(gdb)',
+        nl
+    )
+
+    _grammar_built = True
+
+    return pypeg2
+
+
+def _parse_pypeg2(mi_text):
+    pypeg2 = _build_grammar()
 
     try:
         return pypeg2.parse(mi_text, Output,
                             whitespace=re.compile(r'(?m)(?:\t| )+'))
     except (SyntaxError, Exception) as e:
         raise ParseError(str(e))
+
+
+def parse(mi_text, strict=True, backend='fast', native=False,
+          intern_values=False):
+    '''
+    Parses `mi_text`, one complete MI output (out-of-band records,
+    an optional result record and the terminating `(gdb)` line), and
+    returns an `Output` node.
+
+    If `strict` is false, the terminating `(gdb)` line is added if
+    it's missing.
+
+    `backend` selects the parser implementation: `'fast'` (default),
+    a single-pass recursive-descent parser, or `'pypeg2'`, the
+    reference implementation built on the pypeg2 grammar. Both return
+    identical trees.
+
+    If `native` is true (only supported by the `'fast'` backend), no
+    node is created: a list of records made of plain Python objects is
+    returned instead. Each record is a `dict`:
+
+      * stream records: `{'type': 'console', 'output': '...'}`, with
+        type `'console'`, `'target'` or `'log'`;
+      * result and async records: `{'type': 'result', 'token': 12,
+        'class': 'done', 'results': {...}}`, with type `'result'`,
+        `'notify'`, `'status'` or `'exec'`, and `token` an `int` or
+        `None`.
+
+    C-strings become `str` (the text between the quotes, unmodified),
+    tuples and record results become `dict` and lists become `list`.
+    In a list of results, each result is a `(name, value)` tuple, e.g.
+    `children=[child={...},child={...}]` becomes
+    `[('child', {...}), ('child', {...})]`. If a key appears more than
+    once in a tuple, all its values are kept, in order, in a
+    `RepeatedValues` list.
+
+    Variable names and record classes are always interned. If
+    `intern_values` is true (only supported by the `'fast'` backend),
+    C-string values are interned too, so that repeated values (file
+    names, function names, ...) are stored only once when many records
+    are kept in memory.
+
+    A single bad line makes the whole parse fail: see `parse_recover()`
+    to skip it and keep the other records.
+    '''
+    if backend not in ('fast', 'pypeg2'):
+        raise ValueError('Unknown parser backend: {}'.format(backend))
+
+    if backend == 'pypeg2' and (native or intern_values):
+        raise ValueError('Native mode and value interning are only '
+                         'supported by the fast backend')
+
+    if not strict:
+        if not mi_text.endswith('(gdb)\n'):
+            mi_text += '(gdb)\n'
+
+    if backend == 'pypeg2':
+        return _parse_pypeg2(mi_text)
+
+    parser_cls = _NativeParser if native else _Parser
+
+    return parser_cls(mi_text, intern_values=intern_values).parse_output()
+
+
+def parse_recover(mi_text, native=False, intern_values=False,
+                  line_filter=None, stats=None):
+    '''
+    Parses the MI lines of `mi_text` one at a time, and returns a list
+    of their records (`OutOfBandRecord` and `ResultRecord` objects) and
+    a list of errors. `(gdb)` prompts and blank lines are skipped.
+
+    A line which can't be parsed (e.g. a truncated record, or inferior
+    output mixed with the MI output) is skipped, and parsing resumes
+    with the next line: the preceding lines aren't parsed again. Each
+    error is a tuple: the offset of the bad line in `mi_text`, its line
+    number and the `ParseError` reason.
+
+    `native`, `intern_values`, `line_filter` and `stats` have the same
+    meaning as for `StreamParser`.
+    '''
+    return _recover_lines(_split_lines(mi_text), native, intern_values,
+                          line_filter, stats)
+
+
+def _split_lines(text):
+    # Yields the lines of `text`, split at '\n' only.
+    size = len(text)
+    start = 0
+
+    while start < size:
+        end = text.find('\n', start) + 1
+
+        if end == 0:
+            end = size
+
+        yield text[start:end]
+        start = end
+
+
+def _recover_lines(lines, native=False, intern_values=False,
+                   line_filter=None, stats=None):
+    # Implements `parse_recover()` for the lines yielded by `lines`, the
+    # error offsets being the sums of the lengths of the preceding lines.
+    parser_cls = _NativeParser if native else _Parser
+    records = []
+    errors = []
+    start = 0
+
+    def parse_line(line, line_no):
+        return parser_cls(line, line_no, intern_values).parse_line()
+
+    for line_no, line in enumerate(lines, 1):
+        end = start + len(line)
+
+        if not line.endswith('\n'):
+            line += '\n'
+
+        if line.isspace() or (line_filter is not None and
+                              not line_filter(line)):
+            start = end
+            continue
+
+        try:
+            if stats is not None:
+                record = stats._parse(parse_line, line, line_no)
+            else:
+                record = parse_line(line, line_no)
+        except ParseError as e:
+            errors.append((start, line_no, e.reason))
+        else:
+            if record is not None:
+                records.append(record)
+
+        start = end
+
+    return records, errors
+
+
+def parse_buffer(buffer):
+    '''
+    Parses the UTF-8 encoded MI output held in `buffer`, a bytes-like
+    object (`bytes`, `bytearray`, `memoryview`, `mmap`, ...), and yields
+    its records (`OutOfBandRecord` and `ResultRecord` objects), line by
+    line. `(gdb)` prompts and blank lines are skipped.
+
+    The buffer is parsed in place, without being decoded: the contents
+    of a C-string are only decoded when its `value` is first accessed.
+
+    Raises `ParseError` if a line can't be parsed.
+    '''
+    with memoryview(buffer) as view, view.cast('B') as view:
+        size = len(view)
+        start = 0
+        line_no = 0
+
+        while start < size:
+            m = _BYTES_NL_RE.search(view, start)
+            line_no += 1
+
+            if m is None:
+                # The last line isn't terminated: copy it to add a new line.
+                line = memoryview(view[start:].tobytes() + b'\n')
+                start = size
+            else:
+                line = view[start:m.end()]
+                start = m.end()
+
+            if _BYTES_BLANK_LINE_RE.fullmatch(line):
+                continue
+
+            record = _BytesParser(line, line_no).parse_line()
+
+            if record is not None:
+                yield record
+
+
+def iter_events(mi_text):
+    '''
+    Parses `mi_text`, made of complete MI lines, and yields parsing
+    events, without building any node, as `(event, value)` tuples:
+
+      * `('start_record', (type, token, class))` at the beginning of a
+        record, with `type`, `token` and `class` as in native mode (see
+        `parse()`), `token` and `class` being `None` for stream records;
+      * `('end_record', None)` at the end of a record;
+      * `('result', name)` before the value of a result;
+      * `('cstring', value)` for a C-string, `value` being the text
+        between the quotes;
+      * `('start_tuple', None)`, `('end_tuple', None)`,
+        `('start_list', None)` and `('end_list', None)` around the
+        elements of tuples and lists.
+
+    `(gdb)` prompts and blank lines are skipped. Raises `ParseError`
+    when reaching an invalid part of the text.
+    '''
+    return _PullParser(mi_text).events()
+
+
+def iter_list(line, path, native=False):
+    '''
+    Parses `line`, a result or async record line, and yields the
+    elements of its list (or tuple) result at `path` one at a time, as
+    they're parsed, without keeping the previous ones.
+
+    `path` is the name of a result of the record, optionally followed by
+    names of results within tuples, separated by dots, e.g.
+    `'symbols.debug'` for `^done,symbols={debug=[...]}`.
+
+    The elements are `Value` or `Result` nodes, or plain Python objects
+    if `native` is true (see `parse()`). Stopping the iteration early
+    skips the parsing of the rest of the line.
+    '''
+    parser_cls = _NativePullParser if native else _PullParser
+
+    return parser_cls(line).iter_list(path.split('.'))
@@ -0,0 +1,183 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Simon Marchi <simon.marchi@polymtl.ca>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+import re
+from pygdbmi import parser
+
+
+_STEP_RE = re.compile(r'(\.?)([A-Za-z_-][A-Za-z_0-9-]*)|\[(\*|[0-9]+)\]')
+
+
+class _QueryParser(parser._PullParser):
+
+    def _query_value(self, steps):
+        if not steps:
+            if self._peek() == '"':
+                yield self._match(parser._CSTRING_RE, 'c-string')[1:-1]
+            else:
+                self._skip_value()
+        elif isinstance(steps[0], str):
+            if self._peek() != '{':
+                self._skip_value()
+
+                return
+
+            self._expect('{')
+
+            if self._peek() != '}':
+                yield from self._query_result(steps)
+
+                while self._peek() == ',':
+                    self._expect(',')
+                    yield from self._query_result(steps)
+
+            self._expect('}')
+        else:
+            if self._peek() != '[':
+                self._skip_value()
+
+                return
+
+            self._expect('[')
+            c = self._peek()
+
+            if c in ('"', '{', '['):
+                query_element = self._query_value
+                skip_element = self._skip_value
+            else:
+                query_element = self._query_result
+                skip_element = self._skip_result
+
+            index = 0
+
+            while c != ']':
+                if steps[0] is None or steps[0] == index:
+                    yield from query_element(steps[1:])
+                else:
+                    skip_element()
+
+                if self._peek() != ',':
+                    break
+
+                self._expect(',')
+                index += 1
+
+            self._expect(']')
+
+    def _query_result(self, steps):
+        name = self._match(parser._VARIABLE_RE, 'variable')
+        self._expect('=')
+
+        if steps and steps[0] == name:
+            yield from self._query_value(steps[1:])
+        else:
+            self._skip_value()
+
+    def query(self, steps):
+        c = self._peek()
+
+        if self._at('(gdb)') or c in parser._STREAM_OUTPUT_CLASSES:
+            return
+
+        self._skip_record_header()
+
+        while self._peek() == ',':
+            self._expect(',')
+            yield from self._query_result(steps)
+
+        self._match(parser._NL_RE, 'new line')
+
+
+class Query:
+    '''
+    A compiled path query, see `compile()`.
+    '''
+
+    __slots__ = ('path', '_steps')
+
+    def __init__(self, path):
+        self.path = path
+        self._steps = []
+        pos = 0
+
+        while pos < len(path):
+            m = _STEP_RE.match(path, pos)
+
+            # Names but the first one must follow a dot.
+            if m is None or (m.group(2) is not None and
+                             bool(m.group(1)) != (pos > 0)):
+                raise ValueError('invalid query path {!r} at offset {}'
+                                 .format(path, pos))
+
+            if m.group(2) is not None:
+                self._steps.append(m.group(2))
+            elif m.group(3) == '*':
+                self._steps.append(None)
+            else:
+                self._steps.append(int(m.group(3)))
+
+            pos = m.end()
+
+        if not self._steps or not isinstance(self._steps[0], str):
+            raise ValueError('invalid query path {!r}'.format(path))
+
+    def __repr__(self):
+        return 'Query({!r})'.format(self.path)
+
+    def iter_matches(self, line):
+        '''
+        Yields the matches in `line` as they're found.
+        '''
+        return _QueryParser(line).query(self._steps)
+
+    def match(self, line):
+        '''
+        Returns the list of the matches in `line`.
+        '''
+        return list(self.iter_matches(line))
+
+    def first(self, line):
+        '''
+        Returns the first match in `line`, or `None` if there's none,
+        without scanning the rest of the line.
+        '''
+        return next(iter(self.iter_matches(line)), None)
+
+
+def compile(path):
+    '''
+    Compiles a query extracting the values at `path` from record lines.
+
+    `path` is a dot-separated list of result names, each optionally
+    followed by `[*]` (all the elements of a list) or `[N]` (its N-th
+    element), e.g. `'frame.addr'` or `'bkpt.locations[*].addr'`.  A name
+    selects the results with that name in a record or tuple, or the list
+    elements that are results with that name, e.g. `'stack[*].frame'`.
+
+    The query scans the raw record text, skipping over the parts not
+    selected by `path` without building any node. It only matches
+    C-strings, whose values are returned as in `CString.value`. Result
+    and async records can be queried; stream records and `(gdb)` prompts
+    never match.
+    '''
+    return Query(path)
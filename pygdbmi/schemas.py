@@ -0,0 +1,324 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Simon Marchi <simon.marchi@polymtl.ca>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+import typing
+from pygdbmi import parser
+
+
+# Scalar converters: they accept a `CString` node or its value, and
+# decode its escape sequences.
+
+def _str(value):
+    if isinstance(value, str):
+        return parser.unescape(value)
+
+    return value.decoded
+
+
+def _int(value):
+    return int(_str(value))
+
+
+def _address(value):
+    # Breakpoints have placeholder addresses such as '<PENDING>'.
+    value = _str(value)
+
+    return int(value, 16) if value.startswith('0x') else None
+
+
+def _bool(value):
+    return _str(value) == 'y'
+
+
+class Schema:
+    '''
+    Decoder of the MI tuples of a known shape.
+
+    `cls` is a `typing.NamedTuple` class and `converters` maps MI result
+    names to the converters of the values of the corresponding fields
+    (MI names with dashes are converted to field names with
+    underscores). A converter is a function taking a C-string value
+    (a `CString` node or a string), or another decoder. Results not in
+    `converters` are ignored, and the missing fields are `None`. If a
+    result name appears more than once, only its first value is
+    decoded, as by the fields of `pygdbmi.objects` records.
+    '''
+
+    def __init__(self, cls, converters):
+        self.cls = cls
+        self._fields = {}
+
+        for name, converter in converters.items():
+            index = cls._fields.index(name.replace('-', '_'))
+
+            if isinstance(converter, (Schema, TupleOf)):
+                converter = converter.decode
+
+            self._fields[name] = index, converter
+
+        self._empty = [None] * len(cls._fields)
+
+    def decode(self, value):
+        '''
+        Decodes `value`, a `Tuple` node, a `Value` node containing one,
+        or a dictionary (native mode), and returns an instance of `cls`.
+        Frozen nodes are accepted.
+        '''
+        if isinstance(value, parser.Value):
+            value = value.value
+
+        fields = self._fields
+        values = self._empty[:]
+
+        if isinstance(value, dict):
+            for name, element in value.items():
+                field = fields.get(name)
+
+                if field is not None:
+                    if isinstance(element, parser.RepeatedValues):
+                        element = element[0]
+
+                    values[field[0]] = field[1](element)
+        else:
+            seen = set()
+
+            for result in value.elements:
+                name = result.variable.name
+                field = fields.get(name)
+
+                if field is not None and name not in seen:
+                    seen.add(name)
+                    values[field[0]] = field[1](result.value.value)
+
+        return self.cls(*values)
+
+
+class TupleOf:
+    '''
+    Decoder of MI lists, returning a tuple of their elements decoded
+    by `decoder`. The values of list elements which are results are
+    decoded.
+    '''
+
+    def __init__(self, decoder):
+        if isinstance(decoder, (Schema, TupleOf)):
+            decoder = decoder.decode
+
+        self._decode_element = decoder
+
+    def decode(self, value):
+        '''
+        Decodes `value`, a `List` node, a `Value` node containing one,
+        or a list (native mode), and returns a tuple. Frozen nodes are
+        accepted.
+        '''
+        if isinstance(value, parser.Value):
+            value = value.value
+
+        if isinstance(value, (list, tuple)):
+            # In native mode, results are (name, value) tuples.
+            elements = [e[1] if isinstance(e, tuple) else e for e in value]
+        else:
+            elements = [e.value.value if isinstance(e, parser.Result)
+                        else e.value for e in value.elements]
+
+        return tuple(map(self._decode_element, elements))
+
+
+class Arg(typing.NamedTuple):
+    name: str = None
+    type: str = None
+    value: str = None
+
+
+class Frame(typing.NamedTuple):
+    level: int = None
+    addr: int = None
+    func: str = None
+    args: tuple = None
+    file: str = None
+    fullname: str = None
+    line: int = None
+    arch: str = None
+
+
+class BreakpointLocation(typing.NamedTuple):
+    number: str = None
+    enabled: bool = None
+    addr: int = None
+    func: str = None
+    file: str = None
+    fullname: str = None
+    line: int = None
+    thread_groups: tuple = None
+
+
+class Breakpoint(typing.NamedTuple):
+    number: str = None
+    type: str = None
+    disp: str = None
+    enabled: bool = None
+    addr: int = None
+    func: str = None
+    file: str = None
+    fullname: str = None
+    line: int = None
+    thread_groups: tuple = None
+    cond: str = None
+    times: int = None
+    original_location: str = None
+    locations: tuple = None
+
+
+class Thread(typing.NamedTuple):
+    id: int = None
+    target_id: str = None
+    name: str = None
+    frame: Frame = None
+    state: str = None
+    core: int = None
+
+
+class RegisterValue(typing.NamedTuple):
+    number: int = None
+    value: str = None
+
+
+class Instruction(typing.NamedTuple):
+    address: int = None
+    func_name: str = None
+    offset: int = None
+    inst: str = None
+    opcodes: str = None
+
+
+class SourceLine(typing.NamedTuple):
+    line: int = None
+    file: str = None
+    fullname: str = None
+    line_asm_insn: tuple = None
+
+
+_ARG = Schema(Arg, {'name': _str, 'type': _str, 'value': _str})
+_FRAME = Schema(Frame, {
+    'level': _int,
+    'addr': _address,
+    'func': _str,
+    'args': TupleOf(_ARG),
+    'file': _str,
+    'fullname': _str,
+    'line': _int,
+    'arch': _str,
+})
+_THREAD_GROUPS = TupleOf(_str)
+_BREAKPOINT_LOCATION = Schema(BreakpointLocation, {
+    'number': _str,
+    'enabled': _bool,
+    'addr': _address,
+    'func': _str,
+    'file': _str,
+    'fullname': _str,
+    'line': _int,
+    'thread-groups': _THREAD_GROUPS,
+})
+_INSTRUCTION = Schema(Instruction, {
+    'address': _address,
+    'func-name': _str,
+    'offset': _int,
+    'inst': _str,
+    'opcodes': _str,
+})
+
+_DECODERS = {
+    'frame': _FRAME,
+    'bkpt': Schema(Breakpoint, {
+        'number': _str,
+        'type': _str,
+        'disp': _str,
+        'enabled': _bool,
+        'addr': _address,
+        'func': _str,
+        'file': _str,
+        'fullname': _str,
+        'line': _int,
+        'thread-groups': _THREAD_GROUPS,
+        'cond': _str,
+        'times': _int,
+        'original-location': _str,
+        'locations': TupleOf(_BREAKPOINT_LOCATION),
+    }),
+    'thread': Schema(Thread, {
+        'id': _int,
+        'target-id': _str,
+        'name': _str,
+        'frame': _FRAME,
+        'state': _str,
+        'core': _int,
+    }),
+    'register-values': TupleOf(Schema(RegisterValue, {
+        'number': _int,
+        'value': _str,
+    })),
+    'asm_insns': TupleOf(_INSTRUCTION),
+    'src_and_asm_line': Schema(SourceLine, {
+        'line': _int,
+        'file': _str,
+        'fullname': _str,
+        'line_asm_insn': TupleOf(_INSTRUCTION),
+    }),
+}
+_DECODERS['threads'] = TupleOf(_DECODERS['thread'])
+_DECODERS['stack'] = TupleOf(_FRAME)
+
+
+def register(name, decoder):
+    '''
+    Registers `decoder`, a `Schema` or `TupleOf` object, for the results
+    named `name`, replacing any previous one.
+    '''
+    _DECODERS[name] = decoder
+
+
+def get_decoder(name):
+    '''
+    Returns the decoder registered for the results named `name`.
+    Raises `KeyError` if there's none.
+    '''
+    return _DECODERS[name]
+
+
+def decode(name, value):
+    '''
+    Decodes `value`, the node or native value of a result named `name`,
+    with the decoder registered for this name.
+
+    Decoders are registered for `frame`, `bkpt`, `thread`, `threads`,
+    `stack`, `register-values`, `asm_insns` (without source lines) and
+    `src_and_asm_line`. They return `Frame`, `Breakpoint`, `Thread`,
+    `RegisterValue`, `Instruction` and `SourceLine` objects, or tuples
+    of them for lists. Strings have their escape sequences decoded (see
+    `parser.unescape()`), numbers are converted to `int`, addresses too
+    (`None` for placeholders like `<PENDING>`), `y`/`n` flags to `bool`
+    and lists to tuples.
+    '''
+    return _DECODERS[name].decode(value)
@@ -0,0 +1,530 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2015 Simon Marchi <simon.marchi@polymtl.ca>
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+'''
+On-disk cache of parsed records, to reload large MI logs without
+parsing them again.
+
+A cache file starts with a header (magic, format version, and size and
+modification time of the source file), followed by sections, each
+made of its number of items (a 64-bit integer) and its items:
+
+  * the string table: the length of each distinct string (C-string
+    values, variable names, record classes, tokens and error reasons),
+    and their UTF-8 encoded text;
+  * the node table: for each kind of node (see `_NODE_KINDS`), one
+    section per field of the nodes of this kind, e.g. the variables
+    and the values of all the results. String fields hold indexes in
+    the string table and child fields hold node ids; the lists of
+    children are stored as the length of each list, followed by all
+    their elements;
+  * the ids of the root node of each record;
+  * the errors: (offset, line, reason) triplets, as returned by
+    `parser.parse_recover()`.
+
+Numbers are little-endian. Node ids start at 1, numbering the nodes of
+each kind in the order of `_NODE_KINDS`; id 0 is `None`.
+
+Identical subtrees are only stored once. Since nodes are grouped by
+kind, loading creates them and sets their fields a whole column at a
+time, without interpreting each node. The loaded records are frozen
+(see `parser.freeze()`) and share their identical subtrees.
+'''
+
+import array
+import collections
+import contextlib
+import gc
+import itertools
+import os
+import struct
+import sys
+from pygdbmi import parser
+
+
+class CacheError(RuntimeError):
+    '''
+    Raised when a cache file can't be loaded: it's not a cache file, it
+    has an unsupported version, or it's stale.
+    '''
+    pass
+
+
+_MAGIC = b'GDBMIREC'
+_VERSION = 1
+
+# Magic, version, source size and source modification time (ns).
+_HEADER = struct.Struct('<8sIqq')
+_COUNT = struct.Struct('<Q')
+
+# Kinds of nodes: class, string field, child fields and list of
+# children field.
+_NODE_KINDS = [
+    (parser.CString, 'value', (), None),
+    (parser.Variable, 'name', (), None),
+    (parser.Token, 'value', (), None),
+    (parser.Result, None, ('variable', 'value'), None),
+    (parser.Value, None, ('value',), None),
+    (parser.Tuple, None, (), 'elements'),
+    (parser.List, None, (), 'elements'),
+    (parser.ResultRecord, 'result_class', ('token',), 'results'),
+    (parser.ConsoleStreamOutput, None, ('output',), None),
+    (parser.TargetStreamOutput, None, ('output',), None),
+    (parser.LogStreamOutput, None, ('output',), None),
+    (parser.StreamRecord, None, ('output',), None),
+    (parser.AsyncOutput, 'async_class', (), 'results'),
+    (parser.NotifyAsyncOutput, None, ('token', 'output'), None),
+    (parser.StatusAsyncOutput, None, ('token', 'output'), None),
+    (parser.ExecAsyncOutput, None, ('token', 'output'), None),
+    (parser.AsyncRecord, None, ('output',), None),
+    (parser.OutOfBandRecord, None, ('record',), None),
+    (parser.Output, None, ('result_record',), 'oob_records'),
+]
+
+_KIND_INDEXES = {kind[0]: index for index, kind in enumerate(_NODE_KINDS)}
+
+# While encoding, a node is referred to by its index among the nodes of
+# its kind, shifted, and its kind; 0 is `None`.
+_KIND_BITS = 5
+
+
+def _kind_index(cls):
+    index = _KIND_INDEXES.get(cls)
+
+    if index is None:
+        # Frozen nodes are stored like the nodes of their base class.
+        for base in cls.__mro__[1:]:
+            if base in _KIND_INDEXES:
+                return _KIND_INDEXES[base]
+
+        raise TypeError('{} objects are not nodes'.format(cls.__name__))
+
+    return index
+
+
+class _Encoder:
+    # Builds the string and node tables of records.
+
+    def __init__(self):
+        self.strings = {}
+        # Fields of each kind of node: the strings, the children, and
+        # the lengths of the lists of children followed by their
+        # elements.
+        self.fields = [[[] for i in range((string_name is not None) +
+                                          len(child_names) +
+                                          2 * (list_name is not None))]
+                       for cls, string_name, child_names, list_name
+                       in _NODE_KINDS]
+        self._node_refs = {}
+        self._object_refs = {}
+
+    def string(self, string):
+        string_id = self.strings.get(string)
+
+        if string_id is None:
+            string_id = self.strings[string] = len(self.strings)
+
+        return string_id
+
+    def _add(self, node, kind, payload, list_length):
+        # Adds a node with the given fields (its string, its children
+        # and the elements of its list of `list_length` children) if
+        # there's no identical one, and returns its reference.
+        key = (kind,) + tuple(payload)
+        ref = self._node_refs.get(key)
+
+        if ref is None:
+            fields = self.fields[kind]
+            ref = self._node_refs[key] = \
+                (len(fields[0]) + 1) << _KIND_BITS | kind
+
+            if list_length is None:
+                for field, value in zip(fields, payload):
+                    field.append(value)
+            else:
+                fixed = len(payload) - list_length
+
+                for field, value in zip(fields, payload[:fixed]):
+                    field.append(value)
+
+                fields[-2].append(list_length)
+                fields[-1].extend(payload[fixed:])
+
+        # Shared (frozen) nodes are only encoded once.
+        self._object_refs[id(node)] = ref
+
+        return ref
+
+    def node(self, root):
+        # Adds the tree `root` to the node table and returns its
+        # reference. Iterative, since trees can be very deep.
+        refs = []
+        stack = [root]
+
+        while stack:
+            item = stack.pop()
+
+            if item is None:
+                refs.append(0)
+                continue
+
+            if type(item) is tuple:
+                # All the children of this node are encoded.
+                node, kind, string, child_count, list_length = item
+                payload = refs[len(refs) - child_count:]
+                del refs[len(refs) - child_count:]
+
+                if string is not None:
+                    payload.insert(0, self.string(string))
+
+                refs.append(self._add(node, kind, payload, list_length))
+                continue
+
+            ref = self._object_refs.get(id(item))
+
+            if ref is not None:
+                refs.append(ref)
+                continue
+
+            kind = _kind_index(type(item))
+            cls, string_name, child_names, list_name = _NODE_KINDS[kind]
+            string = None
+
+            if string_name is not None:
+                string = str(getattr(item, string_name))
+
+            children = [getattr(item, name) for name in child_names]
+            list_length = None
+
+            if list_name is not None:
+                elements = getattr(item, list_name)
+                list_length = len(elements)
+                children.extend(elements)
+
+            stack.append((item, kind, string, len(children), list_length))
+            stack.extend(reversed(children))
+
+        return refs[0]
+
+    def node_ids(self):
+        # Returns a function converting node references to node ids.
+        bases = []
+        base = 1
+
+        for fields in self.fields:
+            bases.append(base - 1)
+            base += len(fields[0])
+
+        mask = (1 << _KIND_BITS) - 1
+
+        return lambda ref: ref and bases[ref & mask] + (ref >> _KIND_BITS)
+
+
+def _le_array(typecode, items=()):
+    a = array.array(typecode, items)
+
+    if sys.byteorder == 'big':
+        a.byteswap()
+
+    return a
+
+
+def _write_section(f, typecode, items):
+    a = _le_array(typecode, items)
+    f.write(_COUNT.pack(len(a)))
+    f.write(a.tobytes())
+
+
+def _source_stamp(source):
+    if source is None:
+        return -1, -1
+
+    st = os.stat(source)
+
+    return st.st_size, st.st_mtime_ns
+
+
+def _save(path, records, errors, stamp):
+    encoder = _Encoder()
+    roots = [encoder.node(record) for record in records]
+    error_items = []
+
+    for offset, line, reason in errors:
+        error_items.extend((offset, line, encoder.string(reason)))
+
+    node_id = encoder.node_ids()
+    strings = list(encoder.strings)
+    text = ''.join(strings).encode('utf-8', 'surrogatepass')
+
+    # tempfile imports fnmatch (through shutil), which gdb-mi-pprint only
+    # imports for some options.
+    import tempfile
+
+    # Write to a temporary file first, so that a reader never sees a
+    # partial cache. Its name is unique, so that concurrent writers don't
+    # clobber each other's file.
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.',
+                                    suffix='.tmp',
+                                    dir=os.path.dirname(path) or '.')
+
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, *stamp))
+            _write_section(f, 'I', map(len, strings))
+            f.write(_COUNT.pack(len(text)))
+            f.write(text)
+
+            for (cls, string_name, child_names, list_name), fields in \
+                    zip(_NODE_KINDS, encoder.fields):
+                for index, field in enumerate(fields):
+                    if string_name is not None and index == 0 or \
+                            list_name is not None and index == len(fields) - 2:
+                        _write_section(f, 'I', field)
+                    else:
+                        _write_section(f, 'I', map(node_id, field))
+
+            _write_section(f, 'I', map(node_id, roots))
+            _write_section(f, 'q', error_items)
+
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+
+        raise
+
+
+def save_parsed(path, records, errors=(), source=None):
+    '''
+    Writes `records`, node trees (e.g. as returned by
+    `parser.parse_recover()` or a `StreamParser`), and `errors`,
+    `(offset, line, reason)` tuples, to the cache file at `path`.
+
+    If `source` is set, the size and modification time of the file at
+    this path are stored too, so that `load_parsed()` can tell if the
+    cache is stale.
+    '''
+    _save(path, records, errors, _source_stamp(source))
+
+
+class _Reader:
+    # Reads the sections of a cache file.
+
+    def __init__(self, data, offset):
+        self._view = memoryview(data)
+        self._offset = offset
+
+    def _section(self, item_size):
+        count, = _COUNT.unpack_from(self._view, self._offset)
+        start = self._offset + _COUNT.size
+        self._offset = start + count * item_size
+
+        if self._offset > len(self._view):
+            raise CacheError('truncated cache file')
+
+        return self._view[start:self._offset]
+
+    def bytes(self):
+        return self._section(1)
+
+    def array(self, typecode):
+        a = array.array(typecode)
+        a.frombytes(self._section(a.itemsize))
+
+        if sys.byteorder == 'big':
+            a.byteswap()
+
+        return a.tolist()
+
+    def at_end(self):
+        return self._offset == len(self._view)
+
+
+# Consumes an iterator: used to call a function on many items at once.
+_consume = collections.deque(maxlen=0).extend
+
+
+def _decode(reader):
+    # Returns the string table and the nodes of a cache file, by id.
+    lengths = reader.array('I')
+    text = str(reader.bytes(), 'utf-8', 'surrogatepass')
+    ends = list(itertools.accumulate(lengths))
+
+    if (ends[-1] if ends else 0) != len(text):
+        raise CacheError('string lengths not matching the string table')
+
+    strings = list(map(text.__getitem__,
+                       map(slice, [0] + ends[:-1], ends)))
+    string = strings.__getitem__
+    new = object.__new__
+    repeat = itertools.repeat
+    islice = itertools.islice
+    nodes = [None]
+    node = nodes.__getitem__
+    kinds = []
+
+    # Create the nodes first, and fill them once they all exist.
+    for cls, string_name, child_names, list_name in _NODE_KINDS:
+        fields = []
+
+        if string_name is not None:
+            fields.append(reader.array('I'))
+
+        for name in child_names:
+            fields.append(reader.array('I'))
+
+        if list_name is not None:
+            fields.append(reader.array('I'))
+            fields.append(reader.array('I'))
+
+        kind_nodes = list(map(new, repeat(parser._frozen_class(cls),
+                                          len(fields[0]))))
+        nodes.extend(kind_nodes)
+        kinds.append((kind_nodes, fields))
+
+    for (cls, string_name, child_names, list_name), (kind_nodes, fields) in \
+            zip(_NODE_KINDS, kinds):
+        fields = iter(fields)
+
+        # Frozen nodes can't be assigned to: set their slots directly.
+        if string_name is not None:
+            values = map(string, next(fields))
+
+            if cls is parser.CString:
+                _consume(map(parser.CString._value.__set__, kind_nodes,
+                             values))
+                _consume(map(parser.CString._decoded.__set__, kind_nodes,
+                             repeat(None)))
+                continue
+
+            if cls is parser.Token:
+                values = map(int, values)
+            else:
+                values = map(sys.intern, values)
+
+            _consume(map(getattr(cls, string_name).__set__, kind_nodes,
+                         values))
+
+        for name in child_names:
+            _consume(map(getattr(cls, name).__set__, kind_nodes,
+                         map(node, next(fields))))
+
+        if list_name is not None:
+            list_lengths = next(fields)
+            elements = map(node, next(fields))
+            _consume(map(getattr(cls, list_name).__set__, kind_nodes,
+                         map(tuple, map(islice, repeat(elements),
+                                        list_lengths))))
+
+    return strings, nodes
+
+
+def load_parsed(path, source=None):
+    '''
+    Loads the cache file at `path` (see `save_parsed()`), and returns
+    its records and its errors, as `parser.parse_recover()` does. The
+    records are frozen (see `parser.freeze()`), and identical subtrees
+    are shared.
+
+    If `source` is set, `CacheError` is raised if the size or the
+    modification time of the file at this path changed since the cache
+    was saved. `CacheError` is also raised if the file isn't a valid
+    cache file.
+    '''
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    try:
+        magic, version, source_size, source_mtime_ns = \
+            _HEADER.unpack_from(data)
+    except struct.error:
+        magic = version = None
+
+    if magic != _MAGIC:
+        raise CacheError('{}: not a cache file'.format(path))
+
+    if version != _VERSION:
+        raise CacheError('{}: unsupported cache version {}'.format(path,
+                                                                  version))
+
+    if source is not None and \
+            _source_stamp(source) != (source_size, source_mtime_ns):
+        raise CacheError('{}: stale cache, {} changed'.format(path, source))
+
+    reader = _Reader(data, _HEADER.size)
+
+    # The collector would repeatedly scan the many nodes being created,
+    # none of which is garbage.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        strings, nodes = _decode(reader)
+        records = list(map(nodes.__getitem__, reader.array('I')))
+        items = reader.array('q')
+        errors = list(zip(items[0::3], items[1::3],
+                          map(strings.__getitem__, items[2::3])))
+    except (CacheError, IndexError, ValueError, TypeError, OverflowError,
+            MemoryError, struct.error) as e:
+        raise CacheError('{}: corrupted cache file ({})'.format(path, e))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    if not reader.at_end():
+        raise CacheError('{}: corrupted cache file'.format(path))
+
+    return records, errors
+
+
+def parse_file(source, cache_path=None, stats=None):
+    '''
+    Parses the UTF-8 encoded MI file at `source` with
+    `parser.parse_recover()` (`stats` having the same meaning), and
+    returns its records and its errors. Invalid UTF-8 bytes are decoded
+    to lone surrogates, as by `parser.unescape()`.
+
+    If `cache_path` is set, the records are loaded from this cache file
+    if it's up to date; otherwise, the cache file is written after
+    parsing the source file. Only the records loaded from the cache are
+    frozen.
+    '''
+    if cache_path is not None:
+        try:
+            return load_parsed(cache_path, source)
+        except (FileNotFoundError, CacheError):
+            pass
+
+    # Get the size and the modification time before reading the file,
+    # so that the cache is stale if the file is changed while parsing.
+    stamp = _source_stamp(source)
+
+    # The file is read line by line rather than as a whole.
+    with open(source, 'rb') as f:
+        records, errors = parser._recover_lines(
+            (line.decode('utf-8', 'surrogateescape') for line in f),
+            stats=stats)
+
+    if cache_path is not None:
+        _save(cache_path, records, errors, stamp)
+
+    return records, errors
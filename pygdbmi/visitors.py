@@ -24,38 +24,6 @@
 import sys
 from pygdbmi import parser
 
-try:
-    from termcolor import colored
-except ImportError:
-    def colored(s, c, attrs=[]):
-        return s
-
-''' TODO: convert to extend BaseVisitor
-class GenerateObjectsVisitor:
-    def visit(self, rr_node):
-        res_class = rr_node.result_class
-
-        if res_class == 'done' or res_class == 'running':
-            rr = pygdbmi.objects.DoneResultRecord(rr_node.token,
-                                                  rr_node.results)
-        elif res_class == 'connected':
-            rr = pygdbmi.objects.ConnectedResultRecord(rr_node.token)
-        elif res_class == 'error':
-            msg = None
-            code = None
-
-            for result in rr_node.results:
-                if result.variable.value == 'msg':
-                    msg = result.value
-                elif result.variable.value == 'code':
-                    code = result.value
-
-            rr = pygdbmi.objects.ErrorResultRecord(rr_node.token, msg, code)
-        elif res_class == 'exit':
-            rr = pygdbmi.objects.ExitResultRecord(rr_node.token)
-
-        return rr
-'''
 
 class BaseVisitor:
     def __init__(self):
@@ -64,21 +32,35 @@ class BaseVisitor:
             parser.OutOfBandRecord: self.visit_out_of_band_record,
             parser.AsyncRecord: self.visit_async_record,
             parser.NotifyAsyncOutput: self.visit_notify_async_record,
+            parser.StatusAsyncOutput: self.visit_status_async_record,
+            parser.ExecAsyncOutput: self.visit_exec_async_record,
+            parser.StreamRecord: self.visit_stream_record,
+            parser.ConsoleStreamOutput: self.visit_console_stream_output,
+            parser.TargetStreamOutput: self.visit_target_stream_output,
+            parser.LogStreamOutput: self.visit_log_stream_output,
             parser.AsyncOutput: self.visit_async_output,
             parser.Result: self.visit_result,
             parser.Value: self.visit_value,
             parser.CString: self.visit_cstring,
             parser.List: self.visit_list,
             parser.Tuple: self.visit_tuple,
-            parser.Output: self.visit_output
+            parser.Output: self.visit_output,
+            parser.Token: self.visit_token,
+            parser.Variable: self.visit_variable,
         }
 
     def visit(self, node):
-        if type(node) in self._visit_fns:
-            self._visit_fns[type(node)](node)
-        else:
-            fmt = 'Visiting type {} is not implemented.'
-            raise NotImplementedError(fmt.format(type(node)))
+        if type(node) not in self._visit_fns:
+            # Subclasses (e.g. frozen nodes) are visited like their base.
+            for base in type(node).__mro__[1:]:
+                if base in self._visit_fns:
+                    self._visit_fns[type(node)] = self._visit_fns[base]
+                    break
+            else:
+                fmt = 'Visiting type {} is not implemented.'
+                raise NotImplementedError(fmt.format(type(node)))
+
+        return self._visit_fns[type(node)](node)
 
     def visit_output(self, node):
         pass
@@ -90,14 +72,32 @@ class BaseVisitor:
         pass
 
     def visit_out_of_band_record(self, node):
-        self.visit(node.record)
+        return self.visit(node.record)
 
     def visit_async_record(self, node):
-        self.visit(node.output)
+        return self.visit(node.output)
 
     def visit_notify_async_record(self, node):
         pass
 
+    def visit_status_async_record(self, node):
+        pass
+
+    def visit_exec_async_record(self, node):
+        pass
+
+    def visit_stream_record(self, node):
+        return self.visit(node.output)
+
+    def visit_console_stream_output(self, node):
+        pass
+
+    def visit_target_stream_output(self, node):
+        pass
+
+    def visit_log_stream_output(self, node):
+        pass
+
     def visit_async_output(self, node):
         pass
 
@@ -113,62 +113,411 @@ class BaseVisitor:
     def visit_tuple(self, node):
         pass
 
+    def visit_token(self, node):
+        pass
+
+    def visit_variable(self, node):
+        pass
+
+
+# Returning this from an `IterativeVisitor` enter hook skips the children
+# of the node.
+SKIP = object()
+
+# Node class -> (hook name suffix, function returning the children in
+# reverse order, same without the tokens and variables). The latter is
+# used by visitors without token and variable hooks.
+_NODE_KINDS = {
+    parser.Output: ('output', lambda n: (
+        (n.result_record, *n.oob_records[::-1])
+        if n.result_record is not None else n.oob_records[::-1]), None),
+    parser.OutOfBandRecord: ('out_of_band_record', lambda n: (n.record,),
+                             None),
+    parser.ResultRecord: ('result_record', lambda n: (
+        (*n.results[::-1], n.token) if n.token is not None
+        else n.results[::-1]), lambda n: n.results[::-1]),
+    parser.AsyncRecord: ('async_record', lambda n: (n.output,), None),
+    parser.StreamRecord: ('stream_record', lambda n: (n.output,), None),
+    parser.AsyncOutput: ('async_output', lambda n: n.results[::-1], None),
+    parser.Result: ('result', lambda n: (n.value, n.variable),
+                    lambda n: (n.value,)),
+    parser.Value: ('value', lambda n: (n.value,), None),
+    parser.List: ('list', lambda n: n.elements[::-1], None),
+    parser.Tuple: ('tuple', lambda n: n.elements[::-1], None),
+    parser.CString: ('cstring', None, None),
+    parser.Token: ('token', None, None),
+    parser.Variable: ('variable', None, None),
+}
+
+for _cls, _kind in ((parser.NotifyAsyncOutput, 'notify_async_record'),
+                    (parser.StatusAsyncOutput, 'status_async_record'),
+                    (parser.ExecAsyncOutput, 'exec_async_record')):
+    _NODE_KINDS[_cls] = (_kind, lambda n: (
+        (n.output, n.token) if n.token is not None else (n.output,)),
+        lambda n: (n.output,))
+
+for _cls, _kind in ((parser.ConsoleStreamOutput, 'console_stream_output'),
+                    (parser.TargetStreamOutput, 'target_stream_output'),
+                    (parser.LogStreamOutput, 'log_stream_output')):
+    _NODE_KINDS[_cls] = _kind, lambda n: (n.output,), None
+
+
+class IterativeVisitor:
+    '''
+    Visitor walking node trees with an explicit stack instead of
+    recursion, so that the depth of a tree is only limited by memory.
+
+    For each node, in depth-first order, `walk()` calls the
+    `enter_<kind>(node)` method of the visitor, visits the children of
+    the node, and then calls `leave_<kind>(node)`, `<kind>` being the
+    suffix of the corresponding `BaseVisitor.visit_<kind>()` method,
+    e.g. `enter_tuple()` or `leave_notify_async_record()`. Tokens and
+    variables are visited too. Missing hooks are skipped. If an enter
+    hook returns `SKIP`, the children of the node and its leave hook
+    are skipped.
+
+    The hooks of each node class are looked up once per visitor class.
+    '''
+
+    # Visitor class -> node class -> (enter function, leave function,
+    # children function).
+    _dispatch_tables = {}
+
+    @classmethod
+    def _dispatch_table(cls):
+        table = IterativeVisitor._dispatch_tables.get(cls)
+
+        if table is None:
+            table = {}
+            leaves = any(hasattr(cls, hook + kind)
+                         for hook in ('enter_', 'leave_')
+                         for kind in ('token', 'variable'))
+
+            for node_cls, (kind, children, no_leaves) in _NODE_KINDS.items():
+                if no_leaves is not None and not leaves:
+                    children = no_leaves
+
+                table[node_cls] = (getattr(cls, 'enter_' + kind, None),
+                                   getattr(cls, 'leave_' + kind, None),
+                                   children)
+
+            IterativeVisitor._dispatch_tables[cls] = table
+
+        return table
+
+    @staticmethod
+    def _resolve(table, node_cls):
+        # Subclasses (e.g. frozen nodes) are visited like their base.
+        for base in node_cls.__mro__[1:]:
+            if base in table:
+                table[node_cls] = table[base]
+
+                return table[base]
+
+        fmt = 'Visiting type {} is not implemented.'
+        raise NotImplementedError(fmt.format(node_cls))
+
+    def walk(self, node):
+        table = self._dispatch_table()
+        get = table.get
+        stack = [node]
+        pop = stack.pop
+        push = stack.append
+        extend = stack.extend
+
+        while stack:
+            item = pop()
+            entry = get(type(item))
+
+            if entry is None:
+                # Pending leave hooks are stacked as (function, node)
+                # tuples.
+                if type(item) is tuple:
+                    item[0](self, item[1])
+                    continue
+
+                entry = self._resolve(table, type(item))
+
+            enter, leave, children = entry
+
+            if enter is not None and enter(self, item) is SKIP:
+                continue
+
+            if leave is not None:
+                push((leave, item))
+
+            if children is not None:
+                extend(children(item))
+
+    visit = walk
+
+
+def _token_value(token):
+    return None if token is None else token.value
+
+
+class NativeVisitor(BaseVisitor):
+    '''
+    Converts a tree to the plain Python objects built by
+    `parser.parse()` in native mode: `visit()` returns the converted
+    node.
+    '''
+
+    def _results(self, results):
+        return parser._native_results([self.visit(r) for r in results])
+
+    def _async_record(self, type_, record):
+        return {
+            'type': type_,
+            'token': _token_value(record.token),
+            'class': record.output.async_class,
+            'results': self._results(record.output.results),
+        }
+
+    def visit_output(self, output):
+        records = [self.visit(r) for r in output.oob_records]
+
+        if output.result_record is not None:
+            records.append(self.visit(output.result_record))
+
+        return records
+
+    def visit_result_record(self, rr):
+        return {
+            'type': 'result',
+            'token': _token_value(rr.token),
+            'class': rr.result_class,
+            'results': self._results(rr.results),
+        }
+
+    def visit_notify_async_record(self, ar):
+        return self._async_record('notify', ar)
+
+    def visit_status_async_record(self, ar):
+        return self._async_record('status', ar)
+
+    def visit_exec_async_record(self, ar):
+        return self._async_record('exec', ar)
+
+    def visit_console_stream_output(self, output):
+        return {'type': 'console', 'output': output.output.value}
+
+    def visit_target_stream_output(self, output):
+        return {'type': 'target', 'output': output.output.value}
+
+    def visit_log_stream_output(self, output):
+        return {'type': 'log', 'output': output.output.value}
+
+    def visit_result(self, result):
+        return result.variable.name, parser._native_value(result.value)
+
+    # Values are converted without recursion, whatever their depth.
+    def visit_value(self, value):
+        return parser._native_value(value)
+
+    visit_cstring = visit_list = visit_tuple = visit_value
+
+
+class GenerateObjectsVisitor(BaseVisitor):
+    '''
+    Converts records to the typed record objects of `pygdbmi.objects`:
+    `visit()` returns the record object, or the list of record objects
+    of an `Output` node. Results are only decoded when accessed.
+    '''
+
+    def __init__(self):
+        super().__init__()
+
+        from pygdbmi import objects
+
+        self._objects = objects
+
+    def visit_output(self, output):
+        records = [self.visit(r) for r in output.oob_records]
+
+        if output.result_record is not None:
+            records.append(self.visit(output.result_record))
+
+        return records
+
+    def visit_result_record(self, rr):
+        return self._objects.result_record(_token_value(rr.token),
+                                           rr.result_class, rr.results)
 
-class PrettyPrintVisitor(BaseVisitor):
+    def _async_record(self, type_, record):
+        return self._objects.async_record(type_, _token_value(record.token),
+                                          record.output.async_class,
+                                          record.output.results)
 
-    class Indenter:
-        def __init__(self):
-            self._level = 0
+    def visit_notify_async_record(self, ar):
+        return self._async_record('notify', ar)
+
+    def visit_status_async_record(self, ar):
+        return self._async_record('status', ar)
+
+    def visit_exec_async_record(self, ar):
+        return self._async_record('exec', ar)
+
+    def visit_console_stream_output(self, output):
+        return self._objects.ConsoleStreamRecord(output.output.value)
+
+    def visit_target_stream_output(self, output):
+        return self._objects.TargetStreamRecord(output.output.value)
+
+    def visit_log_stream_output(self, output):
+        return self._objects.LogStreamRecord(output.output.value)
 
-        def __enter__(self):
-            self._level += 1
 
-        def __exit__(self, type_, value, traceback):
-            self._level -= 1
+class _BufferedVisitor(IterativeVisitor):
+    # Iterative visitor building its output in a buffer, which is
+    # written to `outfile` at the end of each `visit()` and whenever it
+    # grows large.
 
-        def __call__(self):
-            return '  ' * self._level
+    # Number of pieces of output buffered before they are written.
+    _FLUSH_PIECES = 4096
 
-    def __init__(self, outfile=sys.stdout, en_colors=False):
-        super(PrettyPrintVisitor, self).__init__()
+    def __init__(self, outfile):
         self._outfile = outfile
-        self._indent = PrettyPrintVisitor.Indenter()
+        self._buffer = []
+        self._write = self._buffer.append
+
+    def visit(self, node):
+        self.walk(node)
+        self.flush()
+
+    def flush(self):
+        '''
+        Writes the buffered output to the output file.
+        '''
+        if self._buffer:
+            self._outfile.write(''.join(self._buffer))
+            self._buffer.clear()
+
+    def _maybe_flush(self):
+        if len(self._buffer) > self._FLUSH_PIECES:
+            self.flush()
+
+
+class PrettyPrintVisitor(_BufferedVisitor):
+    '''
+    Pretty-prints node trees to `outfile`.
+
+    Lists and tuples nested deeper than `max_depth` levels are printed
+    as `[...]` and `{...}`, and only the first `max_items` results or
+    elements of records, lists and tuples are printed, followed by
+    `...`. With `compact`, each record is printed on a single line.
+    '''
+
+    def __init__(self, outfile=sys.stdout, en_colors=False, max_depth=None,
+                 max_items=None, compact=False):
+        if max_depth is not None and max_depth < 0:
+            raise ValueError('the maximum depth must be at least 0')
+
+        if max_items is not None and max_items < 1:
+            raise ValueError('the maximum number of items must be at least 1')
+
+        super().__init__(outfile)
+        self._max_depth = max_depth
+        self._max_items = max_items
+        self._level = 0
+        # One [printed, count, shown] list per list, tuple or list of
+        # results being printed, and None for each result being printed.
+        self._frames = []
 
         if en_colors:
-            self._gos = PrettyPrintVisitor._get_out_str_colors
+            self._gos = PrettyPrintVisitor._get_out_str_colors()
         else:
             self._gos = PrettyPrintVisitor._get_out_str_no_colors
 
+        gos = self._gos
+        self._quote = gos('"', 'yellow')
+        self._sigils = {sigil: gos(sigil, 'green', ['bold'])
+                        for sigil in '=+*~@&'}
+        self._names = {}
+
+        if compact:
+            self._newline = ' '
+            self._last = ''
+            self._record_end = '\n'
+            self._indents = None
+        else:
+            self._newline = '\n'
+            self._last = '\n'
+            self._record_end = ''
+            self._indents = ['']
+
     @staticmethod
     def _get_out_str_no_colors(s, c, attrs=[]):
         return s
 
     @staticmethod
-    def _get_out_str_colors(s, c, attrs=[]):
-        return colored(s, c, attrs=attrs)
+    def _get_out_str_colors():
+        # termcolor is optional, and only imported when colors are enabled.
+        try:
+            from termcolor import colored
+        except ImportError:
+            return PrettyPrintVisitor._get_out_str_no_colors
+
+        return lambda s, c, attrs=[]: colored(s, c, attrs=attrs)
 
     def _indent(self):
-        self._outfile.write('  ' * self._indent)
+        indents = self._indents
 
-    def visit_output(self, output):
-        for oob_record in output.oob_records:
-            self.visit(oob_record)
+        if indents is None:
+            return ''
 
-        if output.result_record is not None:
-            self.visit(output.result_record)
-
-    def _print_results(self, results):
-        with self._indent:
-            for i, result in enumerate(results):
-                self._outfile.write(self._indent())
-                self.visit(result)
-                if i == len(results) - 1:
-                    self._outfile.write('\n')
-                else:
-                    self._outfile.write(',\n')
+        while len(indents) <= self._level:
+            indents.append('  ' * len(indents))
 
-    def visit_result_record(self, rr):
-        maybe_comma = ',' if len(rr.results) > 0 else ''
+        return indents[self._level]
+
+    def _enter_elements(self, count):
+        shown = count
+
+        if self._max_items is not None and count > self._max_items:
+            shown = self._max_items
+
+        self._level += 1
+        self._frames.append([0, count, shown])
+
+    def _leave_elements(self):
+        self._level -= 1
+        self._frames.pop()
+        self._maybe_flush()
+
+    def _enter_element(self):
+        frame = self._frames[-1]
+
+        if frame[0] == frame[2]:
+            return SKIP
+
+        self._write(self._indent())
+
+    def _leave_element(self):
+        frame = self._frames[-1]
+        frame[0] += 1
+
+        if frame[0] == frame[1]:
+            self._write(self._last)
+        elif frame[0] == frame[2]:
+            self._write(',' + self._newline + self._indent() + '...' +
+                        self._last)
+        else:
+            self._write(',' + self._newline)
+
+    def _write_header(self, header, results):
+        if results:
+            self._write(header + ',' + self._newline)
+        else:
+            self._write(header + self._last)
+
+        self._enter_elements(len(results))
+
+    def _leave_header(self):
+        self._leave_elements()
+        self._write(self._record_end)
+
+    def enter_result_record(self, rr):
         ctoken = ''
 
         if rr.token is not None:
@@ -177,67 +526,311 @@ class PrettyPrintVisitor(BaseVisitor):
         cresult_class = self._gos('^' + rr.result_class,
                                   'green', ['bold'])
 
-        self._outfile.write('{}{}{}\n'.format(ctoken, cresult_class,
-                                              maybe_comma))
+        self._write_header(ctoken + cresult_class, rr.results)
 
-        self._print_results(rr.results)
+    def leave_result_record(self, rr):
+        self._leave_header()
 
-    def visit_notify_async_record(self, ar):
-        self._outfile.write(self._gos('=', 'green', ['bold']))
-        self.visit(ar.output)
+    def _print_async_record(self, sigil, ar):
+        if ar.token is not None:
+            self._write(self._gos('{}'.format(ar.token.value),
+                                  'red', ['bold']))
 
-    def visit_async_output(self, output):
-        self._outfile.write(self._gos(output.async_class, 'green', ['bold']))
+        self._write(self._sigils[sigil])
 
-        if output.results:
-            self._outfile.write(',')
-        self._outfile.write('\n')
+    def enter_notify_async_record(self, ar):
+        self._print_async_record('=', ar)
 
-        self._print_results(output.results)
+    def enter_status_async_record(self, ar):
+        self._print_async_record('+', ar)
 
-    def visit_result(self, result):
-        cvariable_name = self._gos(result.variable.name, 'blue')
-        self._outfile.write('{} = '.format(cvariable_name))
-        self.visit(result.value)
+    def enter_exec_async_record(self, ar):
+        self._print_async_record('*', ar)
 
-    def visit_value(self, value):
-        self.visit(value.value)
+    def enter_console_stream_output(self, output):
+        self._write(self._sigils['~'])
+
+    def enter_target_stream_output(self, output):
+        self._write(self._sigils['@'])
+
+    def enter_log_stream_output(self, output):
+        self._write(self._sigils['&'])
+
+    def _leave_stream_output(self, output):
+        self._write('\n')
+
+    leave_console_stream_output = _leave_stream_output
+    leave_target_stream_output = _leave_stream_output
+    leave_log_stream_output = _leave_stream_output
+
+    def enter_async_output(self, output):
+        self._write_header(self._gos(output.async_class, 'green', ['bold']),
+                           output.results)
+
+    def leave_async_output(self, output):
+        self._leave_header()
+
+    def enter_result(self, result):
+        if self._enter_element() is SKIP:
+            return SKIP
+
+        name = result.variable.name
+        cvariable_name = self._names.get(name)
+
+        if cvariable_name is None:
+            cvariable_name = self._gos(name, 'blue') + ' = '
+            self._names[name] = cvariable_name
+
+        value = result.value.value
+
+        # Render C-string values right away rather than walking them.
+        if isinstance(value, parser.CString):
+            cvalue = self._gos(value.value, 'yellow', ['bold'])
+            self._write(cvariable_name + self._quote + cvalue + self._quote)
+            self._leave_element()
+
+            return SKIP
+
+        self._write(cvariable_name)
+        self._frames.append(None)
+
+    def leave_result(self, result):
+        self._frames.pop()
+        self._leave_element()
+
+    def enter_value(self, value):
+        # Values are elements of lists, or values of results.
+        if self._frames[-1] is not None:
+            return self._enter_element()
+
+    def leave_value(self, value):
+        if self._frames[-1] is not None:
+            self._leave_element()
 
-    def visit_cstring(self, cstring):
-        cquote = self._gos('"', 'yellow')
+    def enter_cstring(self, cstring):
         cvalue = self._gos(cstring.value, 'yellow', ['bold'])
-        self._outfile.write('{quot}{val}{quot}'.format(quot=cquote, val=cvalue))
-
-    def visit_list(self, list_):
-        if len(list_.elements) == 0:
-            self._outfile.write('[]')
-            return
-
-        self._outfile.write('[\n')
-        with self._indent:
-            for i, element in enumerate(list_.elements):
-                self._outfile.write(self._indent())
-                self.visit(element)
-                if i == len(list_.elements) - 1:
-                    self._outfile.write('\n')
-                else:
-                    self._outfile.write(',\n')
-        self._outfile.write(self._indent())
-        self._outfile.write(']')
-
-    def visit_tuple(self, tuple_):
-        if len(tuple_.elements) == 0:
-            self._outfile.write('{}')
-            return
-
-        self._outfile.write('{\n')
-        with self._indent:
-            for i, element in enumerate(tuple_.elements):
-                self._outfile.write(self._indent())
-                self.visit(element)
-                if i == len(tuple_.elements) - 1:
-                    self._outfile.write('\n')
-                else:
-                    self._outfile.write(',\n')
-        self._outfile.write(self._indent())
-        self._outfile.write('}')
+        self._write(self._quote + cvalue + self._quote)
+
+    def _enter_container(self, container, opening, closing):
+        if len(container.elements) == 0:
+            self._write(opening + closing)
+
+            return SKIP
+
+        if self._max_depth is not None and self._level > self._max_depth:
+            self._write(opening + '...' + closing)
+
+            return SKIP
+
+        if self._indents is None:
+            self._write(opening)
+        else:
+            self._write(opening + '\n')
+
+        self._enter_elements(len(container.elements))
+
+    def _leave_container(self, closing):
+        self._leave_elements()
+        self._write(self._indent() + closing)
+
+    def enter_list(self, list_):
+        return self._enter_container(list_, '[', ']')
+
+    def leave_list(self, list_):
+        self._leave_container(']')
+
+    def enter_tuple(self, tuple_):
+        return self._enter_container(tuple_, '{', '}')
+
+    def leave_tuple(self, tuple_):
+        self._leave_container('}')
+
+
+class JsonVisitor(_BufferedVisitor):
+    '''
+    Writes records to `outfile` as JSON, one object per line (NDJSON).
+
+    Each record is written as the object built for it by `parser.parse()`
+    in native mode, exactly as `json.dumps()` would write it, but
+    straight from the tree, without building the native objects.
+    '''
+
+    def __init__(self, outfile=sys.stdout):
+        super().__init__(outfile)
+
+        import json
+
+        self._json = json
+        self._encode = json.encoder.encode_basestring_ascii
+        # One [written, in list] list per list, tuple or list of results
+        # being written, and None for each result being written.
+        self._frames = []
+
+    @staticmethod
+    def _has_repeated_names(results):
+        # Repeated names are grouped in native mode, which can't be
+        # done while streaming the results.
+        return len({r.variable.name for r in results}) != len(results)
+
+    def _flat_results(self, results):
+        # Returns the JSON of `results` without the braces if all their
+        # values are C-strings, so that they are written without walking
+        # them, or None.
+        parts = []
+
+        for result in results:
+            value = result.value.value
+
+            if not isinstance(value, parser.CString):
+                return None
+
+            parts.append(self._encode(result.variable.name) + ': ' +
+                         self._encode(value.value))
+
+        return ', '.join(parts)
+
+    def _write_native(self, node):
+        self._write(self._json.dumps(NativeVisitor().visit(node)))
+
+    def _enter_results(self, record, head, results):
+        if self._has_repeated_names(results):
+            self._write_native(record)
+            self._write('\n')
+
+            return SKIP
+
+        flat = self._flat_results(results)
+
+        if flat is not None:
+            self._write(head + ', "results": {' + flat + '}}\n')
+
+            return SKIP
+
+        self._write(head + ', "results": {')
+        self._frames.append([0, False])
+
+    def _leave_results(self):
+        self._frames.pop()
+        self._write('}}\n')
+        self._maybe_flush()
+
+    def enter_result_record(self, rr):
+        head = '{{"type": "result", "token": {}, "class": {}'.format(
+            self._json.dumps(_token_value(rr.token)),
+            self._encode(rr.result_class))
+
+        return self._enter_results(rr, head, rr.results)
+
+    def leave_result_record(self, rr):
+        self._leave_results()
+
+    def _enter_async_record(self, type_, ar):
+        head = '{{"type": "{}", "token": {}, "class": {}'.format(
+            type_, self._json.dumps(_token_value(ar.token)),
+            self._encode(ar.output.async_class))
+
+        return self._enter_results(ar, head, ar.output.results)
+
+    def enter_notify_async_record(self, ar):
+        return self._enter_async_record('notify', ar)
+
+    def enter_status_async_record(self, ar):
+        return self._enter_async_record('status', ar)
+
+    def enter_exec_async_record(self, ar):
+        return self._enter_async_record('exec', ar)
+
+    leave_notify_async_record = leave_result_record
+    leave_status_async_record = leave_result_record
+    leave_exec_async_record = leave_result_record
+
+    def _write_stream_output(self, type_, output):
+        self._write('{{"type": "{}", "output": {}}}\n'.format(
+            type_, self._encode(output.output.value)))
+
+        return SKIP
+
+    def enter_console_stream_output(self, output):
+        return self._write_stream_output('console', output)
+
+    def enter_target_stream_output(self, output):
+        return self._write_stream_output('target', output)
+
+    def enter_log_stream_output(self, output):
+        return self._write_stream_output('log', output)
+
+    def enter_result(self, result):
+        frame = self._frames[-1]
+        name = self._encode(result.variable.name)
+
+        if frame[0]:
+            sep = ', '
+        else:
+            sep = ''
+
+        frame[0] += 1
+
+        # Results are [name, value] pairs in lists.
+        if frame[1]:
+            head = sep + '[' + name + ', '
+            tail = ']'
+        else:
+            head = sep + name + ': '
+            tail = ''
+
+        value = result.value.value
+
+        # Write C-string values right away rather than walking them.
+        if isinstance(value, parser.CString):
+            self._write(head + self._encode(value.value) + tail)
+
+            return SKIP
+
+        self._write(head)
+        self._frames.append(None)
+
+    def leave_result(self, result):
+        self._frames.pop()
+
+        if self._frames[-1][1]:
+            self._write(']')
+
+    def enter_value(self, value):
+        frame = self._frames[-1]
+
+        if frame is not None:
+            if frame[0]:
+                self._write(', ')
+
+            frame[0] += 1
+
+    def enter_cstring(self, cstring):
+        self._write(self._encode(cstring.value))
+
+    def enter_list(self, list_):
+        self._write('[')
+        self._frames.append([0, True])
+
+    def leave_list(self, list_):
+        self._frames.pop()
+        self._write(']')
+
+    def enter_tuple(self, tuple_):
+        if self._has_repeated_names(tuple_.elements):
+            self._write_native(tuple_)
+
+            return SKIP
+
+        flat = self._flat_results(tuple_.elements)
+
+        if flat is not None:
+            self._write('{' + flat + '}')
+
+            return SKIP
+
+        self._write('{')
+        self._frames.append([0, False])
+
+    def leave_tuple(self, tuple_):
+        self._frames.pop()
+        self._write('}')
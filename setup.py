@@ -29,15 +29,13 @@ from setuptools import setup
 from setuptools import find_packages
 
 
-# make sure we run Python 3+ here
+# make sure we run Python 3.7+ here
 v = sys.version_info
-if v.major < 3:
-    sys.stderr.write('Sorry, pygdbmi needs Python 3\n')
+if v < (3, 7):
+    sys.stderr.write('Sorry, pygdbmi needs Python 3.7 or later\n')
     sys.exit(1)
 
-install_requires = [
-    'pyPEG2',
-]
+install_requires = []
 
 console_scripts = [
    'gdb-mi-pprint=pygdbmi.cli.pprint:main'
@@ -45,6 +43,8 @@ console_scripts = [
 
 extras_require = {
     'color': ['termcolor'],
+    'numpy': ['numpy'],
+    'reference': ['pyPEG2'],
 }
 
 setup(
@@ -56,12 +56,23 @@ setup(
     license='MIT',
     keywords='gdb mi',
     url='https://github.com/eepp/pygdbmi',
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'benchmarks']),
+    python_requires='>=3.7',
+    classifiers=[
+        'License :: OSI Approved :: MIT License',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+    ],
     install_requires=install_requires,
     entry_points={
         'console_scripts': console_scripts
     },
     test_suite='nose.collector',
-    tests_require=['nose'],
+    tests_require=['nose', 'pyPEG2'],
     extras_require=extras_require,
 )
@@ -0,0 +1,200 @@
+import os
+import sys
+import asyncio
+import unittest
+
+from pygdbmi import aio
+from pygdbmi import parser
+
+
+_FAKE_GDB = os.path.join(os.path.dirname(__file__), 'fake_gdb.py')
+
+
+async def _start_fake_gdb():
+    return await asyncio.create_subprocess_exec(
+        sys.executable, _FAKE_GDB,
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+
+
+class TestAio(unittest.TestCase):
+
+    def test_read_records(self):
+        async def run():
+            proc = await _start_fake_gdb()
+            proc.stdin.close()
+            records = [record async for record in
+                       aio.read_records(proc.stdout, chunk_size=7)]
+            await proc.wait()
+
+            return records
+
+        records = asyncio.run(run())
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0].record.output.output.async_class,
+                         'thread-group-added')
+        self.assertEqual(records[1].record.output.output.value, 'Fake GDB\\n')
+
+    def test_inferior_output(self):
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(b'=foo\nHello from inferior\n1^done\n'
+                             b'no new line')
+            reader.feed_eof()
+            errors = []
+            records = [record async for record in
+                       aio.read_records(reader, on_error=errors.append)]
+
+            return records, errors
+
+        records, errors = asyncio.run(run())
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[1].token.value, 1)
+        self.assertEqual([e.line for e in errors], [2, 4])
+
+    def test_execute(self):
+        async def run():
+            proc = await _start_fake_gdb()
+            records = aio.read_records(proc.stdout)
+            others = []
+
+            rr_break = await aio.execute(proc.stdin, records,
+                                         '-break-insert main', 1,
+                                         others.append)
+            rr_run = await aio.execute(proc.stdin, records, '-exec-run', 2,
+                                       others.append)
+            rr_eval = await aio.execute(proc.stdin, records,
+                                        '-data-evaluate-expression 1+1', 3,
+                                        others.append)
+            rr_exit = await aio.execute(proc.stdin, records, '-gdb-exit', 4)
+            proc.stdin.close()
+            await proc.wait()
+
+            return rr_break, rr_run, rr_eval, rr_exit, others
+
+        rr_break, rr_run, rr_eval, rr_exit, others = asyncio.run(run())
+        self.assertEqual(rr_break.token.value, 1)
+        self.assertEqual(rr_break.result_class, 'done')
+        self.assertEqual(rr_run.result_class, 'running')
+        self.assertEqual(rr_eval.results[0].value.value.value, '1+1')
+        self.assertEqual(rr_exit.result_class, 'exit')
+
+        self.assertEqual(others[1].record.output.output.value, 'Fake GDB\\n')
+        async_classes = [r.record.output.output.async_class
+                         for r in others if type(r.record) is parser.AsyncRecord]
+        self.assertEqual(async_classes, ['thread-group-added',
+                                         'breakpoint-created',
+                                         'thread-group-started',
+                                         'running', 'stopped'])
+
+    def test_execute_eof(self):
+        class Writer:
+            def write(self, data):
+                pass
+
+            async def drain(self):
+                pass
+
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_data(b'=foo\n1^done\n')
+            reader.feed_eof()
+            records = aio.read_records(reader)
+            await aio.execute(Writer(), records, '-foo', 1)
+            await aio.execute(Writer(), records, '-foo', 2)
+
+        with self.assertRaises(EOFError):
+            asyncio.run(run())
+
+
+class TestSession(unittest.TestCase):
+
+    def test_pipelining(self):
+        async def run():
+            proc = await _start_fake_gdb()
+            others = []
+
+            async with aio.Session(proc.stdout, proc.stdin,
+                                   on_record=others.append) as session:
+                futures = [session.send('-data-evaluate-expression {}'.format(i))
+                           for i in range(100)]
+                self.assertEqual(session.pending_count, 100)
+                await session.drain()
+                responses = await asyncio.gather(*futures)
+                self.assertEqual(session.pending_count, 0)
+                rr_exit = await session.execute('-gdb-exit')
+
+            proc.stdin.close()
+            await proc.wait()
+
+            return responses, rr_exit, others
+
+        responses, rr_exit, others = asyncio.run(run())
+
+        for i, rr in enumerate(responses):
+            self.assertEqual(rr.token.value, i + 1)
+            self.assertEqual(rr.results[0].value.value.value, str(i))
+
+        self.assertEqual(rr_exit.result_class, 'exit')
+        self.assertEqual(len(others), 2)
+
+    def test_eof(self):
+        class Writer:
+            def write(self, data):
+                pass
+
+        async def run():
+            reader = asyncio.StreamReader()
+            session = aio.Session(reader, Writer())
+            session.start()
+            f1 = session.send('-foo')
+            f2 = session.send('-bar')
+            reader.feed_data(b'1^done\n')
+            reader.feed_eof()
+            rr = await f1
+
+            with self.assertRaises(EOFError):
+                await f2
+
+            await session.close()
+
+            return rr
+
+        self.assertEqual(asyncio.run(run()).result_class, 'done')
+
+    def test_send_after_eof(self):
+        class Writer:
+            def write(self, data):
+                pass
+
+            async def drain(self):
+                pass
+
+        async def run():
+            reader = asyncio.StreamReader()
+            reader.feed_eof()
+
+            async with aio.Session(reader, Writer()) as session:
+                await asyncio.sleep(0)
+
+                with self.assertRaises(EOFError):
+                    await asyncio.wait_for(session.execute('-foo'), 1)
+
+                self.assertEqual(session.pending_count, 0)
+
+        asyncio.run(run())
+
+    def test_close_after_failure(self):
+        class Reader:
+            async def read(self, size):
+                raise ConnectionResetError()
+
+        async def run():
+            session = aio.Session(Reader(), None)
+            session.start()
+            await asyncio.sleep(0)
+            await session.close()
+
+            with self.assertRaises(ConnectionResetError):
+                await session.send('-foo')
+
+        asyncio.run(run())
@@ -0,0 +1,67 @@
+import array
+import unittest
+
+from pygdbmi import data
+from pygdbmi import parser
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _values(line, name):
+    tree = parser.StreamParser().feed(line)[0]
+    native = parser.parse(line, strict=False, native=True)[0]
+    node = [r.value for r in tree.results if r.variable.name == name][0]
+    frozen = parser.ParseCache().parse_line(line)
+    frozen_node = [r.value for r in frozen.results
+                   if r.variable.name == name][0]
+
+    return line, node, frozen_node, native['results'][name]
+
+
+class TestData(unittest.TestCase):
+
+    _MEMORY_BYTES = ('^done,memory=[{begin="0x1000",offset="0x0",'
+                     'end="0x1004",contents="0102feff"},'
+                     '{begin="0x2000",offset="0x10",end="0x2001",'
+                     'contents="41"}]\n')
+    _MEMORY = ('^done,addr="0x1000",nr-bytes="8",total-bytes="8",'
+               'memory=[{addr="0x1000",data=["0x0001","0xfffe"],'
+               'ascii="xx"},{addr="0x1004",data=["0x1234","0x0000"]}]\n')
+    _REGISTERS = ('^done,register-values=[{number="0",value="0x1c"},'
+                  '{number="1",value="0xffffffffffffffff"},'
+                  '{number="40",value="{v4_int32 = {0x0, 0x1}}"},'
+                  '{number="41",value="0x1ffffffffffffffff"},'
+                  '{number="57",value="<unavailable>"},'
+                  '{number="2",value="0x0"}]\n')
+
+    def test_read_memory_bytes(self):
+        for value in _values(self._MEMORY_BYTES, 'memory'):
+            self.assertEqual(data.read_memory_bytes(value), (
+                data.MemoryBlock(0x1000, 0, 0x1004, b'\x01\x02\xfe\xff'),
+                data.MemoryBlock(0x2000, 0x10, 0x2001, b'A'),
+            ))
+
+    def test_read_memory(self):
+        for value in _values(self._MEMORY, 'memory'):
+            words = data.read_memory(value, 2)
+            self.assertEqual(words.itemsize, 2)
+            self.assertEqual(list(words), [1, 0xfffe, 0x1234, 0])
+
+    def test_register_values(self):
+        for value in _values(self._REGISTERS, 'register-values'):
+            numbers, values = data.register_values(value)
+            self.assertIsInstance(values, array.array)
+            self.assertEqual(values.itemsize, 8)
+            self.assertEqual(list(numbers), [0, 1, 2])
+            self.assertEqual(list(values), [0x1c, 2 ** 64 - 1, 0])
+
+    @unittest.skipIf(numpy is None, 'NumPy is not installed')
+    def test_numpy(self):
+        numbers, values = data.register_values(self._REGISTERS, numpy=True)
+        self.assertEqual(values.dtype, numpy.uint64)
+        self.assertEqual(values.tolist(), [0x1c, 2 ** 64 - 1, 0])
+        words = data.read_memory(self._MEMORY, 2, numpy=True)
+        self.assertEqual(words.dtype, numpy.uint16)
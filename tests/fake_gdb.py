@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+#
+# Fake GDB used by the tests: reads MI commands on stdin and writes canned
+# MI output on stdout.
+
+import re
+import sys
+
+
+_RESPONSES = {
+    '-break-insert': [
+        '=breakpoint-created,bkpt={number="1",type="breakpoint",addr="0x1"}',
+        '{token}^done,bkpt={number="1",type="breakpoint",addr="0x1"}',
+    ],
+    '-exec-run': [
+        '=thread-group-started,id="i1",pid="1234"',
+        '{token}^running',
+        '*running,thread-id="all"',
+        '(gdb)',
+        '*stopped,reason="breakpoint-hit",bkptno="1",frame={addr="0x1",'
+        'func="main",args=[]},thread-id="1"',
+    ],
+    '-data-evaluate-expression': [
+        '{token}^done,value="{arg}"',
+    ],
+    '-gdb-exit': [
+        '{token}^exit',
+    ],
+}
+
+
+def _write(lines):
+    sys.stdout.write(''.join(line + '\n' for line in lines))
+    sys.stdout.flush()
+
+
+def main():
+    _write(['=thread-group-added,id="i1"', '~"Fake GDB\\n"', '(gdb)'])
+
+    for line in sys.stdin:
+        m = re.match(r'([0-9]*)(\S+)\s*(.*)', line)
+
+        if m is None:
+            continue
+
+        token, command, arg = m.groups()
+
+        if command in _RESPONSES:
+            lines = _RESPONSES[command]
+        else:
+            lines = ['{token}^error,msg="Undefined MI command: {command}"']
+
+        _write([l.replace('{token}', token).replace('{command}', command)
+                 .replace('{arg}', arg) for l in lines] + ['(gdb)'])
+
+        if command == '-gdb-exit':
+            break
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+import unittest
+
+from pygdbmi import objects
+from pygdbmi import parser
+from pygdbmi import visitors
+
+
+def _objects(mi_text):
+    sp = parser.StreamParser()
+    visitor = visitors.GenerateObjectsVisitor()
+
+    return [visitor.visit(r) for r in sp.feed(mi_text)]
+
+
+class TestObjects(unittest.TestCase):
+
+    def test_result_records(self):
+        records = _objects('1^done,a="1"\n'
+                           '^running\n'
+                           '^connected\n'
+                           '2^error,msg="No symbol \\"x\\".",code="E"\n'
+                           '^exit\n')
+        self.assertEqual([type(r) for r in records], [
+            objects.DoneResultRecord,
+            objects.RunningResultRecord,
+            objects.ConnectedResultRecord,
+            objects.ErrorResultRecord,
+            objects.ExitResultRecord,
+        ])
+        self.assertEqual(records[0].token, 1)
+        self.assertEqual(records[0].results, {'a': '1'})
+        self.assertIsNone(records[1].token)
+        self.assertEqual(records[3].msg, 'No symbol "x".')
+        self.assertEqual(records[3].results['msg'], 'No symbol \\"x\\".')
+        self.assertEqual(records[3].code, 'E')
+
+    def test_async_records(self):
+        records = _objects('*stopped,reason="breakpoint-hit",'
+                           'frame={addr="0x1",args=[{name="a",'
+                           'value="0x1 \\"x\\""}]},'
+                           'thread-id="1",stopped-threads="all"\n'
+                           '5*running,thread-id="all"\n'
+                           '=breakpoint-created,bkpt={number="1",'
+                           'locations=[{addr="0x2"}]}\n'
+                           '=thread-group-started,id="i1",pid="42"\n'
+                           '=new-thing,a="1"\n'
+                           '+download,section=".text"\n')
+        stopped, running, bkpt, started, notify, status = records
+
+        self.assertIsInstance(stopped, objects.StoppedAsyncRecord)
+        self.assertEqual(stopped.async_class, 'stopped')
+        self.assertEqual(stopped.reason, 'breakpoint-hit')
+        self.assertEqual(stopped.thread_id, '1')
+        self.assertEqual(stopped.stopped_threads, 'all')
+        self.assertEqual(stopped.frame, {'addr': '0x1',
+                                         'args': [{'name': 'a',
+                                                   'value': '0x1 "x"'}]})
+        self.assertEqual(stopped.results['frame']['args'][0]['value'],
+                         '0x1 \\"x\\"')
+        self.assertIsNone(stopped.signal_name)
+
+        self.assertIsInstance(running, objects.RunningAsyncRecord)
+        self.assertEqual((running.token, running.thread_id), (5, 'all'))
+
+        self.assertIsInstance(bkpt, objects.BreakpointCreatedAsyncRecord)
+        self.assertEqual(bkpt.bkpt['locations'][0]['addr'], '0x2')
+
+        self.assertIsInstance(started, objects.ThreadGroupStartedAsyncRecord)
+        self.assertEqual((started.id, started.pid), ('i1', '42'))
+
+        self.assertIs(type(notify), objects.NotifyAsyncRecord)
+        self.assertEqual(notify.results, {'a': '1'})
+        self.assertIs(type(status), objects.StatusAsyncRecord)
+        self.assertEqual(status.async_class, 'download')
+
+    def test_output(self):
+        output = parser.parse('~"a"\n*running,thread-id="all"\n^done\n'
+                              '(gdb)\n')
+        records = visitors.GenerateObjectsVisitor().visit(output)
+        self.assertEqual([type(r) for r in records], [
+            objects.ConsoleStreamRecord,
+            objects.RunningAsyncRecord,
+            objects.DoneResultRecord,
+        ])
+
+    def test_stream_records(self):
+        records = _objects('~"a\\n"\n@"b"\n&"c"\n')
+        self.assertEqual([(type(r), r.output) for r in records], [
+            (objects.ConsoleStreamRecord, 'a\n'),
+            (objects.TargetStreamRecord, 'b'),
+            (objects.LogStreamRecord, 'c'),
+        ])
+
+    def test_lazy_decoding(self):
+        stopped = _objects('*stopped,reason="exited",frame={addr="0x1"}\n')[0]
+        self.assertEqual(stopped.reason, 'exited')
+        self.assertNotIn('frame', stopped._decoded)
+        self.assertIs(stopped.frame, stopped.frame)
+        self.assertIn('frame', stopped._decoded)
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+from pygdbmi import parallel
+from pygdbmi import parser
+
+
+class TestParseFileParallel(unittest.TestCase):
+
+    def setUp(self):
+        fd, self._path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self._path)
+
+    def _write(self, data):
+        with open(self._path, 'wb') as f:
+            f.write(data)
+
+    def test_order(self):
+        lines = []
+
+        for i in range(300):
+            lines.append('{}^done,value="{}"\n'.format(i, i))
+            lines.append('~"caf\\303\\251 é {}"\n'.format(i))
+
+            if i % 50 == 0:
+                lines.append('(gdb)\n')
+
+        data = ''.join(lines).encode()
+        self._write(data)
+        sp = parser.StreamParser()
+        expected = [str(r) for r in sp.feed(data) + sp.close()]
+
+        for chunk_size in (1, 100, 1000, len(data) * 2):
+            records = parallel.parse_file_parallel(self._path, jobs=2,
+                                                   chunk_size=chunk_size)
+            self.assertEqual([str(r) for r in records], expected)
+
+        records = parallel.parse_file_parallel(self._path, jobs=2,
+                                               chunk_size=100, native=True)
+        self.assertEqual(len(list(records)), 600)
+
+    def test_errors(self):
+        self._write(b'1^done\nnot mi\n' + b'2^done\n' * 20 +
+                    b'^done,\n3^done')
+        errors = []
+        records = list(parallel.parse_file_parallel(self._path, jobs=2,
+                                                    chunk_size=30,
+                                                    on_error=errors.append))
+        self.assertEqual(len(records), 22)
+        self.assertEqual([e.line for e in errors], [2, 23])
+        self.assertEqual(records[-1].token.value, 3)
+
+        records = []
+
+        with self.assertRaisesRegex(parser.ParseError, r'\(line 2\)'):
+            for record in parallel.parse_file_parallel(self._path, jobs=2,
+                                                       chunk_size=30):
+                records.append(record)
+
+        self.assertEqual(len(records), 1)
+
+    def test_empty(self):
+        self._write(b'')
+        self.assertEqual(list(parallel.parse_file_parallel(self._path, 2)),
+                         [])
@@ -0,0 +1,807 @@
+import mmap
+import pickle
+import random
+import tempfile
+import unittest
+
+from pygdbmi import parser
+from pygdbmi import visitors
+
+
+def _tree_fields(node):
+    if type(node) is parser.CString:
+        return {'value': node.value}
+
+    fields = {}
+
+    for cls in type(node).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            fields[name] = getattr(node, name)
+
+    return fields
+
+
+def _random_outputs(seed, count):
+    rng = random.Random(seed)
+
+    def cstring():
+        chars = ['a', 'b', ' ', '\\t', '\\n', '\\"', '\\\\', '\\302',
+                 '{', '}', '[', ']', ',', '=']
+        n = rng.randint(0, 8)
+
+        return '"' + ''.join(rng.choice(chars) for _ in range(n)) + '"'
+
+    def variable():
+        return rng.choice(['a', 'addr', 'thread-id', '_x', 'frame', 'b2'])
+
+    def result(depth):
+        return '{}={}'.format(variable(), value(depth))
+
+    def value(depth):
+        kind = rng.randint(0, 2) if depth < 4 else 0
+
+        if kind == 0:
+            return cstring()
+
+        n = rng.randint(0, 3)
+
+        if kind == 1:
+            elems = [result(depth + 1) for _ in range(n)]
+
+            return '{' + ','.join(elems) + '}'
+
+        if rng.randint(0, 1):
+            elems = [value(depth + 1) for _ in range(n)]
+        else:
+            elems = [result(depth + 1) for _ in range(n)]
+
+        return '[' + ','.join(elems) + ']'
+
+    def results():
+        n = rng.randint(0, 3)
+
+        return ''.join(',' + result(0) for _ in range(n))
+
+    def token():
+        return str(rng.randint(0, 999)) if rng.randint(0, 1) else ''
+
+    def oob_record():
+        if rng.randint(0, 1):
+            return rng.choice('~@&') + cstring() + '\n'
+
+        return '{}{}{}{}\n'.format(token(), rng.choice('=+*'),
+                                   rng.choice(['stopped', 'running',
+                                               'breakpoint-created']),
+                                   results())
+
+    for _ in range(count):
+        lines = [oob_record() for _ in range(rng.randint(0, 5))]
+
+        if rng.randint(0, 1):
+            lines.append('{}^{}{}\n'.format(token(),
+                                            rng.choice(['done', 'error']),
+                                            results()))
+
+        if lines:
+            lines.append('(gdb)\n')
+            yield ''.join(lines)
+
+
+class TestBackends(unittest.TestCase):
+
+    def assertSameTree(self, a, b):
+        self.assertIs(type(a), type(b))
+
+        if type(a) is list:
+            self.assertEqual(len(a), len(b))
+
+            for x, y in zip(a, b):
+                self.assertSameTree(x, y)
+        elif type(a) in (str, int, type(None)):
+            self.assertEqual(a, b)
+        else:
+            self.assertFalse(hasattr(a, '__dict__'))
+            fields_a = _tree_fields(a)
+            fields_b = _tree_fields(b)
+            self.assertEqual(fields_a.keys(), fields_b.keys())
+
+            for k in fields_a:
+                self.assertSameTree(fields_a[k], fields_b[k])
+
+    def _test_same(self, mi_text, strict=True):
+        reference = parser.parse(mi_text, strict, backend='pypeg2')
+        fast = parser.parse(mi_text, strict, backend='fast')
+        self.assertSameTree(fast, reference)
+
+    def _test_both_fail(self, mi_text):
+        for backend in ('pypeg2', 'fast'):
+            with self.assertRaises(parser.ParseError):
+                parser.parse(mi_text, backend=backend)
+
+    def test_result_records(self):
+        self._test_same('^done\n(gdb)\n')
+        self._test_same('^running\n(gdb)\n')
+        self._test_same('^connected\n(gdb)\n')
+        self._test_same('^exit\n(gdb)\n')
+        self._test_same('^error,msg="No symbol \\"foo\\" in current context."\n(gdb)\n')
+        self._test_same('712^done,a="2"\n(gdb)\n')
+        self._test_same('712^exit\n', strict=False)
+
+    def test_out_of_band_records(self):
+        self._test_same('=thread-group-added,id="i1"\n'
+                        '~"GNU gdb (GDB) 7.10\\n"\n'
+                        '@"target output"\n'
+                        '&"warning: log\\n"\n'
+                        '*running,thread-id="all"\n'
+                        '+download,section=".text",section-size="1000"\n'
+                        '12*stopped,reason="breakpoint-hit",frame={addr="0x1"}\n'
+                        '3=library-loaded\n'
+                        '(gdb)\n')
+
+    def test_values(self):
+        self._test_same('^done,a="x",b={},c=[],d=["1",{e="2"}],f=[g="1"],'
+                        'h=[[],{}],i={j={k=[l="1",m={}]}}\n(gdb)\n')
+        self._test_same('^done,children=[child={name="var3.[0]",exp="[0]"},'
+                        'child={name="var3.[1]",exp="[1]"}],has_more="0"\n'
+                        '(gdb)\n')
+
+    def test_cstrings(self):
+        self._test_same('~"tab\\there"\n(gdb)\n')
+        self._test_same('~"\\302\\240 \\\\ \\" done"\n(gdb)\n')
+        self._test_same('~"trailing backslash\\"\n(gdb)\n')
+        self._test_same('~"multi\nline"\n(gdb)\n')
+        self._test_same('~""\n(gdb)\n')
+
+    def test_whitespace(self):
+        self._test_same(' 12 ^done , x = { y = "1" } \n (gdb) \n  ')
+        self._test_same('\t=foo ,\ta = [ "1" , "2" ]\t\n(gdb)\n')
+        self._test_same('^done\r\n(gdb)\r\n')
+        self._test_same('~"a"\r(gdb)\r')
+
+    def test_invalid(self):
+        self._test_both_fail('')
+        self._test_both_fail('^done\n')
+        self._test_both_fail('^donex\n(gdb)\n')
+        self._test_both_fail('^done,\n(gdb)\n')
+        self._test_both_fail('^done,a=[b="1","2"]\n(gdb)\n')
+        self._test_both_fail('^done,a=["1",b="2"]\n(gdb)\n')
+        self._test_both_fail('^done,a={"1"}\n(gdb)\n')
+        self._test_both_fail('^done,a={b="1",}\n(gdb)\n')
+        self._test_both_fail('=a\n(gdb)\n')
+        self._test_both_fail('12~"x"\n(gdb)\n')
+        self._test_both_fail('^done\n^done\n(gdb)\n')
+        self._test_both_fail('^done\n=foo\n(gdb)\n')
+        self._test_both_fail('^done\n\n(gdb)\n')
+        self._test_both_fail('^done\n(gdb)\n^done\n(gdb)\n')
+        self._test_both_fail('^done\n(gdb)\nfoo')
+        self._test_both_fail('foo\n(gdb)\n')
+
+    def test_interning(self):
+        mi_text = ('=a1,file="/home/foo/bob.cc"\n'
+                   '=a1,file="/home/foo/bob.cc"\n'
+                   '(gdb)\n')
+        oob_records = parser.parse(mi_text).oob_records
+        ao = [r.record.output.output for r in oob_records]
+        self.assertIs(ao[0].async_class, ao[1].async_class)
+        self.assertIs(ao[0].results[0].variable.name,
+                      ao[1].results[0].variable.name)
+        self.assertIsNot(ao[0].results[0].value.value.value,
+                         ao[1].results[0].value.value.value)
+
+        oob_records = parser.parse(mi_text, intern_values=True).oob_records
+        ao = [r.record.output.output for r in oob_records]
+        self.assertIs(ao[0].results[0].value.value.value,
+                      ao[1].results[0].value.value.value)
+
+        records = parser.parse(mi_text, native=True, intern_values=True)
+        self.assertIs(records[0]['results']['file'],
+                      records[1]['results']['file'])
+
+    def test_pickle(self):
+        for mi_text in _random_outputs(4321, 100):
+            tree = parser.parse(mi_text)
+            self.assertSameTree(pickle.loads(pickle.dumps(tree)), tree)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            parser.parse('^done\n(gdb)\n', backend='foo')
+
+    def test_random(self):
+        for mi_text in _random_outputs(1234, 200):
+            self._test_same(mi_text)
+
+
+class TestStreamParser(unittest.TestCase):
+
+    _TEXT = ('=thread-group-added,id="i1"\n'
+             '~"GNU gdb \\302\\240\\n"\n'
+             '(gdb) \n'
+             '12^done,bkpt={number="1",addr="0x1"}\r\n'
+             '\n'
+             '*stopped,reason="breakpoint-hit",frame={func="main"}\n')
+
+    def _records_str(self, records):
+        return [str(record) for record in records]
+
+    def test_whole(self):
+        sp = parser.StreamParser()
+        records = sp.feed(self._TEXT)
+        records += sp.close()
+        self.assertEqual(len(records), 4)
+        self.assertIs(type(records[2]), parser.ResultRecord)
+        self.assertEqual(records[2].token.value, 12)
+        self.assertEqual(records[3].record.output.output.async_class,
+                         'stopped')
+
+    def test_chunk_sizes(self):
+        sp = parser.StreamParser()
+        expected = self._records_str(sp.feed(self._TEXT))
+        data = self._TEXT.encode('utf-8')
+
+        for size in (1, 2, 3, 7, 64):
+            sp = parser.StreamParser()
+            records = []
+
+            for i in range(0, len(data), size):
+                records += sp.feed(data[i:i + size])
+
+            records += sp.close()
+            self.assertEqual(self._records_str(records), expected)
+
+    def test_record_per_line(self):
+        sp = parser.StreamParser()
+        self.assertEqual(sp.feed('*stopped,reason="exi'), [])
+        self.assertEqual(len(sp.feed('ted"\n^done')), 1)
+        self.assertEqual(len(sp.feed('\n')), 1)
+
+    def test_unterminated_last_line(self):
+        sp = parser.StreamParser()
+        self.assertEqual(sp.feed(b'^done'), [])
+        self.assertEqual(len(sp.close()), 1)
+
+    def test_error_recovery(self):
+        sp = parser.StreamParser()
+
+        with self.assertRaisesRegex(parser.ParseError, r'\(line 2\)'):
+            sp.feed('=foo\nnot mi\n^done\n')
+
+        records = sp.feed('')
+        self.assertEqual(len(records), 2)
+        self.assertIs(type(records[0]), parser.OutOfBandRecord)
+        self.assertIs(type(records[1]), parser.ResultRecord)
+
+
+class TestParseRecover(unittest.TestCase):
+
+    def test_recover(self):
+        text = ('=foo\n'
+                'inferior output\n'
+                '^done,a="1"\n'
+                '(gdb)\n'
+                '*stopped,reason="exi\n'
+                '~"x"')
+        stats = parser.ParseStats()
+        records, errors = parser.parse_recover(text, stats=stats)
+
+        self.assertEqual([str(r) for r in records],
+                         [str(r) for r in parser.StreamParser().feed(
+                             '=foo\n^done,a="1"\n~"x"\n')])
+        self.assertEqual([error[:2] for error in errors], [(5, 2), (39, 5)])
+        self.assertTrue(text[39:].startswith('*stopped'))
+        self.assertEqual(stats.errors, 2)
+        self.assertEqual(stats.error_size, 37)
+        self.assertEqual(stats.error_rate, 0.4)
+        self.assertIn('errors: 2 (40.00% of the lines, 37 bytes)',
+                      stats.summary())
+
+    def test_native(self):
+        records, errors = parser.parse_recover('^done,a="1"\n^done,\n',
+                                               native=True)
+
+        self.assertEqual(records, [{'type': 'result', 'token': None,
+                                    'class': 'done', 'results': {'a': '1'}}])
+        self.assertEqual(len(errors), 1)
+
+
+class TestNative(unittest.TestCase):
+
+    def test_records(self):
+        records = parser.parse('~"GDB\\n"\n'
+                               '@"target"\n'
+                               '&"log"\n'
+                               '5*stopped,reason="exited"\n'
+                               '=thread-exited\n'
+                               '+download,a=[]\n'
+                               '12^done,a="1"\n'
+                               '(gdb)\n', native=True)
+        self.assertEqual(records, [
+            {'type': 'console', 'output': 'GDB\\n'},
+            {'type': 'target', 'output': 'target'},
+            {'type': 'log', 'output': 'log'},
+            {'type': 'exec', 'token': 5, 'class': 'stopped',
+             'results': {'reason': 'exited'}},
+            {'type': 'notify', 'token': None, 'class': 'thread-exited',
+             'results': {}},
+            {'type': 'status', 'token': None, 'class': 'download',
+             'results': {'a': []}},
+            {'type': 'result', 'token': 12, 'class': 'done',
+             'results': {'a': '1'}},
+        ])
+
+    def test_values(self):
+        records = parser.parse('^done,numchild="2",children=[child={name="a",'
+                               'exp="[0]"},child={name="b",exp="[1]"}],'
+                               'l=["1",{}],t={x="1",y={},x=["2"],x="3"},'
+                               'x="4",x="5"\n', False, native=True)
+        results = records[0]['results']
+        self.assertEqual(results['numchild'], '2')
+        self.assertEqual(results['children'], [
+            ('child', {'name': 'a', 'exp': '[0]'}),
+            ('child', {'name': 'b', 'exp': '[1]'}),
+        ])
+        self.assertEqual(results['l'], ['1', {}])
+        self.assertEqual(results['t'], {'x': ['1', ['2'], '3'], 'y': {}})
+        self.assertIs(type(results['t']['x']), parser.RepeatedValues)
+        self.assertEqual(results['x'], ['4', '5'])
+        self.assertIs(type(results['x']), parser.RepeatedValues)
+
+    def test_stream_parser(self):
+        sp = parser.StreamParser(native=True)
+        self.assertEqual(sp.feed('(gdb)\n^exit\n'), [
+            {'type': 'result', 'token': None, 'class': 'exit', 'results': {}},
+        ])
+
+    def test_pypeg2_backend(self):
+        with self.assertRaises(ValueError):
+            parser.parse('^done\n(gdb)\n', backend='pypeg2', native=True)
+
+        with self.assertRaises(ValueError):
+            parser.parse('^done\n(gdb)\n', backend='pypeg2',
+                         intern_values=True)
+
+    def test_native_visitor(self):
+        visitor = visitors.NativeVisitor()
+
+        for mi_text in _random_outputs(5678, 200):
+            native = parser.parse(mi_text, native=True)
+            self.assertEqual(native, visitor.visit(parser.parse(mi_text)))
+
+
+class TestRecordFilter(unittest.TestCase):
+
+    def test_classify(self):
+        self.assertEqual(parser.classify('12^done,a="1"\n'),
+                         ('result', 12, 'done'))
+        self.assertEqual(parser.classify(' 3 *stopped\n'),
+                         ('exec', 3, 'stopped'))
+        self.assertEqual(parser.classify('=thread-created,id="1"\n'),
+                         ('notify', None, 'thread-created'))
+        self.assertEqual(parser.classify('&"log"\n'), ('log', None, None))
+        self.assertIsNone(parser.classify('(gdb)\n'))
+        self.assertIsNone(parser.classify('not mi\n'))
+
+    def test_filter(self):
+        line_filter = parser.RecordFilter(['*stopped', '=breakpoint-*'])
+        self.assertTrue(line_filter('*stopped,reason="x"\n'))
+        self.assertTrue(line_filter('=breakpoint-created\n'))
+        self.assertTrue(line_filter('~"x"\n'))
+        self.assertTrue(line_filter('(gdb)\n'))
+        self.assertTrue(line_filter('not mi\n'))
+        self.assertFalse(line_filter('*stopped-x\n'))
+        self.assertFalse(line_filter('1^done\n'))
+        self.assertFalse(line_filter('=thread-created\n'))
+
+        line_filter = parser.RecordFilter(streams=False)
+        self.assertTrue(line_filter('1^done\n'))
+        self.assertFalse(line_filter('@"x"\n'))
+
+        with self.assertRaises(ValueError):
+            parser.RecordFilter(['stopped'])
+
+    def test_stream_parser(self):
+        line_filter = parser.RecordFilter(['^*'], streams=False)
+        sp = parser.StreamParser(native=True, line_filter=line_filter)
+        records = sp.feed('~"x"\n*stopped\n1^done\n(gdb)\n')
+        self.assertEqual(records, [{'type': 'result', 'token': 1,
+                                    'class': 'done', 'results': {}}])
+
+        with self.assertRaisesRegex(parser.ParseError, r'\(line 6\)'):
+            sp.feed('*running\nnot mi\n')
+
+
+class TestParseCache(unittest.TestCase):
+
+    def test_counters(self):
+        cache = parser.ParseCache(maxsize=2)
+        first = cache.parse_line('*running,thread-id="all"\n')
+        self.assertIs(cache.parse_line('*running,thread-id="all"\n'), first)
+        cache.parse_line('=ab\n')
+        cache.parse_line('*running,thread-id="all"\n')
+        cache.parse_line('^done\n')
+        self.assertIsNone(cache.parse_line('(gdb)\n'))
+        self.assertEqual((cache.hits, cache.misses, cache.evictions),
+                         (2, 4, 1))
+        self.assertEqual(len(cache), 2)
+
+        # '=ab' was the least recently used record.
+        cache.parse_line('=ab\n')
+        self.assertEqual(cache.misses, 5)
+
+    def test_frozen(self):
+        line = '5*stopped,frame={args=["1",{}]},a=[]\n'
+        record = parser.ParseCache().parse_line(line)
+        self.assertEqual(str(record), str(parser._Parser(line).parse_line()))
+        self.assertEqual(visitors.NativeVisitor().visit(record),
+                         parser.parse(line, strict=False, native=True)[0])
+
+        results = record.record.output.output.results
+        self.assertIsInstance(results, tuple)
+        self.assertIsInstance(results[0].value.value.elements, tuple)
+
+        with self.assertRaises(AttributeError):
+            results[0].variable = None
+
+        with self.assertRaises(AttributeError):
+            record.record.output.token.value = 6
+
+        copy = pickle.loads(pickle.dumps(record))
+        self.assertIs(type(copy), type(record))
+        self.assertEqual(str(copy), str(record))
+
+    def test_stream_parser(self):
+        cache = parser.ParseCache()
+        sp = parser.StreamParser(cache=cache)
+        records = sp.feed('~"a"\n~"a"\n(gdb)\n~"a"\n')
+        self.assertEqual(len(records), 3)
+        self.assertIs(records[0], records[2])
+        self.assertEqual(cache.hits, 2)
+
+        with self.assertRaisesRegex(parser.ParseError, r'\(line 5\)'):
+            sp.feed('~"a\n')
+
+        with self.assertRaises(ValueError):
+            parser.StreamParser(native=True, cache=cache)
+
+
+class TestParseStats(unittest.TestCase):
+
+    def test_counters(self):
+        calls = []
+        stats = parser.ParseStats(
+            before_parse=lambda line: calls.append(line),
+            after_parse=lambda line, record, seconds: calls.append(record))
+        sp = parser.StreamParser(stats=stats)
+        records = sp.feed('1^done,a="1"\n~"x"\n~"yz"\n(gdb)\n'
+                          '*stopped,b=["2"]\n')
+
+        with self.assertRaises(parser.ParseError):
+            sp.feed('^done,\n')
+
+        self.assertEqual(sorted(stats.records), ['*stopped', '^done', '~'])
+        done = stats.records['^done']
+        self.assertEqual((done.count, done.size, done.nodes), (1, 13, 6))
+        console = stats.records['~']
+        self.assertEqual((console.count, console.size, console.nodes),
+                         (2, 11, 8))
+        self.assertEqual(stats.records['*stopped'].nodes, 10)
+        self.assertEqual(stats.total.count, 4)
+        self.assertEqual(sum(stats.total.histogram), 4)
+        self.assertGreater(stats.total.seconds, 0)
+        self.assertEqual(stats.errors, 1)
+        self.assertEqual(calls[:3], ['1^done,a="1"\n', records[0],
+                                     '~"x"\n'])
+        self.assertEqual(calls[6:8], ['(gdb)\n', None])
+        self.assertEqual(len(calls), 11)
+        self.assertIn('*stopped', stats.summary())
+
+    def test_native(self):
+        stats = parser.ParseStats()
+        sp = parser.StreamParser(native=True, stats=stats)
+        sp.feed('^done,a={b="1"},c=[d="2"]\n')
+
+        # Record dict, its type and class, results dict, tuple dict and
+        # its value, list, (name, value) pair, name and value.
+        self.assertEqual(stats.records['^done'].nodes, 10)
+
+    def test_histogram(self):
+        record_stats = parser.RecordStats()
+
+        for seconds in (0.5e-6, 3e-6, 3e-6, 100e-6):
+            record_stats.add(10, 1, seconds)
+
+        self.assertEqual(record_stats.histogram, [1, 0, 2, 0, 0, 0, 0, 1])
+        self.assertEqual(record_stats.percentile(0.5), 4e-6)
+        self.assertEqual(record_stats.percentile(1), 128e-6)
+
+
+class TestCString(unittest.TestCase):
+
+    def test_unescape(self):
+        self.assertEqual(parser.unescape('plain'), 'plain')
+        self.assertEqual(parser.unescape('a\\tb\\n\\"c\\" \\\\'),
+                         'a\tb\n"c" \\')
+        self.assertEqual(parser.unescape('\\302\\240\\033\\0'),
+                         '\xa0\x1b\x00')
+        self.assertEqual(parser.unescape('\\e[0m \\\\e \\q'), '\x1b[0m \\e q')
+        self.assertEqual(parser.unescape('\\377'), '\udcff')
+        self.assertEqual(parser.unescape('abc\\'), 'abc\\')
+        self.assertEqual(parser.unescape('\\tabc\\'), '\tabc\\')
+
+    def test_escape(self):
+        self.assertEqual(parser.escape('plain é'), 'plain é')
+        self.assertEqual(parser.escape('a\tb\n"c" \\ \x1b\r\udcff'),
+                         'a\\tb\\n\\"c\\" \\\\ \\033\\r\\377')
+
+    def test_round_trip(self):
+        rng = random.Random(3)
+        chars = 'ab\\"\n\t\r\x00\x1b\x7fé\udc80 01'
+
+        for _ in range(1000):
+            text = ''.join(rng.choice(chars)
+                           for _ in range(rng.randint(0, 10)))
+            self.assertEqual(parser.unescape(parser.escape(text)), text)
+
+    def test_decoded(self):
+        cstring = parser._Parser('~"a\\tb"\n').parse_line().record.output \
+            .output
+        self.assertEqual(cstring.decoded, 'a\tb')
+        self.assertIs(cstring.decoded, cstring.decoded)
+
+    def test_trailing_backslash(self):
+        line = '~"trailing\\"\n'
+        cstring = parser._Parser(line).parse_line().record.output.output
+        self.assertEqual(cstring.value, 'trailing\\')
+        self.assertEqual(cstring.decoded, 'trailing\\')
+
+        # The value is skipped like it's parsed.
+        line = '^done,a=["[x\\"],b=[{}]\n'
+        self.assertEqual(parser.parse(line, False, native=True)[0]['results'],
+                         {'a': ['[x\\'], 'b': [{}]})
+        self.assertEqual(list(parser.iter_list(line, 'b', native=True)),
+                         [{}])
+        cstring.value = 'c\\n'
+        self.assertEqual(cstring.decoded, 'c\n')
+
+        records = list(parser.parse_buffer(b'~"caf\\303\\251"\n'))
+        self.assertEqual(records[0].record.output.output.decoded, 'café')
+
+        frozen = parser.freeze(parser.CString('"\\""'))
+        self.assertEqual(frozen.decoded, '"')
+
+
+class TestParseBuffer(unittest.TestCase):
+
+    _DATA = (b'=library-loaded,id="/lib/libc.so.6",target-name="caf\xc3\xa9"\n'
+             b'(gdb)\n'
+             b'\n'
+             b'~"Breakpoint 1, main () at bob.cc:21\\n"\n'
+             b'12^done,a=[b={}],c=["1",[]]\r\n'
+             b'*stopped,reason="exited-normally"')
+
+    def _expected(self):
+        sp = parser.StreamParser()
+
+        return [str(r) for r in sp.feed(self._DATA) + sp.close()]
+
+    def test_buffer_types(self):
+        expected = self._expected()
+
+        for buffer in (self._DATA, bytearray(self._DATA),
+                       memoryview(self._DATA)):
+            records = parser.parse_buffer(buffer)
+            self.assertEqual([str(r) for r in records], expected)
+
+    def test_mmap(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(self._DATA)
+            f.flush()
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            records = [str(r) for r in parser.parse_buffer(m)]
+            m.close()
+
+        self.assertEqual(records, self._expected())
+
+    def test_lazy_decoding(self):
+        records = list(parser.parse_buffer(b'~"\xff"\n~"caf\xc3\xa9"\n'))
+
+        # Invalid UTF-8 is decoded as lone surrogates, as by unescape().
+        self.assertEqual(records[0].record.output.output.value, '\udcff')
+        self.assertEqual(records[1].record.output.output.value, 'café')
+
+        for record in records:
+            parser.freeze(record)
+
+    def test_error(self):
+        records = parser.parse_buffer(b'^done\n^done,\n^done\n')
+        next(records)
+
+        with self.assertRaisesRegex(parser.ParseError, r'\(line 2\)'):
+            next(records)
+
+
+def _native_from_events(events):
+    records = []
+    # One [elements, pending result name] frame per open record/tuple/list.
+    stack = []
+
+    for event, value in events:
+        if event == 'start_record':
+            record_type, token, record_class = value
+            records.append({'type': record_type})
+
+            if record_class is not None:
+                records[-1].update(token=token, **{'class': record_class})
+
+            stack.append([[], None])
+            continue
+
+        if event == 'end_record':
+            elements = stack.pop()[0]
+
+            if 'class' in records[-1]:
+                records[-1]['results'] = parser._native_results(elements)
+            else:
+                records[-1]['output'] = elements[0]
+
+            continue
+
+        if event == 'result':
+            stack[-1][1] = value
+            continue
+
+        if event in ('start_tuple', 'start_list'):
+            stack.append([[], None])
+            continue
+
+        if event == 'end_tuple':
+            value = parser._native_results(stack.pop()[0])
+        elif event == 'end_list':
+            value = stack.pop()[0]
+
+        frame = stack[-1]
+
+        if frame[1] is not None:
+            value = (frame[1], value)
+            frame[1] = None
+
+        frame[0].append(value)
+
+    return records
+
+
+class TestPull(unittest.TestCase):
+
+    def test_events(self):
+        events = list(parser.iter_events('~"x"\n(gdb)\n\n'
+                                         '12^done,a=[b={}],c=["1"]\n'))
+        self.assertEqual(events, [
+            ('start_record', ('console', None, None)),
+            ('cstring', 'x'),
+            ('end_record', None),
+            ('start_record', ('result', 12, 'done')),
+            ('result', 'a'),
+            ('start_list', None),
+            ('result', 'b'),
+            ('start_tuple', None),
+            ('end_tuple', None),
+            ('end_list', None),
+            ('result', 'c'),
+            ('start_list', None),
+            ('cstring', '1'),
+            ('end_list', None),
+            ('end_record', None),
+        ])
+
+    def test_events_random(self):
+        for mi_text in _random_outputs(7, 300):
+            self.assertEqual(_native_from_events(parser.iter_events(mi_text)),
+                             parser.parse(mi_text, native=True))
+
+    def test_events_error(self):
+        events = parser.iter_events('^done\n^done,a=\n')
+        self.assertEqual(next(events), ('start_record',
+                                        ('result', None, 'done')))
+        self.assertEqual(next(events), ('end_record', None))
+        self.assertEqual(next(events), ('start_record',
+                                        ('result', None, 'done')))
+        self.assertEqual(next(events), ('result', 'a'))
+
+        with self.assertRaisesRegex(parser.ParseError, 'expecting value'):
+            next(events)
+
+    def test_iter_list(self):
+        line = ('^done,a="1",stack=[frame={level="0"},frame={level="1"}],'
+                'b=[]\n')
+        frames = parser.iter_list(line, 'stack')
+        self.assertEqual([str(f) for f in frames],
+                         [str(f) for f in parser.parse(line, strict=False)
+                          .result_record
+                          .results[1].value.value.elements])
+        self.assertEqual(list(parser.iter_list(line, 'stack', native=True)),
+                         [('frame', {'level': '0'}),
+                          ('frame', {'level': '1'})])
+        self.assertEqual(list(parser.iter_list(line, 'b')), [])
+        self.assertEqual(list(parser.iter_list(line, 'c')), [])
+
+    def test_iter_list_path(self):
+        line = ('^done,symbols={debug=[{filename="a",symbols=[]},'
+                '{filename="b"}],nondebug=[]}\n')
+        self.assertEqual(list(parser.iter_list(line, 'symbols.debug',
+                                               native=True)),
+                         [{'filename': 'a', 'symbols': []},
+                          {'filename': 'b'}])
+
+        # Only tuples have named children.
+        line = '^done,a="x",b=["y"],c={d=[]}\n'
+        self.assertEqual(list(parser.iter_list(line, 'a.d')), [])
+        self.assertEqual(list(parser.iter_list(line, 'b.d')), [])
+        self.assertEqual(list(parser.iter_list(line, 'c.d')), [])
+
+    def test_iter_list_tuple_values(self):
+        # A tuple holds results, not values.
+        with self.assertRaises(parser.ParseError):
+            list(parser.iter_list('^done,a={"1","2"}\n', 'a'))
+
+    def test_iter_list_early_stop(self):
+        # The invalid part after the first element is never reached.
+        line = '*stopped,list=["1",["2"],"3",!!!\n'
+        elements = parser.iter_list(line, 'list', native=True)
+        self.assertEqual(next(elements), '1')
+        self.assertEqual(next(elements), ['2'])
+        elements.close()
+
+        with self.assertRaises(parser.ParseError):
+            list(parser.iter_list(line, 'list'))
+
+
+class TestDeep(unittest.TestCase):
+
+    # Deeper than the interpreter's default recursion limit.
+    _DEPTH = 5000
+    _LINE = ('^done,a=' + '[' * _DEPTH + '"x"' + ']' * _DEPTH +
+             ',b=' + '{c=' * _DEPTH + '{}' + '}' * _DEPTH + '\n')
+
+    def _check_native(self, results):
+        a = results['a']
+        b = results['b']
+
+        for i in range(self._DEPTH):
+            a = a[0]
+            b = b['c']
+
+        self.assertEqual(a, 'x')
+        self.assertEqual(b, {})
+
+    def _check_tree(self, record):
+        a = record.results[0].value
+        b = record.results[1].value
+
+        for i in range(self._DEPTH):
+            a = a.value.elements[0]
+            b = b.value.elements[0].value
+
+        self.assertEqual(a.value.value, 'x')
+        self.assertEqual(b.value.elements, [])
+
+    def test_parse(self):
+        self._check_tree(parser.parse(self._LINE, False).result_record)
+        self._check_tree(next(parser.parse_buffer(self._LINE.encode())))
+        self._check_native(
+            parser.parse(self._LINE, False, native=True)[0]['results'])
+
+    def test_events(self):
+        events = list(parser.iter_events(self._LINE))
+        self.assertEqual(len(events), 5 * self._DEPTH + 7)
+        self.assertEqual(events[-3:], [('end_tuple', None)] * 2 +
+                         [('end_record', None)])
+
+    def test_convert(self):
+        record = parser.parse(self._LINE, False).result_record
+        self._check_native(visitors.NativeVisitor().visit(record)['results'])
+        self._check_native(
+            visitors.GenerateObjectsVisitor().visit(record).results)
+
+        self.assertIs(parser.freeze(record), record)
+
+        with self.assertRaises(AttributeError):
+            record.results[0].value.value.elements[0].value = None
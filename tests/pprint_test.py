@@ -2,8 +2,14 @@ import unittest
 
 from pygdbmi import parser
 from pygdbmi import visitors
+from pygdbmi.cli import pprint
 
 import io
+import os
+import sys
+import subprocess
+import tempfile
+import contextlib
 
 
 class TestPPrintVisitor(unittest.TestCase):
@@ -11,11 +17,12 @@ class TestPPrintVisitor(unittest.TestCase):
     def setUp(self):
         pass
 
-    def _test_pprint(self, input_, expected_output, strict):
+    def _test_pprint(self, input_, expected_output, strict, **options):
         f = io.StringIO()
 
         ast = parser.parse(input_, strict)
-        visitor = visitors.PrettyPrintVisitor(outfile=f, en_colors=False)
+        visitor = visitors.PrettyPrintVisitor(outfile=f, en_colors=False,
+                                              **options)
         visitor.visit(ast)
 
         result = f.getvalue()
@@ -100,3 +107,299 @@ class TestPPrintVisitor(unittest.TestCase):
             '  has_more = "0"\n'
 
         self._test_pprint(input_, expected_output, False)
+
+    def test_async_and_stream_records(self):
+        input_ = '~"Breakpoint 1\\n"\n' \
+                 '@"target"\n' \
+                 '&"log"\n' \
+                 '+download,section=".text"\n' \
+                 '7*stopped,reason="breakpoint-hit",thread-id="1"\n'
+        expected_output = \
+            '~"Breakpoint 1\\n"\n' \
+            '@"target"\n' \
+            '&"log"\n' \
+            '+download,\n' \
+            '  section = ".text"\n' \
+            '7*stopped,\n' \
+            '  reason = "breakpoint-hit",\n' \
+            '  thread-id = "1"\n'
+
+        self._test_pprint(input_, expected_output, False)
+
+    def test_compact(self):
+        input_ = '~"text"\n' \
+                 '=thread-group-added,id="i1"\n' \
+                 '1^done,a=["1",{b="2",c=[]}],d={}\n'
+        expected_output = \
+            '~"text"\n' \
+            '=thread-group-added, id = "i1"\n' \
+            '1^done, a = ["1", {b = "2", c = []}], d = {}\n'
+
+        self._test_pprint(input_, expected_output, False, compact=True)
+        self._test_pprint('^done\n', '^done\n', False, compact=True)
+
+    def test_limits(self):
+        input_ = '^done,a=["1","2","3"],b={c={d="1"},e="2"},f="3"\n'
+        expected_output = \
+            '^done,\n' \
+            '  a = [\n' \
+            '    "1",\n' \
+            '    "2",\n' \
+            '    ...\n' \
+            '  ],\n' \
+            '  b = {\n' \
+            '    c = {...},\n' \
+            '    e = "2"\n' \
+            '  },\n' \
+            '  ...\n'
+
+        self._test_pprint(input_, expected_output, False, max_depth=1,
+                          max_items=2)
+        self._test_pprint(input_, '^done, a = [...], ...\n', False,
+                          max_depth=0, max_items=1, compact=True)
+
+        with self.assertRaises(ValueError):
+            visitors.PrettyPrintVisitor(max_items=0)
+
+
+class TestPPrintStream(unittest.TestCase):
+
+    def _test_pprint_stream(self, input_, expected_output, expected_errors,
+                            line_filter=None, stats=None):
+        f = io.StringIO()
+        visitor = visitors.PrettyPrintVisitor(outfile=f, en_colors=False)
+        errors = pprint.pprint_stream(io.BytesIO(input_), visitor,
+                                      line_filter, stats)
+
+        self.assertEqual(f.getvalue(), expected_output)
+        self.assertEqual(errors, expected_errors)
+
+    def test_records(self):
+        input_ = b'=thread-group-added,id="i1"\n' \
+                 b'(gdb)\n' \
+                 b'1^done\n' \
+                 b'(gdb)\n' \
+                 b'2^done,a="1"'
+        expected_output = \
+            '=thread-group-added,\n' \
+            '  id = "i1"\n' \
+            '1^done\n' \
+            '2^done,\n' \
+            '  a = "1"\n'
+
+        self._test_pprint_stream(input_, expected_output, 0)
+
+    def test_errors(self):
+        input_ = b'1^done\n' \
+                 b'not mi\n' \
+                 b'2^done\n' \
+                 b'^done,\n' \
+                 b'3^done\n'
+        expected_output = \
+            '1^done\n' \
+            '2^done\n' \
+            '3^done\n'
+
+        stats = parser.ParseStats()
+
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self._test_pprint_stream(input_, expected_output, 2, stats=stats)
+
+        self.assertEqual(stats.errors, 2)
+        self.assertEqual(stats.records['^done'].count, 3)
+
+        self.assertIn('(line 2)', stderr.getvalue())
+        self.assertIn('(line 4)', stderr.getvalue())
+
+    def test_filter(self):
+        input_ = b'~"a"\n' \
+                 b'*running,thread-id="all"\n' \
+                 b'*stopped\n' \
+                 b'not mi\n' \
+                 b'=breakpoint-modified\n'
+        expected_output = \
+            '*stopped\n' \
+            '=breakpoint-modified\n'
+        line_filter = parser.RecordFilter(['*stopped', '=breakpoint-*'],
+                                          streams=False)
+
+        with contextlib.redirect_stderr(io.StringIO()) as stderr:
+            self._test_pprint_stream(input_, expected_output, 1, line_filter)
+
+        self.assertIn('(line 4)', stderr.getvalue())
+
+    def test_deep(self):
+        # Deeper than the interpreter's default recursion limit.
+        depth = 5000
+        input_ = ('^done,a=' + '[' * depth + '"x"' + ']' * depth +
+                  ',b=' + '{c=' * depth + '{}' + '}' * depth + '\n')
+        expected_output = ('^done, a = ' + '[' * depth + '"x"' +
+                           ']' * depth + ', b = ' + '{c = ' * depth + '{}' +
+                           '}' * depth + '\n')
+        f = io.StringIO()
+        visitor = visitors.PrettyPrintVisitor(outfile=f, compact=True)
+        errors = pprint.pprint_stream(io.BytesIO(input_.encode()), visitor)
+
+        self.assertEqual(errors, 0)
+        self.assertEqual(f.getvalue(), expected_output)
+
+        f = io.StringIO()
+        errors = pprint.pprint_stream(io.BytesIO(input_.encode()),
+                                      visitors.JsonVisitor(outfile=f))
+
+        self.assertEqual(errors, 0)
+        self.assertTrue(f.getvalue().startswith(
+            '{"type": "result", "token": null, "class": "done", '
+            '"results": {"a": [[['))
+
+        # The same through gdb-mi-pprint.
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'deep.mi')
+
+            with open(path, 'w') as f:
+                f.write(input_)
+
+            output = subprocess.check_output(
+                [sys.executable, '-m', 'pygdbmi.cli.pprint', '--compact',
+                 path], universal_newlines=True)
+
+        self.assertEqual(output, expected_output)
+
+
+class TestPPrintParallel(unittest.TestCase):
+
+    def test_same_as_stream(self):
+        input_ = (b'=thread-group-added,id="i1"\n'
+                  b'1^done,a=["1",{b="2"}]\n'
+                  b'not mi\n'
+                  b'~"text\\n"\n'
+                  b'(gdb)\n') * 10
+        fd, path = tempfile.mkstemp()
+
+        with os.fdopen(fd, 'wb') as f:
+            f.write(input_)
+
+        try:
+            expected = io.StringIO()
+            visitor = visitors.PrettyPrintVisitor(outfile=expected)
+
+            with contextlib.redirect_stderr(io.StringIO()) as stderr:
+                pprint.pprint_stream(io.BytesIO(input_), visitor)
+
+            expected_errors = stderr.getvalue()
+
+            for chunk_size in (1, 100, len(input_)):
+                output = io.StringIO()
+
+                with contextlib.redirect_stderr(io.StringIO()) as stderr:
+                    errors = pprint.pprint_parallel(path, 2, output,
+                                                    chunk_size=chunk_size)
+
+                self.assertEqual(output.getvalue(), expected.getvalue())
+                self.assertEqual(errors, 10)
+                self.assertEqual(stderr.getvalue(), expected_errors)
+
+            expected = io.StringIO()
+            visitor = visitors.PrettyPrintVisitor(outfile=expected,
+                                                  max_items=1, compact=True)
+
+            with contextlib.redirect_stderr(io.StringIO()):
+                pprint.pprint_stream(io.BytesIO(input_), visitor)
+
+            for chunk_size in (1, len(input_)):
+                output = io.StringIO()
+
+                with contextlib.redirect_stderr(io.StringIO()) as stderr:
+                    errors = pprint.pprint_parallel(path, 2, output,
+                                                    chunk_size=chunk_size,
+                                                    max_items=1,
+                                                    compact=True)
+
+                self.assertEqual(output.getvalue(), expected.getvalue())
+                self.assertEqual(errors, 10)
+
+            expected = io.StringIO()
+            visitor = visitors.JsonVisitor(outfile=expected)
+
+            with contextlib.redirect_stderr(io.StringIO()):
+                pprint.pprint_stream(io.BytesIO(input_), visitor)
+
+            for chunk_size in (1, len(input_)):
+                output = io.StringIO()
+
+                with contextlib.redirect_stderr(io.StringIO()) as stderr:
+                    errors = pprint.pprint_parallel(path, 2, output,
+                                                    chunk_size=chunk_size,
+                                                    format_='ndjson')
+
+                self.assertEqual(output.getvalue(), expected.getvalue())
+                self.assertEqual(errors, 10)
+                self.assertEqual(stderr.getvalue(), expected_errors)
+        finally:
+            os.remove(path)
+
+
+class TestPPrintCached(unittest.TestCase):
+
+    def test_same_as_stream(self):
+        input_ = (b'=thread-group-added,id="i1"\n'
+                  b'1^done,a=["1",{b="2"}]\n'
+                  b'not mi\n'
+                  b'~"text\\n"\n'
+                  b'(gdb)\n') * 3
+        expected_output = io.StringIO()
+
+        with contextlib.redirect_stderr(io.StringIO()) as expected_errors:
+            pprint.pprint_stream(io.BytesIO(input_),
+                                 visitors.PrettyPrintVisitor(expected_output))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'trace.mi')
+            cache_path = os.path.join(tmp_dir, 'trace.cache')
+
+            with open(path, 'wb') as f:
+                f.write(input_)
+
+            # Write the cache, then use it.
+            for i in range(2):
+                output = io.StringIO()
+
+                with contextlib.redirect_stderr(io.StringIO()) as stderr:
+                    errors = pprint.pprint_cached(
+                        path, cache_path, visitors.PrettyPrintVisitor(output))
+
+                self.assertEqual(errors, 3)
+                self.assertEqual(output.getvalue(),
+                                 expected_output.getvalue())
+                self.assertEqual(stderr.getvalue(),
+                                 expected_errors.getvalue())
+
+
+class TestMain(unittest.TestCase):
+
+    def test_ndjson_options(self):
+        # The pretty-printer's options don't apply to JSON output.
+        for option in (['--max-depth', '1'], ['--max-items', '1'],
+                       ['--compact']):
+            process = subprocess.run(
+                [sys.executable, '-m', 'pygdbmi.cli.pprint', '--format',
+                 'ndjson', '-'] + option, input='^done\n',
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                universal_newlines=True)
+
+            self.assertEqual(process.returncode, 2)
+            self.assertIn('not available with --format ndjson',
+                          process.stderr)
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_lazy_imports(self):
+        # Modules which gdb-mi-pprint only needs for some options.
+        code = 'import sys, pygdbmi.cli.pprint; print(" ".join(sorted(' \
+               'set(sys.modules) & {"pypeg2", "concurrent.futures", ' \
+               '"pygdbmi.objects", "termcolor", "json", "fnmatch"})))'
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         universal_newlines=True)
+
+        self.assertEqual(output, '\n')
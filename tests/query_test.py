@@ -0,0 +1,64 @@
+import unittest
+
+from pygdbmi import parser
+from pygdbmi import query
+
+
+class TestQuery(unittest.TestCase):
+
+    _STOPPED = ('*stopped,reason="breakpoint-hit",bkptno="1",'
+                'frame={addr="0x4004f4",func="main",'
+                'args=[{name="argv",value="{\\"]\\", 0x1}"}],line="5"},'
+                'thread-id="1"\n')
+    _BKPT = ('=breakpoint-created,bkpt={number="1",type="breakpoint",'
+             'locations=[{number="1.1",addr="0x1"},'
+             '{number="1.2",addr="0x2"}]}\n')
+
+    def test_paths(self):
+        self.assertEqual(query.compile('frame.addr').match(self._STOPPED),
+                         ['0x4004f4'])
+        self.assertEqual(query.compile('frame.args[0].value')
+                         .match(self._STOPPED), ['{\\"]\\", 0x1}'])
+        self.assertEqual(query.compile('frame.line').match(self._STOPPED),
+                         ['5'])
+        self.assertEqual(query.compile('bkpt.locations[*].addr')
+                         .match(self._BKPT), ['0x1', '0x2'])
+        self.assertEqual(query.compile('bkpt.locations[1].number')
+                         .match(self._BKPT), ['1.2'])
+        self.assertEqual(query.compile('stack[*].frame.level')
+                         .match('12^done,stack=[frame={level="0"},'
+                                'frame={level="1"}]\n'), ['0', '1'])
+
+    def test_no_match(self):
+        for path in ('frame', 'frame.nope', 'frame.addr[*]', 'reason.x',
+                     'frame.args[3].value'):
+            self.assertEqual(query.compile(path).match(self._STOPPED), [])
+
+        self.assertEqual(query.compile('a').match('~"a"\n'), [])
+        self.assertEqual(query.compile('a').match('(gdb)\n'), [])
+
+    def test_repeated_results(self):
+        q = query.compile('a')
+        self.assertEqual(q.match('^done,a="1",b="2",a="3"\n'), ['1', '3'])
+        self.assertEqual(q.first('^done,a="1",b="2",a="3"\n'), '1')
+        self.assertIsNone(q.first('^done,b="2"\n'))
+
+    def test_first_stops_early(self):
+        q = query.compile('a')
+        self.assertEqual(q.first('^done,a="1",!!!\n'), '1')
+
+        with self.assertRaises(parser.ParseError):
+            q.match('^done,a="1",!!!\n')
+
+    def test_invalid_record(self):
+        q = query.compile('a')
+
+        for line in ('^done,b={a="1"\n', '^done,b=[[]\n', '^done,a=\n',
+                     'nope\n'):
+            with self.assertRaises(parser.ParseError):
+                q.match(line)
+
+    def test_invalid_path(self):
+        for path in ('', '[*]', 'a..b', 'a[x]', 'a b', 'a[*]b', '.a'):
+            with self.assertRaises(ValueError):
+                query.compile(path)
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import typing
+import unittest
+
+from pygdbmi import parser
+from pygdbmi import schemas
+from pygdbmi import store
+from pygdbmi import visitors
+
+
+def _results(line):
+    tree = parser.StreamParser().feed(line)[0]
+    native = parser.parse(line, strict=False, native=True)[0]
+
+    if type(tree) is parser.OutOfBandRecord:
+        tree = tree.record.output.output
+
+    return tree.results, native['results']
+
+
+class TestSchemas(unittest.TestCase):
+
+    def _test_decode(self, line, name, expected):
+        nodes, native = _results(line)
+        node = [r for r in nodes if r.variable.name == name][0].value
+        self.assertEqual(schemas.decode(name, node), expected)
+        self.assertEqual(schemas.decode(name, native[name]), expected)
+        self.assertEqual(schemas.decode(name, parser.freeze(node)), expected)
+
+    def test_frame(self):
+        line = ('*stopped,reason="breakpoint-hit",frame={addr="0x4004f4",'
+                'func="main",args=[{name="argc",value="1"}],file="t.c",'
+                'fullname="/tmp/t.c",line="5",arch="i386:x86-64",'
+                'unknown="x"},thread-id="1"\n')
+        self._test_decode(line, 'frame', schemas.Frame(
+            addr=0x4004f4, func='main',
+            args=(schemas.Arg(name='argc', value='1'),),
+            file='t.c', fullname='/tmp/t.c', line=5, arch='i386:x86-64'))
+
+    def test_bkpt(self):
+        line = ('=breakpoint-created,bkpt={number="1",type="breakpoint",'
+                'disp="keep",enabled="y",addr="<MULTIPLE>",times="0",'
+                'original-location="f",locations=[{number="1.1",'
+                'enabled="n",addr="0x10",func="f",line="3",'
+                'thread-groups=["i1"]}]}\n')
+        self._test_decode(line, 'bkpt', schemas.Breakpoint(
+            number='1', type='breakpoint', disp='keep', enabled=True,
+            times=0, original_location='f',
+            locations=(schemas.BreakpointLocation(
+                number='1.1', enabled=False, addr=0x10, func='f', line=3,
+                thread_groups=('i1',)),)))
+
+    def test_lists(self):
+        self._test_decode('^done,stack=[frame={level="0",addr="0x1"},'
+                          'frame={level="1",addr="0x2"}]\n', 'stack', (
+                              schemas.Frame(level=0, addr=1),
+                              schemas.Frame(level=1, addr=2),
+                          ))
+        self._test_decode('^done,register-values=[{number="0",value="0x0"},'
+                          '{number="7",value="{0x1, 0x2}"}]\n',
+                          'register-values', (
+                              schemas.RegisterValue(0, '0x0'),
+                              schemas.RegisterValue(7, '{0x1, 0x2}'),
+                          ))
+        self._test_decode('^done,asm_insns=[{address="0x40",'
+                          'func-name="main",offset="4",inst="ret"}]\n',
+                          'asm_insns', (
+                              schemas.Instruction(address=0x40,
+                                                  func_name='main', offset=4,
+                                                  inst='ret'),
+                          ))
+        self._test_decode('^done,threads=[{id="1",target-id="LWP 1",'
+                          'frame={level="0"},state="stopped"}]\n',
+                          'threads', (
+                              schemas.Thread(id=1, target_id='LWP 1',
+                                             frame=schemas.Frame(level=0),
+                                             state='stopped'),
+                          ))
+
+    def test_escapes(self):
+        line = ('*stopped,frame={func="f",args=[{name="s",'
+                'value="0x4005d4 \\"hi\\""}],file="C:\\\\src\\\\a.c"}\n')
+        self._test_decode(line, 'frame', schemas.Frame(
+            func='f', args=(schemas.Arg(name='s', value='0x4005d4 "hi"'),),
+            file='C:\\src\\a.c'))
+
+    def test_repeated_names(self):
+        # The first value of a repeated result is decoded.
+        line = '^done,frame={level="0",func="f",level="1",func="g"}\n'
+        self._test_decode(line, 'frame', schemas.Frame(level=0, func='f'))
+
+    def test_register(self):
+        class Foo(typing.NamedTuple):
+            a_b: int = None
+            c: tuple = None
+
+        schemas.register('foo', schemas.Schema(Foo, {
+            'a-b': schemas._int,
+            'c': schemas.TupleOf(schemas._str),
+        }))
+        self.addCleanup(schemas._DECODERS.pop, 'foo')
+        self._test_decode('^done,foo={a-b="2",c=["x","y"]}\n', 'foo',
+                          Foo(2, ('x', 'y')))
+
+        with self.assertRaises(KeyError):
+            schemas.get_decoder('nope')
+
+    def test_objects(self):
+        sp = parser.StreamParser()
+        record = visitors.GenerateObjectsVisitor().visit(
+            sp.feed('*stopped,frame={addr="0x1",line="2"}\n')[0])
+        self.assertEqual(record.decode('frame').line, 2)
+        self.assertIsNone(record.decode('bkpt'))
+
+    def test_cached(self):
+        line = ('^done,stack=[frame={level="0",addr="0x1",'
+                'args=[{name="a",value="1"}]}]\n')
+        records, errors = parser.parse_recover(line)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'trace.cache')
+            store.save_parsed(path, records, errors)
+            record = store.load_parsed(path)[0][0]
+
+        self.assertEqual(schemas.decode('stack', record.results[0].value), (
+            schemas.Frame(level=0, addr=1,
+                          args=(schemas.Arg(name='a', value='1'),)),
+        ))
@@ -0,0 +1,193 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pygdbmi import parser
+from pygdbmi import store
+
+
+_TEXT = ('=thread-group-added,id="i1"\n'
+         '~"caf\\303\\251 \\"x\\"\\n"\n'
+         '@"target"\n'
+         '&"log"\n'
+         'not mi\n'
+         '12^done,bkpt={number="1",addr="0x1",thread-groups=["i1"]},a=[]\n'
+         '(gdb)\n'
+         '*stopped,frame={args=[{name="argc",value="1"}]},thread-id="1"\n'
+         '+download,section=".text"\n'
+         '5=thread-created,id="1",group-id="i1"\n'
+         '^error,msg="é"\n'
+         '*stopped,frame={args=[{name="argc",value="1"}]},thread-id="1"\n'
+         '^done,\n'
+         '~"unterminated')
+
+
+class TestStore(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._source = os.path.join(self._dir, 'trace.mi')
+        self._cache = os.path.join(self._dir, 'trace.cache')
+
+        with open(self._source, 'w') as f:
+            f.write(_TEXT)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def test_round_trip(self):
+        records, errors = parser.parse_recover(_TEXT)
+        store.save_parsed(self._cache, records, errors)
+        loaded, loaded_errors = store.load_parsed(self._cache)
+
+        self.assertEqual([str(r) for r in loaded], [str(r) for r in records])
+        self.assertEqual(loaded_errors, errors)
+        self.assertEqual(len(errors), 3)
+
+        # Loaded records are frozen, and share identical subtrees.
+        with self.assertRaises(AttributeError):
+            loaded[0].record = None
+
+        self.assertIs(loaded[5], loaded[9])
+        self.assertEqual(loaded[1].record.output.output.decoded,
+                         'café "x"\n')
+        self.assertEqual(loaded[4].token.value, 12)
+
+    def test_frozen_records(self):
+        cache = parser.ParseCache()
+        records = [cache.parse_line(line + '\n')
+                   for line in ('*stopped,a={b="1"}', '~"x"',
+                                '*stopped,a={b="1"}')]
+        store.save_parsed(self._cache, records)
+        loaded, errors = store.load_parsed(self._cache)
+
+        self.assertEqual([str(r) for r in loaded], [str(r) for r in records])
+        self.assertEqual(errors, [])
+
+    def test_deep(self):
+        value = parser.Value(parser.CString('"x"'))
+
+        for i in range(10000):
+            value = parser.Value(parser.List([value]))
+
+        record = parser.ResultRecord(['done', parser.Result(
+            [parser.Variable('a'), value])])
+        store.save_parsed(self._cache, [record])
+        loaded, errors = store.load_parsed(self._cache)
+        value = loaded[0].results[0].value
+
+        for i in range(10000):
+            value = value.value.elements[0]
+
+        self.assertEqual(value.value.value, 'x')
+
+    def test_invalid_utf8(self):
+        records = list(parser.parse_buffer(b'~"caf\xe9"\n'))
+        store.save_parsed(self._cache, records)
+        loaded, errors = store.load_parsed(self._cache)
+        self.assertEqual(loaded[0].record.output.output.value, 'caf\udce9')
+
+    def test_not_nodes(self):
+        with self.assertRaises(TypeError):
+            store.save_parsed(self._cache, parser.parse_recover(
+                '^done\n', native=True)[0])
+
+    def test_failed_save(self):
+        # Out of range error offset.
+        with self.assertRaises(OverflowError):
+            store.save_parsed(self._cache, [], [(2 ** 64, 1, 'bad')])
+
+        # The temporary file is removed.
+        self.assertEqual(os.listdir(self._dir), ['trace.mi'])
+
+    def test_invalid(self):
+        records, errors = parser.parse_recover(_TEXT)
+        store.save_parsed(self._cache, records, errors)
+
+        with open(self._cache, 'rb') as f:
+            data = f.read()
+
+        for bad_data in (b'', b'not a cache file', data[:-1],
+                         data.replace(b'GDBMIREC\x01', b'GDBMIREC\x02')):
+            with open(self._cache, 'wb') as f:
+                f.write(bad_data)
+
+            with self.assertRaises(store.CacheError):
+                store.load_parsed(self._cache)
+
+    def test_corrupted(self):
+        records, errors = parser.parse_recover(_TEXT)
+        store.save_parsed(self._cache, records, errors)
+
+        with open(self._cache, 'rb') as f:
+            data = f.read()
+
+        # Flip each byte after the header: either the cache is still
+        # valid, or CacheError is raised.
+        for i in range(store._HEADER.size, len(data)):
+            with open(self._cache, 'wb') as f:
+                f.write(data[:i] + bytes([data[i] ^ 0xff]) + data[i + 1:])
+
+            try:
+                store.load_parsed(self._cache)
+            except store.CacheError:
+                pass
+
+        # A corrupted cache is replaced.
+        store.parse_file(self._source, self._cache)
+        length_offset = store._HEADER.size + store._COUNT.size
+
+        with open(self._cache, 'r+b') as f:
+            f.seek(length_offset)
+            f.write(b'\xff')
+
+        with self.assertRaises(store.CacheError):
+            store.load_parsed(self._cache, self._source)
+
+        loaded, loaded_errors = store.parse_file(self._source, self._cache)
+        self.assertEqual(loaded_errors, errors)
+        store.load_parsed(self._cache, self._source)
+
+    def test_parse_file_invalid_utf8(self):
+        with open(self._source, 'wb') as f:
+            f.write(b'~"caf\xe9"\n^done\n')
+
+        records, errors = store.parse_file(self._source)
+        self.assertEqual(errors, [])
+        self.assertEqual(records[0].record.output.output.value,
+                         'caf\udce9')
+        self.assertEqual(str(records[1]),
+                         str(parser.parse('^done\n', False).result_record))
+
+    def test_parse_file(self):
+        records, errors = store.parse_file(self._source, self._cache)
+        self.assertTrue(os.path.exists(self._cache))
+        self.assertEqual(sorted(os.listdir(self._dir)),
+                         ['trace.cache', 'trace.mi'])
+
+        # Same as parsing the whole text, the error offsets counting
+        # characters.
+        expected, expected_errors = parser.parse_recover(_TEXT)
+        self.assertEqual([str(r) for r in records],
+                         [str(r) for r in expected])
+        self.assertEqual(errors, expected_errors)
+
+        # The second time, the records come from the cache.
+        loaded, loaded_errors = store.parse_file(self._source, self._cache)
+        self.assertIsNot(type(loaded[0]), parser.OutOfBandRecord)
+        self.assertEqual([str(r) for r in loaded], [str(r) for r in records])
+        self.assertEqual(loaded_errors, errors)
+
+        # The cache is stale once the source changes.
+        with open(self._source, 'a') as f:
+            f.write('"\n^exit\n')
+
+        with self.assertRaises(store.CacheError):
+            store.load_parsed(self._cache, self._source)
+
+        records, errors = store.parse_file(self._source, self._cache)
+        self.assertEqual(str(records[-1]),
+                         str(parser.parse('^exit\n', False).result_record))
+        self.assertEqual(store.load_parsed(self._cache, self._source)[1],
+                         errors)
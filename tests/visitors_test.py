@@ -0,0 +1,131 @@
+import unittest
+
+from pygdbmi import parser
+from pygdbmi import visitors
+
+import io
+import json
+
+
+class _RecordingVisitor(visitors.IterativeVisitor):
+
+    def __init__(self):
+        self.events = []
+
+    def enter_result(self, result):
+        self.events.append(('enter', result.variable.name))
+
+    def leave_result(self, result):
+        self.events.append(('leave', result.variable.name))
+
+    def enter_token(self, token):
+        self.events.append(('token', token.value))
+
+    def enter_cstring(self, cstring):
+        self.events.append(('cstring', cstring.value))
+
+    def enter_tuple(self, tuple_):
+        if len(tuple_.elements) > 1:
+            return visitors.SKIP
+
+
+def _nested_lists(depth):
+    value = parser.Value(parser.CString('"x"'))
+
+    for i in range(depth):
+        value = parser.Value(parser.List([value]))
+
+    result = parser.Result([parser.Variable('a'), value])
+
+    return parser.Output([parser.ResultRecord([parser.Token('1'), 'done',
+                                               result])])
+
+
+class TestIterativeVisitor(unittest.TestCase):
+
+    def test_order(self):
+        output = parser.parse('5^done,a={b="1"},c=["2","3"],d={e="4",f="5"}\n'
+                              '(gdb)\n')
+        visitor = _RecordingVisitor()
+        visitor.visit(output)
+
+        self.assertEqual(visitor.events, [
+            ('token', 5),
+            ('enter', 'a'), ('enter', 'b'), ('cstring', '1'), ('leave', 'b'),
+            ('leave', 'a'),
+            ('enter', 'c'), ('cstring', '2'), ('cstring', '3'), ('leave', 'c'),
+            ('enter', 'd'), ('leave', 'd'),
+        ])
+
+    def test_frozen(self):
+        output = parser.ParseCache().parse_line('*stopped,a={b="1"}\n')
+        visitor = _RecordingVisitor()
+        visitor.visit(output)
+
+        self.assertEqual(visitor.events, [
+            ('enter', 'a'), ('enter', 'b'), ('cstring', '1'), ('leave', 'b'),
+            ('leave', 'a'),
+        ])
+
+    def test_deep(self):
+        visitor = _RecordingVisitor()
+        visitor.visit(_nested_lists(100000))
+
+        self.assertEqual(visitor.events, [
+            ('token', 1), ('enter', 'a'), ('cstring', 'x'), ('leave', 'a'),
+        ])
+
+    def test_deep_pprint(self):
+        depth = 5000
+        f = io.StringIO()
+        visitors.PrettyPrintVisitor(outfile=f).visit(_nested_lists(depth))
+        lines = f.getvalue().splitlines()
+
+        self.assertEqual(lines[:3], ['1^done,', '  a = [', '    ['])
+        self.assertEqual(lines[depth + 1], '  ' * (depth + 1) + '"x"')
+        self.assertEqual(lines[-1], '  ]')
+        self.assertEqual(len(lines), 2 * depth + 2)
+
+    def test_unknown_node(self):
+        with self.assertRaises(NotImplementedError):
+            visitors.IterativeVisitor().visit(object())
+
+
+class TestJsonVisitor(unittest.TestCase):
+
+    def _test_json(self, input_):
+        records = parser.StreamParser().feed(input_)
+        f = io.StringIO()
+        visitor = visitors.JsonVisitor(outfile=f)
+
+        for record in records:
+            visitor.visit(record)
+
+        expected = [parser.parse(line + '\n', strict=False, native=True)[0]
+                    for line in input_.splitlines()]
+
+        self.assertEqual(f.getvalue().splitlines(),
+                         [json.dumps(r) for r in expected])
+
+    def test_records(self):
+        self._test_json('5^done,a="1",b={c=["x",{}],d=[e="2",f={}]},g=[]\n'
+                        '^error,msg="\\"quoted\\" \\303\\251"\n'
+                        '=thread-group-added,id="i1"\n'
+                        '*stopped,frame={args=[{name="argc",value="1"}]}\n'
+                        '+download\n'
+                        '~"console\\n"\n'
+                        '@"target"\n'
+                        '&"log"\n')
+
+    def test_repeated_names(self):
+        self._test_json('^done,a="1",a="2"\n'
+                        '=ab,b={c="1",c={},d="2"},e=[{f="1",f="2"}]\n')
+
+    def test_frozen(self):
+        line = '*stopped,frame={addr="0x1",args=[]},thread-id="1"\n'
+        f = io.StringIO()
+        visitors.JsonVisitor(outfile=f).visit(
+            parser.ParseCache().parse_line(line))
+
+        self.assertEqual(json.loads(f.getvalue()),
+                         parser.parse(line, strict=False, native=True)[0])